@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",  # full-text/trigram product search (shop.search)
     # Third-party
     "rest_framework",
     "rest_framework_simplejwt",
@@ -111,6 +112,9 @@ else:
             f"  POSTGRES_PORT=5432 (optional, defaults to 5432)"
         )
     
+    _conn_max_age = os.getenv("DB_CONN_MAX_AGE", "60")
+    _conn_max_age = None if _conn_max_age.lower() == "none" else int(_conn_max_age)
+
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.postgresql",
@@ -119,8 +123,21 @@ else:
             "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
             "HOST": os.getenv("POSTGRES_HOST", "localhost"),
             "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            # Keep connections open across requests/tasks ("none" = unlimited) and
+            # check them before reuse, so a restarted server costs one retry, not an error
+            "CONN_MAX_AGE": _conn_max_age,
+            "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "1") == "1",
+            "OPTIONS": {},
         }
     }
+    # psycopg connection pool (needs psycopg[pool]); replaces persistent connections
+    if os.getenv("DB_POOL", "0") == "1":
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        }
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -174,7 +191,7 @@ CORS_ALLOW_HEADERS = [
 # DRF
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "shop.authentication.SnapshotJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.AllowAny",),
     "DEFAULT_FILTER_BACKENDS": (
@@ -186,7 +203,7 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.ScopedRateThrottle",
+        "shop.throttling.RedisScopedRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "auth": os.getenv("THROTTLE_AUTH_RATE", "10/min"),
@@ -209,12 +226,142 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Seconds a resolved user snapshot (id, role, user_type) is cached for JWT authentication
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "300"))
+
 # Celery & Redis
 CELERY_BROKER_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+CELERY_BEAT_SCHEDULE = {
+    "prepare-order-number-sequences": {
+        "task": "shop.tasks.prepare_order_number_sequences",
+        "schedule": 3600.0,
+    },
+    "purge-expired-session-carts": {
+        "task": "shop.tasks.purge_expired_session_carts_task",
+        "schedule": float(os.getenv("CART_PURGE_INTERVAL", "300")),
+    },
+    "reconcile-admin-summary": {
+        "task": "shop.tasks.reconcile_summary_task",
+        "schedule": float(os.getenv("SUMMARY_RECONCILE_INTERVAL", "600")),
+    },
+    "sweep-staged-images": {
+        "task": "shop.tasks.sweep_staged_images_task",
+        "schedule": 3600.0,
+    },
+    "sweep-staged-imports": {
+        "task": "shop.tasks.sweep_staged_imports_task",
+        "schedule": 3600.0,
+    },
+}
+
+# Expired guest cart purge: carts per batch, pause between batches, time budget per run (seconds)
+CART_PURGE_BATCH_SIZE = int(os.getenv("CART_PURGE_BATCH_SIZE", "1000"))
+CART_PURGE_PAUSE = float(os.getenv("CART_PURGE_PAUSE", "0.1"))
+CART_PURGE_MAX_SECONDS = float(os.getenv("CART_PURGE_MAX_SECONDS", "240"))
+
+# Rows fetched per round trip when streaming order exports
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Rows written per transaction by the product import
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+# Async job progress: publish interval (seconds), cached state lifetime, long-poll cap.
+# A long-poll holds a server thread, so waits are short and limited per process.
+JOB_PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "1.0"))
+JOB_STATE_TTL = int(os.getenv("JOB_STATE_TTL", "86400"))
+JOB_STATUS_MAX_WAIT = float(os.getenv("JOB_STATUS_MAX_WAIT", "5"))
+JOB_STATUS_MAX_WAITERS = int(os.getenv("JOB_STATUS_MAX_WAITERS", "2"))
+
+# Uploaded import files are staged here for the worker; must be shared with it
+IMPORT_SPOOL_DIR = Path(os.getenv("IMPORT_SPOOL_DIR", str(BASE_DIR / "var" / "imports")))
+# Staged uploads no task picked up are removed after this many seconds
+IMPORT_SPOOL_MAX_AGE = int(os.getenv("IMPORT_SPOOL_MAX_AGE", "86400"))
+
+# Storage backends by name (shop.storage.get_storage), resolved once per process.
+# "default" comes from the STORAGE_*/AWS_*/S3_*/CLOUDINARY_* variables; "images" gets its own
+# backend when IMAGES_STORAGE_BACKEND is set, "exports" always does. IMAGES_*/EXPORTS_*
+# variables override the unprefixed ones (e.g. IMAGES_AWS_S3_BUCKET).
+def _storage_config(prefix: str = "") -> dict:
+    def env(name: str, default: str = "") -> str:
+        return os.getenv(prefix + name, os.getenv(name, default))
+
+    return {
+        "BACKEND": env("STORAGE_BACKEND", "LOCAL").upper(),
+        "OPTIONS": {
+            "content_addressed": env("STORAGE_CONTENT_ADDRESSED", "0") == "1",
+            # S3
+            "bucket": env("AWS_S3_BUCKET") or env("AWS_STORAGE_BUCKET_NAME"),
+            "region": env("AWS_S3_REGION") or env("AWS_DEFAULT_REGION"),
+            "base_path": env("S3_BASE_PATH", "uploads"),
+            "public_base_url": env("S3_PUBLIC_BASE_URL"),
+            "endpoint_url": env("S3_ENDPOINT_URL"),
+            "presign_expires": int(env("S3_PRESIGN_EXPIRES", "900")),
+            "max_pool_connections": int(env("S3_MAX_POOL_CONNECTIONS", "32")),
+            "max_attempts": int(env("S3_MAX_ATTEMPTS", "5")),
+            "multipart_threshold_mb": int(env("S3_MULTIPART_THRESHOLD_MB", "16")),
+            "multipart_chunk_mb": int(env("S3_MULTIPART_CHUNK_MB", "16")),
+            "max_concurrency": int(env("S3_MAX_CONCURRENCY", "4")),
+            # Cloudinary (credentials come from CLOUDINARY_URL)
+            "folder": env("CLOUDINARY_FOLDER", "halalchicken"),
+        },
+    }
+
+
+STORAGE_BACKENDS = {"default": _storage_config()}
+if os.getenv("IMAGES_STORAGE_BACKEND"):
+    STORAGE_BACKENDS["images"] = _storage_config("IMAGES_")
+# Exports hold customer data: always presigned, never on the public URL base that
+# content-addressed objects of the other backends may be served from
+STORAGE_BACKENDS["exports"] = _storage_config("EXPORTS_")
+STORAGE_BACKENDS["exports"]["OPTIONS"]["public_base_url"] = ""
+
+# Product images: uploads staged here for the worker (shared with it), variant widths/formats
+IMAGE_SPOOL_DIR = Path(os.getenv("IMAGE_SPOOL_DIR", str(BASE_DIR / "var" / "images")))
+IMAGE_VARIANT_WIDTHS = [int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1024").split(",") if w.strip()]
+IMAGE_VARIANT_FORMATS = [f.strip().lower() for f in os.getenv("IMAGE_VARIANT_FORMATS", "avif,webp,jpeg").split(",") if f.strip()]
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+# Staged images no task picked up (rolled-back saves) are removed after this many seconds
+IMAGE_SPOOL_MAX_AGE = int(os.getenv("IMAGE_SPOOL_MAX_AGE", "86400"))
+
+# Cache: Redis (separate DB from the Celery broker) in deployments, LocMem for tests
+CACHE_BACKEND = os.getenv(
+    "CACHE_BACKEND", "locmem" if os.getenv("USE_SQLITE_FOR_TESTS") == "1" else "redis"
+).lower()
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_URL", "redis://localhost:6379/1"),
+            "KEY_PREFIX": "hc",
+            "TIMEOUT": 300,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "halalchicken",
+        }
+    }
+
+# Throttle counters: "redis" (sliding windows shared by all workers, see shop.throttling)
+# or "cache" (DRF's per-cache history); Redis is skipped for THROTTLE_REDIS_RETRY seconds after an error
+THROTTLE_STORE = os.getenv("THROTTLE_STORE", "redis" if CACHE_BACKEND == "redis" else "cache").lower()
+THROTTLE_REDIS_RETRY = float(os.getenv("THROTTLE_REDIS_RETRY", "5"))
+
+# Public catalog response cache (entries are evicted by model signals, see shop.signals)
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", "3600"))
+
+# Redis used directly for data structures (not through the cache API); defaults to the cache DB
+REDIS_DATA_URL = os.getenv("REDIS_DATA_URL", os.getenv("CACHE_URL", "redis://localhost:6379/1"))
+
+# Anonymous carts: "db" (SessionCart tables) or "redis" (hashes expiring after GUEST_CART_TTL seconds)
+GUEST_CART_STORE = os.getenv("GUEST_CART_STORE", "db").lower()
+GUEST_CART_TTL = int(os.getenv("GUEST_CART_TTL", str(7 * 24 * 3600)))
 
 # Logging with request-id correlation
 LOGGING = {
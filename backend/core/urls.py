@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.http import JsonResponse
-from django.urls import include, path
+from django.urls import include, path, re_path
+from django.views.decorators.cache import cache_control
+from django.views.static import serve
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
@@ -23,4 +25,12 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
+    # Content-addressed uploads (shop.storage) never change: let browsers keep them
+    urlpatterns += [
+        re_path(
+            rf"^{settings.MEDIA_URL.strip('/')}/files/cas/(?P<path>.*)$",
+            cache_control(public=True, max_age=365 * 24 * 3600, immutable=True)(serve),
+            {"document_root": settings.MEDIA_ROOT / "files" / "cas"},
+        ),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,60 @@
+"""
+Gunicorn configuration for serving the API in production.
+
+    gunicorn -c gunicorn.conf.py
+
+GUNICORN_WORKER_CLASS selects how requests are served:
+
+- ``gthread`` (default): WSGI, each worker runs GUNICORN_THREADS threads, so
+  requests that wait on PostgreSQL, Redis or Telegram do not block the worker.
+- ``sync``: WSGI, one request per worker at a time.
+- ``uvicorn``: ASGI (core.asgi) through uvicorn workers.
+
+Worker counts default to the number of CPU cores available to the container:
+``2 * cores + 1`` for sync workers, and ``cores + 1`` for thread and event
+loop based workers, which get their concurrency from threads or the loop.
+Send SIGHUP to the master to reload the code gracefully (new workers start
+before the old ones finish their requests).
+"""
+import multiprocessing
+import os
+
+
+def _cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        return multiprocessing.cpu_count()
+
+
+_worker_kind = os.getenv("GUNICORN_WORKER_CLASS", "gthread").lower()
+_default_workers = 2 * _cores() + 1 if _worker_kind == "sync" else _cores() + 1
+
+if _worker_kind == "uvicorn":
+    wsgi_app = "core.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "core.wsgi:application"
+    worker_class = _worker_kind
+    threads = int(os.getenv("GUNICORN_THREADS", "4")) if _worker_kind == "gthread" else 1
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS") or _default_workers)
+
+# Reuse client connections (the frontend proxy keeps them open)
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# Recycle workers now and then to bound memory growth; jitter avoids restarting all at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+# Heartbeat files in memory, not on the container's overlay filesystem
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+# Trust X-Forwarded-* from the reverse proxy in front of the container
+forwarded_allow_ips = os.getenv("GUNICORN_FORWARDED_ALLOW_IPS", "127.0.0.1")
@@ -0,0 +1,180 @@
+"""
+JWT authentication without a ``shop_user`` lookup per request.
+
+simplejwt's ``JWTAuthentication`` loads the User row on every authenticated
+request, although permissions and most views only read ``id`` and ``role``.
+``SnapshotJWTAuthentication`` resolves ``request.user`` to a ``SnapshotUser``:
+
+- The id, role and user_type come from a short-lived cached snapshot
+  (``AUTH_USER_CACHE_TTL`` seconds). On a miss they come from the ``role`` and
+  ``user_type`` claims embedded at login, and only as a last resort from
+  the database.
+- Any other attribute (password checks, profile fields, ``save()``) loads
+  the full User on first access, once per request.
+
+Claims are only written into the access token issued at login. Refreshed
+access tokens do not inherit them (``ClaimsStrippedRefreshToken``), so a
+claim is trusted for at most one access token lifetime. After that the role
+is read from the snapshot or the database again.
+
+``forget_user`` drops a user's snapshot when their role or ``is_active``
+changes (see ``shop.signals``) or the account is deleted. It also marks
+claims issued before that moment as stale, so tokens minted with the old
+role fall back to the database. If that cannot be recorded, it raises
+``RevocationFailed`` so the change is refused rather than left revocable
+only by token expiry. Other cache errors are logged and resolve the user
+from the database.
+"""
+from __future__ import annotations
+
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "authuser:"
+# Seconds since the epoch when the claims were written; compared with forget_user's mark
+CLAIMS_ISSUED_AT = "claims_iat"
+CLAIM_FIELDS = ("role", "user_type")
+
+
+def _snapshot_key(user_id) -> str:
+    return f"{KEY_PREFIX}{user_id}"
+
+
+def _changed_key(user_id) -> str:
+    return f"{KEY_PREFIX}{user_id}:changed"
+
+
+def add_user_claims(token, user) -> None:
+    """Embed the fields a ``SnapshotUser`` needs in a freshly issued token."""
+    for name in CLAIM_FIELDS:
+        token[name] = getattr(user, name)
+    token[CLAIMS_ISSUED_AT] = int(time.time())
+
+
+class RevocationFailed(APIException):
+    status_code = 503
+    default_detail = "Could not revoke the user's existing sessions; try again."
+    default_code = "revocation_failed"
+
+
+class ClaimsStrippedRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry no role claims; they resolve the user again."""
+
+    no_copy_claims = (*RefreshToken.no_copy_claims, *CLAIM_FIELDS, CLAIMS_ISSUED_AT)
+
+
+def forget_user(user_id) -> None:
+    """
+    Drop a user's cached snapshot and distrust the claims in tokens issued so far.
+
+    Raises ``RevocationFailed`` when the cache cannot record it; call it inside
+    the transaction making the change so that change is rolled back.
+    """
+    try:
+        cache.delete(_snapshot_key(user_id))
+        # Claims only live in access tokens issued at login (see ClaimsStrippedRefreshToken)
+        cache.set(
+            _changed_key(user_id),
+            int(time.time()),
+            timeout=int(settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"].total_seconds()),
+        )
+    except Exception as e:
+        logger.error("Failed to invalidate user snapshot %s: %s", user_id, e)
+        raise RevocationFailed() from e
+
+
+class SnapshotUser(SimpleLazyObject):
+    """
+    An authenticated user known by id, role and user_type only.
+
+    Those attributes are answered from the snapshot. Anything else loads the
+    User and proxies to it, so the object still passes ``isinstance`` checks,
+    can be saved and can be assigned to foreign keys (at the cost of that load).
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __bool__(self):
+        # SimpleLazyObject would load the User to answer ``bool(request.user)``
+        return True
+
+    def __init__(self, user_id, snapshot: dict):
+        self.__dict__["_snapshot"] = {"id": user_id, **snapshot}
+        super().__init__(lambda: get_user_model().objects.get(pk=user_id))
+
+    def _field(self, name):
+        if self._wrapped is not empty:
+            return getattr(self._wrapped, name)
+        return self._snapshot[name]
+
+    id = property(lambda self: self._field("id"))
+    pk = property(lambda self: self._field("id"))
+    role = property(lambda self: self._field("role"))
+    user_type = property(lambda self: self._field("user_type"))
+    is_active = property(lambda self: self._field("is_active"))
+
+
+class SnapshotJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` resolving ``request.user`` from claims or the cache."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+        # Newer simplejwt versions write the id claim as a string
+        user_id = get_user_model()._meta.get_field(jwt_settings.USER_ID_FIELD).to_python(user_id)
+
+        snapshot = self._cached(validated_token, user_id)
+        if snapshot is None:
+            snapshot = self._load(user_id)
+        if not snapshot["is_active"]:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return SnapshotUser(user_id, snapshot)
+
+    def _cached(self, token, user_id) -> dict | None:
+        snapshot_key, changed_key = _snapshot_key(user_id), _changed_key(user_id)
+        try:
+            values = cache.get_many([snapshot_key, changed_key])
+        except Exception as e:
+            logger.warning("User snapshot cache unavailable: %s", e)
+            return None
+        if snapshot_key in values:
+            return values[snapshot_key]
+        issued_at = token.get(CLAIMS_ISSUED_AT)
+        if issued_at is None or any(name not in token for name in CLAIM_FIELDS):
+            return None
+        changed = values.get(changed_key)
+        if changed is not None and issued_at <= changed:
+            return None
+        snapshot = {name: token[name] for name in CLAIM_FIELDS}
+        snapshot["is_active"] = True
+        return snapshot
+
+    def _load(self, user_id) -> dict:
+        row = (
+            get_user_model()
+            .objects.filter(**{jwt_settings.USER_ID_FIELD: user_id})
+            .values("role", "user_type", "is_active")
+            .first()
+        )
+        if row is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        try:
+            cache.set(_snapshot_key(user_id), row, timeout=settings.AUTH_USER_CACHE_TTL)
+        except Exception as e:
+            logger.warning("User snapshot cache write failed: %s", e)
+        return row
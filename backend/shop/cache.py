@@ -0,0 +1,144 @@
+"""
+Shared response cache for the public catalog endpoints.
+
+Cached entries are namespaced by a catalog version that is bumped whenever a
+Product, Category or Supplier is saved or deleted (see ``shop.signals``), so
+invalidation is a single key write and never needs a key scan. The same
+version backs the ETag/Last-Modified of catalog responses, so a client
+revalidating an unchanged list gets a 304 without a cache read. Cache errors
+are logged and treated as misses: the catalog must keep working without Redis.
+"""
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.translation import get_language_from_request
+from rest_framework.response import Response
+
+from .conditional import make_etag, not_modified, set_validators
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "catalog:version"
+HITS_KEY = "catalog:stats:hits"
+MISSES_KEY = "catalog:stats:misses"
+
+
+def _new_version() -> int:
+    # Microsecond timestamps never repeat a previous version, even after the
+    # version key itself has been evicted or the cache flushed.
+    return time.time_ns() // 1000
+
+
+def catalog_version() -> int:
+    """Return the current catalog version, initialising it if missing."""
+    try:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, _new_version(), timeout=None)
+            version = cache.get(VERSION_KEY)
+        return int(version)
+    except Exception as e:
+        logger.warning("Catalog cache unavailable: %s", e)
+        return 0
+
+
+def version_datetime(version: int) -> datetime:
+    """When the catalog last changed (versions are microsecond timestamps)."""
+    return datetime.fromtimestamp(version / 1_000_000, tz=dt_timezone.utc)
+
+
+def invalidate_catalog_cache() -> None:
+    """Evict every cached catalog response by moving to a new version."""
+    try:
+        cache.set(VERSION_KEY, _new_version(), timeout=None)
+    except Exception as e:
+        logger.warning("Failed to invalidate catalog cache: %s", e)
+
+
+def _incr(key: str) -> None:
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Counter missing (first use or evicted)
+            cache.add(key, 1, timeout=None)
+    except Exception as e:
+        logger.debug("Failed to update catalog cache counter %s: %s", key, e)
+
+
+def catalog_cache_stats() -> dict:
+    """Return hit/miss counters for the catalog cache."""
+    try:
+        values = cache.get_many([HITS_KEY, MISSES_KEY])
+    except Exception:
+        values = {}
+    hits = int(values.get(HITS_KEY) or 0)
+    misses = int(values.get(MISSES_KEY) or 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+        "version": catalog_version(),
+    }
+
+
+def catalog_cache_key(request, version: int) -> str:
+    """Build a cache key from host, path, normalised query string and language."""
+    query = "&".join(
+        f"{k}={v}" for k, values in sorted(request.GET.lists()) for v in sorted(values)
+    )
+    lang = get_language_from_request(request)
+    raw = f"{request.get_host()}|{request.path}|{query}|{lang}"
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f"catalog:v{version}:{digest}"
+
+
+class CatalogCacheMixin:
+    """Serve ``list``/``retrieve`` of a catalog viewset from the shared cache."""
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, super().retrieve, *args, **kwargs)
+
+    def _cached_response(self, request, handler, *args, **kwargs):
+        version = catalog_version()
+        key = catalog_cache_key(request, version)
+        # The version is the time of the last catalog write, and the key covers
+        # the query and language, so they validate the response without reading it
+        etag, last_modified = None, None
+        if version:
+            etag, last_modified = make_etag(key), version_datetime(version)
+            response = not_modified(request, etag, last_modified, vary=["Accept-Language"])
+            if response is not None:
+                return response
+        try:
+            data = cache.get(key)
+        except Exception as e:
+            logger.warning("Catalog cache read failed: %s", e)
+            data = None
+
+        if data is not None:
+            _incr(HITS_KEY)
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+        else:
+            _incr(MISSES_KEY)
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                try:
+                    cache.set(key, response.data, timeout=settings.CATALOG_CACHE_TIMEOUT)
+                except Exception as e:
+                    logger.warning("Catalog cache write failed: %s", e)
+            response["X-Cache"] = "MISS"
+        patch_vary_headers(response, ["Accept-Language"])
+        if etag and response.status_code == 200:
+            set_validators(response, etag, last_modified)
+        return response
@@ -0,0 +1,46 @@
+"""
+Conditional GET helpers (ETag / Last-Modified, 304 Not Modified).
+
+Views derive a validator from cheap state (the catalog version, or the latest
+``updated_at`` of the rows a response covers) *before* querying and
+serializing the full response. ``not_modified`` answers
+If-None-Match/If-Modified-Since from that validator using Django's own
+precedence rules. ``set_validators`` stamps the same validator on the full
+response, so the client can revalidate next time.
+"""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the given parts (anything with a stable ``str``)."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def _timestamp(last_modified: datetime | None) -> int | None:
+    return int(last_modified.timestamp()) if last_modified is not None else None
+
+
+def not_modified(request, etag: str, last_modified: datetime | None = None, vary=()):
+    """Return a 304 (or 412 for a failed If-Match) if the request is conditional and matches, else None."""
+    if not (request.headers.get("If-None-Match") or request.headers.get("If-Modified-Since")):
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=_timestamp(last_modified))
+    if response is not None:
+        set_validators(response, etag, last_modified, vary)
+    return response
+
+
+def set_validators(response, etag: str, last_modified: datetime | None = None, vary=()):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(_timestamp(last_modified))
+    if vary:
+        patch_vary_headers(response, vary)
+    return response
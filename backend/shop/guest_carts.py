@@ -0,0 +1,159 @@
+"""
+Storage for anonymous (guest) carts.
+
+Guest carts are keyed by the client's session id (X-Session-ID header, or an
+existing Django session). ``GUEST_CART_STORE`` selects where they live:
+
+- ``db``: SessionCart/SessionCartItem rows, expired by ``clean_expired_carts``.
+- ``redis``: one hash per cart (product id -> quantity) with a TTL refreshed
+  on every write, so anonymous visitors cause no database writes and expired
+  carts need no cleanup.
+
+Either way the guest cart is merged into the user's persistent Cart at login.
+"""
+from __future__ import annotations
+
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Cart, SessionCart, SessionCartItem
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GuestCartLine:
+    id: int
+    product_id: int
+    quantity: Decimal
+    created_at: datetime | None
+
+
+@dataclass
+class GuestCart:
+    id: int | None
+    created_at: datetime | None
+    lines: list[GuestCartLine] = field(default_factory=list)
+
+
+class DatabaseGuestCartStore:
+    """Guest carts in the SessionCart/SessionCartItem tables."""
+
+    def load(self, session_key: str) -> GuestCart | None:
+        cart = (
+            SessionCart.objects.filter(session_key=session_key)
+            .prefetch_related(Prefetch("items", queryset=SessionCartItem.objects.order_by("id")))
+            .first()
+        )
+        if cart is None:
+            return None
+        lines = [GuestCartLine(it.id, it.product_id, it.quantity, it.created_at) for it in cart.items.all()]
+        return GuestCart(cart.id, cart.created_at, lines)
+
+    def set_quantity(self, session_key: str, product_id: int, quantity: Decimal) -> None:
+        cart, _ = SessionCart.objects.get_or_create(session_key=session_key)
+        SessionCartItem.objects.update_or_create(cart=cart, product_id=product_id, defaults={"quantity": quantity})
+
+    def remove(self, session_key: str, product_id: int) -> None:
+        SessionCartItem.objects.filter(cart__session_key=session_key, product_id=product_id).delete()
+
+    def merge_into(self, user, session_key: str) -> int:
+        return Cart.merge_session_cart(user, session_key)
+
+
+class RedisGuestCartStore:
+    """Guest carts as Redis hashes: product id -> quantity, plus a creation timestamp."""
+
+    KEY_PREFIX = "guestcart:"
+    CREATED_FIELD = "created_at"
+
+    def __init__(self, client, ttl: int):
+        self.client = client
+        self.ttl = ttl
+
+    def _key(self, session_key: str) -> str:
+        return f"{self.KEY_PREFIX}{session_key}"
+
+    def load(self, session_key: str) -> GuestCart | None:
+        data = self.client.hgetall(self._key(session_key))
+        if not data:
+            return None
+        created_at = parse_datetime(data.pop(self.CREATED_FIELD, "") or "")
+        # Lines have no row id; the product id is unique within a cart
+        lines = [
+            GuestCartLine(int(pid), int(pid), Decimal(qty), created_at)
+            for pid, qty in sorted(data.items(), key=lambda kv: int(kv[0]))
+        ]
+        return GuestCart(None, created_at, lines)
+
+    def set_quantity(self, session_key: str, product_id: int, quantity: Decimal) -> None:
+        key = self._key(session_key)
+        pipe = self.client.pipeline()
+        pipe.hsetnx(key, self.CREATED_FIELD, timezone.now().isoformat())
+        pipe.hset(key, str(product_id), str(quantity))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def remove(self, session_key: str, product_id: int) -> None:
+        key = self._key(session_key)
+        pipe = self.client.pipeline()
+        pipe.hdel(key, str(product_id))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def merge_into(self, user, session_key: str) -> int:
+        from redis.exceptions import ResponseError
+
+        key = self._key(session_key)
+        # Claim the cart by renaming it, so concurrent logins cannot merge it twice.
+        # The claimed copy keeps the TTL and is only deleted once the merge is committed.
+        claimed = f"{key}:merging:{uuid.uuid4().hex}"
+        try:
+            self.client.rename(key, claimed)
+        except ResponseError:  # no such key: no guest cart
+            return 0
+        data = self.client.hgetall(claimed)
+        data.pop(self.CREATED_FIELD, None)
+        try:
+            quantities = {int(pid): Decimal(qty) for pid, qty in data.items()}
+            merged = Cart.add_quantities(user, quantities) if quantities else 0
+        except Exception:
+            self._restore(claimed, key)
+            raise
+        transaction.on_commit(lambda: self._discard(claimed))
+        return merged
+
+    def _restore(self, claimed: str, key: str) -> None:
+        """Give a claimed cart back after a failed merge, for the next attempt."""
+        try:
+            if not self.client.renamenx(claimed, key):
+                # The visitor started a new guest cart meanwhile: keep its quantities
+                for name, value in self.client.hgetall(claimed).items():
+                    self.client.hsetnx(key, name, value)
+                self.client.delete(claimed)
+        except Exception as e:
+            logger.warning("Failed to restore guest cart %s: %s", key, e)
+
+    def _discard(self, claimed: str) -> None:
+        try:
+            self.client.delete(claimed)
+        except Exception as e:
+            # Expires with the guest cart TTL
+            logger.warning("Failed to delete merged guest cart %s: %s", claimed, e)
+
+
+def get_guest_cart_store() -> DatabaseGuestCartStore | RedisGuestCartStore:
+    if settings.GUEST_CART_STORE == "redis":
+        from .redis_client import get_redis
+
+        return RedisGuestCartStore(get_redis(), settings.GUEST_CART_TTL)
+    return DatabaseGuestCartStore()
@@ -0,0 +1,177 @@
+"""
+Responsive variants of product images.
+
+``ProductSerializer`` stores the uploaded original as before and stages a
+copy in ``IMAGE_SPOOL_DIR`` (shared between the API and the workers). Once
+the product is committed, ``process_product_image_task`` renders that copy
+at each width in ``IMAGE_VARIANT_WIDTHS`` and in each format in
+``IMAGE_VARIANT_FORMATS`` that the installed Pillow can encode. It also
+re-encodes a full-size copy, which replaces ``image_url``. Orientation is
+applied before resizing and no EXIF data is written, so camera metadata
+(GPS position included) never reaches the storefront.
+
+Results go through the configured ``StorageBackend`` and are recorded on
+``Product.image_variants`` as ``{format: {width: url}}``, which the
+serializer exposes as ``srcset`` strings. The product is only updated if its
+``image_url`` is still the one that was processed, so a newer upload is
+never overwritten by a slower, older task.
+
+A staged copy is removed once processed, or when the product save or the
+enqueue fails. Copies left behind by a rolled-back transaction (which never
+runs its on-commit hooks) are swept by ``sweep_staged_images_task`` after
+``IMAGE_SPOOL_MAX_AGE`` seconds.
+"""
+from __future__ import annotations
+
+import io
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_catalog_cache
+from .models import Product
+from .storage import get_storage
+
+try:  # pragma: no cover - Pillow is only needed by the worker
+    from PIL import Image, ImageOps, UnidentifiedImageError, features  # type: ignore
+except Exception:  # pragma: no cover
+    Image = None  # type: ignore
+    ImageOps = None  # type: ignore
+    features = None  # type: ignore
+
+    class UnidentifiedImageError(OSError):  # type: ignore[no-redef]
+        pass
+
+# format -> (Pillow encoder, file suffix, content type)
+FORMATS = {
+    "avif": ("AVIF", "avif", "image/avif"),
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+    "png": ("PNG", "png", "image/png"),
+}
+
+
+def stage_image(data: bytes, filename: str) -> str:
+    """Write an uploaded image into the spool directory; returns its reference."""
+    spool = Path(settings.IMAGE_SPOOL_DIR)
+    spool.mkdir(parents=True, exist_ok=True)
+    ref = f"{uuid.uuid4().hex}{Path(filename).suffix.lower()}"
+    (spool / ref).write_bytes(data)
+    return ref
+
+
+def _staged_path(ref: str) -> Path:
+    # References are bare file names generated by stage_image
+    if not ref or os.path.basename(ref) != ref:
+        raise ValueError(f"Invalid staged image reference: {ref!r}")
+    return Path(settings.IMAGE_SPOOL_DIR) / ref
+
+
+def discard_staged(ref: str) -> None:
+    try:
+        _staged_path(ref).unlink(missing_ok=True)
+    except ValueError:
+        pass
+
+
+def sweep_staged(max_age: float) -> int:
+    """Remove staged images older than ``max_age`` seconds; returns how many."""
+    spool = Path(settings.IMAGE_SPOOL_DIR)
+    if not spool.is_dir():
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in spool.iterdir():
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            # Picked up by a worker meanwhile
+            pass
+    return removed
+
+
+def _supported(fmt: str) -> bool:
+    if fmt not in FORMATS:
+        return False
+    encoder = FORMATS[fmt][0]
+    if encoder in ("WEBP", "AVIF"):
+        return bool(features.check(encoder.lower()))
+    return True
+
+
+def _encode(img, fmt: str) -> bytes:
+    encoder = FORMATS[fmt][0]
+    if encoder == "JPEG" and img.mode != "RGB":
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    options = {} if encoder == "PNG" else {"quality": settings.IMAGE_VARIANT_QUALITY}
+    # No exif= argument: the output carries no EXIF block
+    img.save(buf, encoder, optimize=encoder in ("JPEG", "PNG"), **options)
+    return buf.getvalue()
+
+
+def render_variants(fh: BinaryIO, stem: str, storage=None) -> tuple[str, dict[str, dict[str, str]]]:
+    """
+    Store a stripped full-size copy and every configured variant of an image.
+
+    Returns the full-size URL and ``{format: {width: url}}``. Widths at or
+    above the original width are skipped; images are never upscaled.
+    """
+    if Image is None:  # pragma: no cover
+        raise RuntimeError("Pillow is required for image processing")
+    storage = storage or get_storage("images")
+    with Image.open(fh) as source:
+        original_format = (source.format or "JPEG").lower()
+        img = ImageOps.exif_transpose(source)
+        img.load()
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+
+    full_fmt = original_format if original_format in FORMATS else "jpeg"
+    _, suffix, content_type = FORMATS[full_fmt]
+    full_url = storage.save_bytes(_encode(img, full_fmt), f"{stem}.{suffix}", content_type)
+
+    widths = sorted(w for w in settings.IMAGE_VARIANT_WIDTHS if w < img.width)
+    variants: dict[str, dict[str, str]] = {}
+    for width in widths:
+        resized = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+        for fmt in settings.IMAGE_VARIANT_FORMATS:
+            if not _supported(fmt):
+                continue
+            _, suffix, content_type = FORMATS[fmt]
+            url = storage.save_bytes(_encode(resized, fmt), f"{stem}_{width}w.{suffix}", content_type)
+            variants.setdefault(fmt, {})[str(width)] = url
+    return full_url, variants
+
+
+def process_product_image(product_id: int, ref: str, image_url: str) -> bool:
+    """Render variants for a staged upload and attach them to the product; True if applied."""
+    try:
+        with open(_staged_path(ref), "rb") as fh:
+            full_url, variants = render_variants(fh, f"product_{product_id}")
+    finally:
+        discard_staged(ref)
+    updated = Product.objects.filter(pk=product_id, image_url=image_url).update(
+        image_url=full_url, image_variants=variants, updated_at=timezone.now()
+    )
+    if updated:
+        # Queryset updates send no signals
+        transaction.on_commit(invalidate_catalog_cache)
+    return bool(updated)
+
+
+def srcset(variants: dict[str, dict[str, str]]) -> dict[str, str]:
+    """``{format: "url 320w, url 640w"}`` for the ``<picture>``/``srcset`` markup."""
+    return {
+        fmt: ", ".join(f"{by_width[w]} {w}w" for w in sorted(by_width, key=int))
+        for fmt, by_width in variants.items()
+        if by_width
+    }
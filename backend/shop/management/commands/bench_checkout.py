@@ -0,0 +1,82 @@
+"""
+Benchmark checkout (POST /api/orders/) across cart sizes.
+
+Usage:
+    python manage.py bench_checkout --sizes 1,10,40,80 --repeats 30
+
+Everything runs inside a transaction that is rolled back at the end, so the
+command is safe to run against a development database. Query counts include
+the SAVEPOINT/RELEASE pair of the view's nested atomic block.
+"""
+import statistics
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from shop.models import Cart, CartItem, Category, Product, Supplier
+from shop.views import OrderViewSet
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+class Command(BaseCommand):
+    help = "Measure query count and latency of checkout for several cart sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1,10,40,80", help="Comma-separated cart sizes")
+        parser.add_argument("--repeats", type=int, default=20, help="Checkouts per cart size")
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+        repeats = options["repeats"]
+        factory = APIRequestFactory()
+        view = OrderViewSet.as_view({"post": "create"})
+
+        self.stdout.write(f"{'lines':>6} {'queries':>8} {'p50 ms':>9} {'p95 ms':>9}")
+        with transaction.atomic():
+            User = get_user_model()
+            user = User.objects.create_user(username="bench_checkout_user", password="x")
+            cat = Category.objects.create(name_uz="Bench", name_ru="Bench")
+            sup = Supplier.objects.create(name="Bench")
+            products = Product.objects.bulk_create(
+                [
+                    Product(name_uz=f"Bench {i}", name_ru=f"Bench {i}", category=cat, supplier=sup)
+                    for i in range(max(sizes))
+                ]
+            )
+            cart = Cart.objects.create(user=user)
+
+            # Throttling would cap the benchmark at a handful of checkouts per minute
+            with mock.patch.object(OrderViewSet, "get_throttles", return_value=[]):
+                for size in sizes:
+                    timings: list[float] = []
+                    queries = 0
+                    for _ in range(repeats):
+                        CartItem.objects.bulk_create(
+                            [CartItem(cart=cart, product=p, quantity=Decimal("2.50")) for p in products[:size]]
+                        )
+                        request = factory.post("/api/orders/")
+                        force_authenticate(request, user=user)
+                        with CaptureQueriesContext(connection) as ctx:
+                            start = time.perf_counter()
+                            response = view(request)
+                            timings.append((time.perf_counter() - start) * 1000)
+                        if response.status_code != 201:
+                            raise RuntimeError(f"Checkout failed: {response.status_code} {response.data}")
+                        queries = len(ctx.captured_queries)
+                    self.stdout.write(
+                        f"{size:>6} {queries:>8} {statistics.median(timings):>9.2f} "
+                        f"{_percentile(timings, 95):>9.2f}"
+                    )
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("Benchmark finished (all data rolled back)"))
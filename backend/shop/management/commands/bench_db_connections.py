@@ -0,0 +1,93 @@
+"""
+Benchmark per-request database connection handling.
+
+Usage:
+    python manage.py bench_db_connections --requests 500
+
+Replays the connection lifecycle of a request (or Celery task) many times:
+``close_if_unusable_or_obsolete`` at start and end, as Django's
+request_started/request_finished handlers do, with a single small query in
+between. This runs once for each mode:
+
+- ``per-request``: CONN_MAX_AGE=0, a new connection (TCP + auth) every time
+- ``persistent``: CONN_MAX_AGE with health checks, one connection reused
+- ``pool``: a psycopg pool (PostgreSQL with psycopg[pool] only)
+
+The command prints the latency per request and what each mode saves compared
+with ``per-request``. Every mode uses its own connection built from the
+default database settings, and no data is written.
+"""
+import copy
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+class Command(BaseCommand):
+    help = "Compare request latency with per-request, persistent and pooled database connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Simulated requests per mode")
+
+    def handle(self, *args, **options):
+        base = copy.deepcopy(connections.settings[DEFAULT_DB_ALIAS])
+        base["OPTIONS"].pop("pool", None)
+        modes = {
+            "per-request": {**base, "CONN_MAX_AGE": 0},
+            "persistent": {**base, "CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": True},
+        }
+        if self._pool_available(base):
+            pooled = copy.deepcopy(base)
+            pooled["CONN_MAX_AGE"] = 0
+            pooled["OPTIONS"]["pool"] = {"min_size": 1, "max_size": 4}
+            modes["pool"] = pooled
+        else:
+            self.stdout.write("pool: skipped (needs PostgreSQL and psycopg[pool])")
+
+        self.stdout.write(f"{'mode':<12} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'saved/req ms':>13}")
+        baseline = None
+        for name, settings_dict in modes.items():
+            samples = self._run(settings_dict, options["requests"])
+            mean = statistics.fmean(samples)
+            baseline = mean if baseline is None else baseline
+            self.stdout.write(
+                f"{name:<12} {statistics.median(samples):>8.3f} {_percentile(samples, 95):>8.3f} "
+                f"{mean:>8.3f} {baseline - mean:>13.3f}"
+            )
+
+    def _pool_available(self, settings_dict) -> bool:
+        if "postgresql" not in settings_dict["ENGINE"]:
+            return False
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _run(self, settings_dict, requests: int) -> list[float]:
+        backend = load_backend(settings_dict["ENGINE"])
+        conn = backend.DatabaseWrapper(settings_dict, alias=f"bench_{DEFAULT_DB_ALIAS}")
+        samples = []
+        try:
+            for _ in range(requests):
+                start = time.perf_counter()
+                conn.close_if_unusable_or_obsolete()  # request_started
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                conn.close_if_unusable_or_obsolete()  # request_finished
+                samples.append((time.perf_counter() - start) * 1000)
+        finally:
+            conn.close()
+            if settings_dict["OPTIONS"].get("pool"):
+                conn.close_pool()
+        return samples
@@ -0,0 +1,79 @@
+"""
+Benchmark memory use of the streaming order export.
+
+Usage:
+    python manage.py bench_export --sizes 10000,100000,1000000 --format xlsx
+
+Order items are generated incrementally up to each size and the export is
+written to a temporary file, reporting wall time, output size and the peak
+Python heap (tracemalloc) of the export step alone. Generated data lives in
+a transaction that is rolled back at the end.
+"""
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from shop.models import Category, Order, OrderItem, Product, Supplier
+from shop.tasks import EXPORT_FORMATS, iter_order_export_rows, write_orders_export
+
+ITEMS_PER_ORDER = 50
+BATCH = 5000
+
+
+class Command(BaseCommand):
+    help = "Measure time and peak memory of the order export for growing row counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated order item counts")
+        parser.add_argument("--format", default="xlsx", choices=sorted(EXPORT_FORMATS))
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(s) for s in options["sizes"].split(",") if s.strip())
+        fmt = options["format"]
+
+        self.stdout.write(f"{'items':>10} {'seconds':>9} {'file MB':>9} {'peak heap MB':>13}")
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(username="bench_export_user", password="x")
+            cat = Category.objects.create(name_uz="Bench", name_ru="Bench")
+            sup = Supplier.objects.create(name="Bench")
+            products = Product.objects.bulk_create(
+                [
+                    Product(name_uz=f"Bench {i}", name_ru=f"Bench {i}", category=cat, supplier=sup)
+                    for i in range(ITEMS_PER_ORDER)
+                ]
+            )
+            generated = 0
+            for size in sizes:
+                generated = self._generate(user, products, generated, size)
+                with tempfile.TemporaryFile() as out:
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    write_orders_export(out, iter_order_export_rows({}), fmt)
+                    elapsed = time.perf_counter() - start
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    out.seek(0, 2)
+                    file_mb = out.tell() / 1024 / 1024
+                self.stdout.write(f"{size:>10} {elapsed:>9.1f} {file_mb:>9.1f} {peak / 1024 / 1024:>13.1f}")
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("Benchmark finished (all data rolled back)"))
+
+    def _generate(self, user, products, generated: int, target: int) -> int:
+        while generated < target:
+            orders = Order.objects.bulk_create(
+                [
+                    Order(user=user, order_number=f"BENCH-{generated // ITEMS_PER_ORDER + n}")
+                    for n in range(BATCH // ITEMS_PER_ORDER)
+                ]
+            )
+            OrderItem.objects.bulk_create(
+                [OrderItem(order=o, product=p, quantity=Decimal("1.50")) for o in orders for p in products],
+                batch_size=BATCH,
+            )
+            generated += len(orders) * ITEMS_PER_ORDER
+        return generated
@@ -0,0 +1,143 @@
+"""
+HTTP load benchmark for the product list and cart endpoints.
+
+Usage:
+    # against a server that is already running
+    python manage.py bench_http --url http://127.0.0.1:8000
+
+    # start each serving mode in turn on a local port and compare them
+    python manage.py bench_http --modes runserver,sync,gthread,uvicorn
+
+Each path is loaded by ``--concurrency`` client threads for ``--duration``
+seconds. The threads use keep-alive connections, and the cart requests send
+a per-thread X-Session-ID header. For every mode and path the command prints
+requests per second, p50/p95 latency and the number of errors. The
+gunicorn modes use gunicorn.conf.py with GUNICORN_WORKER_CLASS set to the
+mode, so any GUNICORN_* variables in the environment (workers, threads)
+apply as in production. Only GET requests are sent and nothing is written.
+"""
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = "/api/products/,/api/cart/"
+MODES = ("runserver", "sync", "gthread", "uvicorn")
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+class Command(BaseCommand):
+    help = "Measure requests per second on the product list and cart endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Base URL of a running server")
+        parser.add_argument("--modes", help=f"Comma-separated modes to start locally: {', '.join(MODES)}")
+        parser.add_argument("--port", type=int, default=8765, help="Local port for --modes")
+        parser.add_argument("--paths", default=DEFAULT_PATHS)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per path")
+
+    def handle(self, *args, **options):
+        paths = [p.strip() for p in options["paths"].split(",") if p.strip()]
+        if bool(options["url"]) == bool(options["modes"]):
+            raise CommandError("Pass exactly one of --url or --modes")
+
+        self.stdout.write(f"{'mode':<10} {'path':<18} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        if options["url"]:
+            self._bench("server", options["url"], paths, options)
+            return
+        for mode in [m.strip() for m in options["modes"].split(",") if m.strip()]:
+            if mode not in MODES:
+                raise CommandError(f"Unknown mode {mode!r}; use {', '.join(MODES)}")
+            url = f"http://127.0.0.1:{options['port']}"
+            server = self._start(mode, options["port"])
+            try:
+                self._wait_ready(url, server)
+                self._bench(mode, url, paths, options)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    def _start(self, mode: str, port: int) -> subprocess.Popen:
+        backend_dir = Path(settings.BASE_DIR)
+        env = {**os.environ, "GUNICORN_BIND": f"127.0.0.1:{port}", "GUNICORN_ACCESS_LOG": ""}
+        if mode == "runserver":
+            cmd = [sys.executable, "manage.py", "runserver", "--noreload", f"127.0.0.1:{port}"]
+        else:
+            cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+            env["GUNICORN_WORKER_CLASS"] = mode
+        return subprocess.Popen(cmd, cwd=backend_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def _wait_ready(self, url: str, server: subprocess.Popen, timeout: float = 30.0) -> None:
+        parts = urlsplit(url)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Server exited with code {server.returncode}")
+            try:
+                conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+                conn.request("GET", "/api/healthz/")
+                if conn.getresponse().status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise CommandError(f"Server at {url} did not become healthy within {timeout:.0f}s")
+
+    def _bench(self, mode: str, url: str, paths: list[str], options) -> None:
+        for path in paths:
+            latencies, errors, elapsed = self._load(url, path, options["concurrency"], options["duration"])
+            rps = len(latencies) / elapsed if elapsed else 0.0
+            p50 = statistics.median(latencies) if latencies else 0.0
+            p95 = _percentile(latencies, 95) if latencies else 0.0
+            self.stdout.write(f"{mode:<10} {path:<18} {rps:>9.1f} {p50:>8.2f} {p95:>8.2f} {errors:>7}")
+
+    def _load(self, url: str, path: str, concurrency: int, duration: float):
+        parts = urlsplit(url)
+        latencies: list[float] = []
+        errors = [0]
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def client(n: int) -> None:
+            headers = {"X-Session-ID": f"bench-http-{n}", "Accept": "application/json"}
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+            local, failed = [], 0
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    conn.request("GET", path, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status >= 400:
+                        failed += 1
+                    else:
+                        local.append((time.perf_counter() - start) * 1000)
+                except (OSError, http.client.HTTPException):
+                    failed += 1
+                    conn.close()
+            conn.close()
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return latencies, errors[0], time.monotonic() - started
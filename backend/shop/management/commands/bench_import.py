@@ -0,0 +1,73 @@
+"""
+Benchmark the bulk product import.
+
+Usage:
+    python manage.py bench_import --rows 1000,10000,100000 --batch-size 1000
+
+For each size an XLSX product list is generated in memory (half new products,
+half updates of products from the previous run, spread over 50 categories
+and 20 suppliers) and fed through the import pipeline, reporting wall time
+and the number of SQL queries. Everything runs in a transaction that is
+rolled back at the end.
+"""
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook
+
+from shop.product_import import EXPECTED_HEADER, import_products, iter_workbook_rows
+
+CATEGORIES = 50
+SUPPLIERS = 20
+
+
+def build_workbook(rows: int, offset: int) -> bytes:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(EXPECTED_HEADER)
+    for i in range(rows):
+        n = offset + i
+        ws.append([
+            f"Bench product {n}",
+            f"Bench product RU {n}",
+            f"Bench category {n % CATEGORIES}",
+            f"Bench supplier {n % SUPPLIERS}",
+            "",
+            "Generated by bench_import",
+            1,
+        ])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+class Command(BaseCommand):
+    help = "Measure time and query count of the product import for growing row counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", default="1000,10000,100000", help="Comma-separated row counts")
+        parser.add_argument("--batch-size", type=int, default=None, help="Override IMPORT_BATCH_SIZE")
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["rows"].split(",") if s.strip()]
+
+        self.stdout.write(f"{'rows':>10} {'seconds':>9} {'queries':>9} {'created':>9} {'updated':>9}")
+        with transaction.atomic():
+            offset = 0
+            for size in sizes:
+                # Overlap half of the rows with the previous run so updates are exercised too
+                offset = max(0, offset - size // 2)
+                data = build_workbook(size, offset)
+                offset += size
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    result = import_products(iter_workbook_rows(io.BytesIO(data)), options["batch_size"])
+                    elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{size:>10} {elapsed:>9.1f} {len(queries):>9} {result.created:>9} {result.updated:>9}"
+                )
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("Benchmark finished (all data rolled back)"))
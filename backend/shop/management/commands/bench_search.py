@@ -0,0 +1,83 @@
+"""
+Benchmark product search: icontains SearchFilter vs full-text + trigram.
+
+Usage:
+    python manage.py bench_search --products 100000 --repeat 20
+
+Generates a catalog of synthetic products (rolled back at the end), then
+times the old ``icontains`` predicates and ``shop.search.search_products``
+for a set of queries typed into the search box (prefixes, whole words and
+typos), reporting the median latency and hit count per query. The
+full-text side needs PostgreSQL with migration 0011 applied.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from shop.models import Category, Product, Supplier
+from shop.search import search_enabled, search_products, update_search_vectors
+
+WORDS_UZ = ["tovuq", "go'sht", "qanot", "son", "file", "jigar", "yurak", "bedana", "kurka", "o'rdak"]
+WORDS_RU = ["курица", "мясо", "крылья", "бедро", "филе", "печень", "сердце", "перепел", "индейка", "утка"]
+QUERIES = ["tov", "tovuq", "tovqu", "kurka son", "курица", "курицы", "филе", "bedan"]
+
+
+class Command(BaseCommand):
+    help = "Compare icontains and full-text/trigram product search latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            raise CommandError("bench_search needs PostgreSQL (full-text and trigram search)")
+        rng = random.Random(42)
+        with transaction.atomic():
+            cat = Category.objects.create(name_uz="Bench", name_ru="Bench")
+            sup = Supplier.objects.create(name="Bench")
+            batch = []
+            for i in range(options["products"]):
+                k = rng.randrange(len(WORDS_UZ))
+                j = rng.randrange(len(WORDS_UZ))
+                batch.append(
+                    Product(
+                        name_uz=f"{WORDS_UZ[k]} {WORDS_UZ[j]} {i}",
+                        name_ru=f"{WORDS_RU[k]} {WORDS_RU[j]} {i}",
+                        description=f"Partiya {i}: {WORDS_UZ[j]}, {WORDS_RU[k]}",
+                        category=cat,
+                        supplier=sup,
+                    )
+                )
+                if len(batch) == 5000:
+                    Product.objects.bulk_create(batch)
+                    batch = []
+            Product.objects.bulk_create(batch)
+            update_search_vectors(Product.objects.filter(category=cat))
+            with transaction.get_connection().cursor() as cursor:
+                cursor.execute("ANALYZE shop_product")
+
+            base = Product.objects.filter(category=cat, status=True)
+            self.stdout.write(f"{'query':<12} {'icontains ms':>13} {'hits':>7} {'fts ms':>8} {'hits':>7}")
+            for q in QUERIES:
+                old = base.filter(Q(name_uz__icontains=q) | Q(name_ru__icontains=q) | Q(description__icontains=q))
+                new = search_products(base, q)
+                old_ms, old_hits = self._time(old, options["repeat"])
+                new_ms, new_hits = self._time(new, options["repeat"])
+                self.stdout.write(f"{q:<12} {old_ms:>13.1f} {old_hits:>7} {new_ms:>8.1f} {new_hits:>7}")
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("Benchmark finished (all data rolled back)"))
+
+    def _time(self, qs, repeat: int) -> tuple[float, int]:
+        # What the list endpoint does: count + first page
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            hits = qs.count()
+            list(qs[:20])
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), hits
@@ -1,14 +1,23 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from shop.models import SessionCart
+
+from shop.tasks import purge_expired_session_carts
 
 
 class Command(BaseCommand):
-    help = "Delete expired session carts"
+    help = "Delete expired session carts (in batches; also scheduled through Celery beat)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Carts per batch")
+        parser.add_argument("--pause", type=float, default=None, help="Seconds to sleep between batches")
+        parser.add_argument("--max-seconds", type=float, default=float("inf"), help="Stop after this many seconds")
 
     def handle(self, *args, **options):
-        cutoff = timezone.now()
-        deleted_count, _ = SessionCart.objects.filter(expires_at__lt=cutoff).delete()
+        stats = purge_expired_session_carts(
+            batch_size=options["batch_size"], pause=options["pause"], max_seconds=options["max_seconds"]
+        )
         self.stdout.write(
-            self.style.SUCCESS(f"Deleted {deleted_count} expired session carts")
+            self.style.SUCCESS(
+                f"Deleted {stats['carts']} expired session carts ({stats['items']} items) "
+                f"in {stats['seconds']}s, {stats['rows_per_second']} rows/s"
+            )
         )
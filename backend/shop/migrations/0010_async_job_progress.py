@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_alter_product_name_ru_alter_product_name_uz'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asyncjob',
+            name='processed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='asyncjob',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='asyncjob',
+            name='total',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:10
+# PostgreSQL-only parts (pg_trgm, GIN indexes, backfill) added manually
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+INDEXES = [
+    ("shop_product_search_vector_gin", "USING gin (search_vector)"),
+    ("shop_product_name_uz_trgm", "USING gin (name_uz gin_trgm_ops)"),
+    ("shop_product_name_ru_trgm", "USING gin (name_ru gin_trgm_ops)"),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, using in INDEXES:
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON shop_product {using}")
+    # Backfill; same expression as shop.search.PRODUCT_SEARCH_VECTOR
+    apps.get_model("shop", "Product").objects.update(
+        search_vector=SearchVector("name_uz", weight="A", config="simple")
+        + SearchVector("name_ru", weight="A", config="russian")
+        + SearchVector("description", weight="C", config="simple")
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_async_job_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0014_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummaryCounter',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField()),
+                ('counted_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SummaryDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=64)),
+                ('delta', models.IntegerField()),
+            ],
+        ),
+    ]
@@ -1,12 +1,34 @@
 from decimal import Decimal
 
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models, transaction
+from django.db import IntegrityError, ProgrammingError, connection, models, transaction
+from django.db.models import F
 from django.utils import timezone
 
 
-class User(AbstractUser):
+class TracksLoadedValues:
+    """
+    Remember the database values of ``tracked_fields`` when an instance is loaded.
+
+    Lets post_save handlers see what a field changed from (``loaded_values``)
+    without re-reading the row. Instances that were not loaded from the
+    database, or were loaded with the field deferred, have no entry for it.
+    """
+
+    tracked_fields: tuple[str, ...] = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.tracked_fields
+        }
+        return instance
+
+
+class User(TracksLoadedValues, AbstractUser):
     class Role(models.TextChoices):
         SUPERADMIN = "SUPERADMIN", "SUPERADMIN"
         ADMIN = "ADMIN", "ADMIN"
@@ -32,6 +54,11 @@ class User(AbstractUser):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    tracked_fields = ("role", "is_active")
+
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(fields=["created_at", "id"], name="shop_user_created_id_idx")]
+
 
 class Category(models.Model):
     name_uz = models.CharField(max_length=255)
@@ -39,6 +66,7 @@ class Category(models.Model):
     order = models.PositiveIntegerField(default=0)
     status = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.name_uz
@@ -55,24 +83,90 @@ class Supplier(models.Model):
         return self.name
 
 
-class Product(models.Model):
+class Product(TracksLoadedValues, models.Model):
     name_uz = models.CharField(max_length=255, blank=True, default='')
     name_ru = models.CharField(max_length=255, blank=True, default='')
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name="products", db_index=True)
     supplier = models.ForeignKey(Supplier, on_delete=models.PROTECT, related_name="products", db_index=True)
     image_url = models.URLField(blank=True)
+    # Resized/re-encoded copies of image_url, {format: {width: url}}; filled in by shop.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True)
     status = models.BooleanField(default=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by shop.search (PostgreSQL only); GIN-indexed in migration 0011
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    tracked_fields = ("status",)
 
     def __str__(self) -> str:
         return self.name_uz or f"Product #{self.id}"
 
+    def save(self, *args, **kwargs):
+        from .search import SEARCH_TEXT_FIELDS, update_search_vectors
+
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or SEARCH_TEXT_FIELDS.intersection(update_fields):
+            update_search_vectors(Product.objects.filter(pk=self.pk))
+
 
 class Cart(models.Model):
     user = models.OneToOneField("User", on_delete=models.CASCADE, related_name="cart")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    @classmethod
+    def merge_session_cart(cls, user, session_key: str) -> int:
+        """
+        Move a guest (session) cart into the user's cart and delete it.
+
+        All lines are merged with one INSERT ... SELECT ... ON CONFLICT upsert;
+        quantities of products already in the user cart are added together.
+        Returns the number of merged lines (0 when there is no session cart, in
+        which case only a single SELECT is made).
+        """
+        session_cart_id = SessionCart.objects.filter(session_key=session_key).values_list("id", flat=True).first()
+        if session_cart_id is None:
+            return 0
+        with transaction.atomic():
+            cart, _ = cls.objects.get_or_create(user=user)
+            target, source = CartItem._meta.db_table, SessionCartItem._meta.db_table
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {target} (cart_id, product_id, quantity, created_at) "
+                    f"SELECT %s, product_id, quantity, %s FROM {source} WHERE cart_id = %s "
+                    f"ON CONFLICT (cart_id, product_id) DO UPDATE SET quantity = {target}.quantity + excluded.quantity",
+                    [cart.pk, timezone.now(), session_cart_id],
+                )
+                merged = cursor.rowcount
+            SessionCart.objects.filter(pk=session_cart_id).delete()
+        return merged
+
+    @classmethod
+    def add_quantities(cls, user, quantities: dict[int, Decimal]) -> int:
+        """
+        Add quantities (product id -> quantity) to the user's cart in one upsert.
+
+        Products that no longer exist are skipped. Returns the number of lines written.
+        """
+        product_ids = sorted(Product.objects.filter(pk__in=quantities).values_list("pk", flat=True))
+        if not product_ids:
+            return 0
+        with transaction.atomic():
+            cart, _ = cls.objects.get_or_create(user=user)
+            now = timezone.now()
+            target = CartItem._meta.db_table
+            values = ", ".join(["(%s, %s, %s, %s)"] * len(product_ids))
+            params = [v for pid in product_ids for v in (cart.pk, pid, quantities[pid], now)]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {target} (cart_id, product_id, quantity, created_at) VALUES {values} "
+                    f"ON CONFLICT (cart_id, product_id) DO UPDATE SET quantity = {target}.quantity + excluded.quantity",
+                    params,
+                )
+        return len(product_ids)
+
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="items")
@@ -100,6 +194,33 @@ class SessionCart(models.Model):
             self.expires_at = timezone.now() + timedelta(days=7)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def purge_expired_batch(cls, cutoff, after_id: int, batch_size: int) -> tuple[int, int, int]:
+        """
+        Delete the next ``batch_size`` carts expired before ``cutoff`` with id > ``after_id``.
+
+        Uses plain set-based DELETEs (items, then carts) in one short
+        transaction instead of Django's collector, so nothing is loaded into
+        memory. Returns (last id seen, carts deleted, items deleted); the last
+        id is 0 when nothing was left.
+        """
+        ids = list(
+            cls.objects.filter(expires_at__lt=cutoff, id__gt=after_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0, 0, 0
+        placeholders = ", ".join(["%s"] * len(ids))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SessionCartItem._meta.db_table} WHERE cart_id IN ({placeholders})", ids
+            )
+            items = cursor.rowcount
+            cursor.execute(f"DELETE FROM {cls._meta.db_table} WHERE id IN ({placeholders})", ids)
+            carts = cursor.rowcount
+        return ids[-1], carts, items
+
 
 class SessionCartItem(models.Model):
     cart = models.ForeignKey(SessionCart, on_delete=models.CASCADE, related_name="items")
@@ -115,7 +236,7 @@ class SessionCartItem(models.Model):
         unique_together = ("cart", "product")
 
 
-class Order(models.Model):
+class Order(TracksLoadedValues, models.Model):
     class Status(models.TextChoices):
         RECEIVED = "Received", "Received"
         CONFIRMED = "Confirmed", "Confirmed"
@@ -127,6 +248,12 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tracked_fields = ("status",)
+
+    class Meta:
+        # Keyset pagination of the admin order table (shop.pagination)
+        indexes = [models.Index(fields=["created_at", "id"], name="shop_order_created_id_idx")]
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
@@ -141,17 +268,108 @@ class OrderItem(models.Model):
 
 
 class OrderNumberSequence(models.Model):
+    """
+    Per-day order number counters (``#YYYYMMDD-NNN``).
+
+    On PostgreSQL the counter comes from a per-day database sequence: ``nextval``
+    never waits for other transactions and is not rolled back, so concurrent
+    checkouts do not queue behind a row lock (a failed checkout leaves a gap).
+    Other databases fall back to an atomic UPDATE of this table, which also
+    seeds the starting value of a newly created PostgreSQL sequence.
+    """
+
+    SEQUENCE_PREFIX = "shop_order_number_"
+
     date = models.DateField(unique=True)
     last_counter = models.PositiveIntegerField(default=0)
 
     @classmethod
     def next_for_today(cls) -> str:
         today = timezone.localdate()
+        if connection.vendor == "postgresql":
+            counter = cls._next_from_sequence(today)
+        else:
+            counter = cls._next_from_table(today)
+        return f"#{today.strftime('%Y%m%d')}-{counter:03d}"
+
+    @classmethod
+    def sequence_name(cls, day) -> str:
+        return f"{cls.SEQUENCE_PREFIX}{day.strftime('%Y%m%d')}"
+
+    @classmethod
+    def _next_from_table(cls, day) -> int:
         with transaction.atomic():
-            seq, _ = cls.objects.select_for_update().get_or_create(date=today)
-            seq.last_counter += 1
-            seq.save(update_fields=["last_counter"])
-            return f"#{today.strftime('%Y%m%d')}-{seq.last_counter:03d}"
+            if not cls.objects.filter(date=day).update(last_counter=F("last_counter") + 1):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(date=day, last_counter=1)
+                    return 1
+                except IntegrityError:
+                    # Another checkout created today's row first
+                    cls.objects.filter(date=day).update(last_counter=F("last_counter") + 1)
+            return cls.objects.filter(date=day).values_list("last_counter", flat=True).get()
+
+    @classmethod
+    def _next_from_sequence(cls, day) -> int:
+        name = cls.sequence_name(day)
+        with connection.cursor() as cursor:
+            try:
+                # Savepoint: a missing sequence must not abort the checkout transaction
+                with transaction.atomic():
+                    cursor.execute("SELECT nextval(%s)", [name])
+                    return cursor.fetchone()[0]
+            except ProgrammingError:
+                pass
+            cls.ensure_sequence(day)
+            cursor.execute("SELECT nextval(%s)", [name])
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def ensure_sequence(cls, day) -> None:
+        """Create the PostgreSQL sequence for ``day``, continuing any table counter."""
+        last = cls.objects.filter(date=day).values_list("last_counter", flat=True).first() or 0
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {cls.sequence_name(day)} START WITH {last + 1}")
+        except IntegrityError:
+            # Concurrent CREATE SEQUENCE for the same day; the other one won
+            pass
+
+    @classmethod
+    def drop_sequences_before(cls, day) -> int:
+        """Drop per-day PostgreSQL sequences older than ``day``; returns how many."""
+        if connection.vendor != "postgresql":
+            return 0
+        keep_from = cls.sequence_name(day)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname FROM pg_class WHERE relkind = 'S' AND starts_with(relname, %s) AND relname < %s",
+                [cls.SEQUENCE_PREFIX, keep_from],
+            )
+            names = [row[0] for row in cursor.fetchall()]
+            for name in names:
+                cursor.execute(f"DROP SEQUENCE IF EXISTS {name}")
+        return len(names)
+
+
+class SummaryCounter(models.Model):
+    """Last recounted value of an admin dashboard counter (see shop.summary)."""
+
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField()
+    counted_at = models.DateTimeField(auto_now=True)
+
+
+class SummaryDelta(models.Model):
+    """
+    A change to a dashboard counter since its last recount.
+
+    Written in the same transaction as the change itself. Rows are only ever
+    inserted (never updated), so concurrent checkouts do not wait on each other.
+    """
+
+    name = models.CharField(max_length=64, db_index=True)
+    delta = models.IntegerField()
 
 
 class AsyncJob(models.Model):
@@ -171,12 +389,25 @@ class AsyncJob(models.Model):
     input_params = models.JSONField(default=dict, blank=True)
     result_url = models.URLField(blank=True)
     error = models.TextField(blank=True)
+    # Final row counts; live values while running are in the cache (shop.progress)
+    processed = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
     finished_at = models.DateTimeField(null=True, blank=True)
 
+    def _publish(self):
+        from .progress import publish_job_state
+
+        publish_job_state(self.pk, status=self.status)
+
     def mark_running(self):
+        from django.utils import timezone as _tz
+
         self.status = self.Status.RUNNING
-        self.save(update_fields=["status"])
+        self.started_at = _tz.now()
+        self.save(update_fields=["status", "started_at"])
+        self._publish()
 
     def mark_success(self, url: str | None = None):
         from django.utils import timezone as _tz
@@ -186,6 +417,7 @@ class AsyncJob(models.Model):
             self.result_url = url
         self.finished_at = _tz.now()
         self.save(update_fields=["status", "result_url", "finished_at"])
+        self._publish()
 
     def mark_failed(self, err: str):
         from django.utils import timezone as _tz
@@ -194,4 +426,5 @@ class AsyncJob(models.Model):
         self.error = err[:4000]
         self.finished_at = _tz.now()
         self.save(update_fields=["status", "error", "finished_at"])
+        self._publish()
 
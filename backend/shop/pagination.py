@@ -0,0 +1,44 @@
+"""
+Pagination for admin tables.
+
+``CreatedAtPagination`` pages with page numbers by default (``?page=``,
+with a total ``count``). A client that asks for ``?pagination=cursor``, or
+sends back a ``cursor`` from a previous page, gets keyset pagination on
+``(-created_at, -id)``. Each page is then a single indexed range query
+(``created_at < last seen``) with no COUNT(*) and no OFFSET, so the cost
+stays constant however deep the admin table scrolls. Cursor responses
+carry ``next``/``previous`` links and no ``count``.
+"""
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    # Backed by the (created_at, id) composite indexes on Order and User
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class CreatedAtPagination(PageNumberPagination):
+    """Page-number pagination, switchable to keyset pagination per request."""
+
+    mode_query_param = "pagination"
+    cursor_class = CreatedAtCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def use_cursor(self, request) -> bool:
+        params = request.query_params
+        return params.get(self.mode_query_param) == "cursor" or self.cursor_class.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
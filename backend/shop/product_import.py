@@ -0,0 +1,294 @@
+"""
+Set-based product import from the admin XLSX product list.
+
+Rows are parsed in openpyxl read-only mode and validated up front. Valid rows
+are then applied in batches: categories and suppliers are resolved through
+in-memory name -> id maps (missing ones are bulk-created), and products are
+matched by ``name_uz`` and written with ``bulk_create``/``bulk_update``. Each
+batch commits on its own, so catalog writes are never blocked for the whole
+file.
+
+Uploads are staged in ``IMPORT_SPOOL_DIR`` (shared between the API and the
+workers) and only the staged file name travels through the Celery broker.
+Staged files that no task picked up (the enqueue failed, a worker died) are
+swept by ``sweep_staged_imports_task`` after ``IMPORT_SPOOL_MAX_AGE`` seconds.
+"""
+from __future__ import annotations
+
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from .models import Category, Product, Supplier
+from .progress import ProgressReporter
+from .search import update_search_vectors
+
+EXPECTED_HEADER = ["name_uz", "name_ru", "category", "supplier", "image_url", "description", "status"]
+PRODUCT_FIELDS = ["name_ru", "category", "supplier", "image_url", "description", "status"]
+
+
+def _parse_boolean_from_cell(value: Any) -> bool:
+    """
+    Normalize Excel cell value into a strict boolean.
+
+    Accepted inputs:
+    - Python bools
+    - Numeric 1/0 (int, float, Decimal)
+    - Strings: "true"/"false", "1"/"0" (case-insensitive, trimmed)
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        if value == 1:
+            return True
+        if value == 0:
+            return False
+    if isinstance(value, str):
+        normalized = value.strip().lower()
+        if normalized in {"true", "1"}:
+            return True
+        if normalized in {"false", "0"}:
+            return False
+    raise ValueError("Invalid status; must be true/false or 1/0")
+
+
+def stage_upload(upload) -> str:
+    """Stream an uploaded file into the spool directory; returns its reference."""
+    spool = Path(settings.IMPORT_SPOOL_DIR)
+    spool.mkdir(parents=True, exist_ok=True)
+    ref = f"{uuid.uuid4().hex}.xlsx"
+    with open(spool / ref, "wb") as fh:
+        for chunk in upload.chunks():
+            fh.write(chunk)
+    return ref
+
+
+def _staged_path(ref: str) -> Path:
+    # References are bare file names generated by stage_upload
+    if not ref or os.path.basename(ref) != ref:
+        raise ValueError(f"Invalid staged upload reference: {ref!r}")
+    return Path(settings.IMPORT_SPOOL_DIR) / ref
+
+
+def open_staged(ref: str) -> BinaryIO:
+    return open(_staged_path(ref), "rb")
+
+
+def discard_staged(ref: str) -> None:
+    try:
+        _staged_path(ref).unlink(missing_ok=True)
+    except ValueError:
+        pass
+
+
+def sweep_staged(max_age: float) -> int:
+    """Remove staged uploads older than ``max_age`` seconds; returns how many."""
+    spool = Path(settings.IMPORT_SPOOL_DIR)
+    if not spool.is_dir():
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in spool.iterdir():
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            # Picked up by a worker meanwhile
+            pass
+    return removed
+
+
+def _text(value: Any) -> str:
+    return str(value).strip() if value is not None else ""
+
+
+@dataclass
+class ImportResult:
+    # (row, action, message, errors) in file order
+    actions: list[tuple[int, str, str, list[str]]] = field(default_factory=list)
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+
+
+def iter_workbook_rows(fileobj, progress: ProgressReporter | None = None) -> Iterator[tuple]:
+    """Yield data rows (as value tuples) of the first sheet after checking the header."""
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        if progress is not None and ws.max_row:
+            # Taken from the sheet's stored dimensions, so it may include trailing blank rows
+            progress.set_total(ws.max_row - 1)
+        rows = ws.iter_rows(values_only=True)
+        header = list(next(rows, ()))[: len(EXPECTED_HEADER)]
+        if header != EXPECTED_HEADER:
+            raise ValueError(f"Invalid header. Expected {EXPECTED_HEADER}, got {header}")
+        yield from rows
+    finally:
+        wb.close()
+
+
+def _validate(values: tuple) -> tuple[dict[str, Any], list[str]]:
+    # Read-only mode drops trailing empty cells, so pad short rows
+    values = tuple(values) + (None,) * (len(EXPECTED_HEADER) - len(values))
+    name_uz, name_ru, cat_name, sup_name, image_url, description, raw_status = (
+        values[: len(EXPECTED_HEADER)]
+    )
+    errors: list[str] = []
+    data = {
+        "name_uz": _text(name_uz),
+        "name_ru": _text(name_ru),
+        "category": _text(cat_name),
+        "supplier": _text(sup_name),
+        "image_url": _text(image_url),
+        "description": _text(description),
+    }
+    try:
+        data["status"] = _parse_boolean_from_cell(raw_status)
+    except ValueError as exc:
+        errors.append(str(exc))
+    if not data["name_uz"]:
+        errors.append("name_uz required")
+    if not data["name_ru"]:
+        errors.append("name_ru required")
+    if not data["category"]:
+        errors.append("category required")
+    if not data["supplier"]:
+        errors.append("supplier required")
+    return data, errors
+
+
+class _NameResolver:
+    """Name -> id map for a lookup model, creating missing rows in bulk."""
+
+    def __init__(self, model, name_field: str, defaults=None):
+        self.model = model
+        self.name_field = name_field
+        self.defaults = defaults or (lambda name: {})
+        self.ids: dict[str, int] = {}
+
+    def _load(self, names: set[str]) -> None:
+        # Lowest id wins if the table already holds duplicates
+        rows = (
+            self.model.objects.filter(**{f"{self.name_field}__in": names})
+            .order_by("-id")
+            .values_list(self.name_field, "id")
+        )
+        self.ids.update(rows)
+
+    def resolve(self, names: Iterable[str]) -> None:
+        missing = set(names) - self.ids.keys()
+        if not missing:
+            return
+        self._load(missing)
+        missing -= self.ids.keys()
+        if missing:
+            self.model.objects.bulk_create(
+                [self.model(**{self.name_field: n, **self.defaults(n)}) for n in sorted(missing)]
+            )
+            self._load(missing)
+
+
+def import_products(
+    rows: Iterable[tuple], batch_size: int | None = None, progress: ProgressReporter | None = None
+) -> ImportResult:
+    """Validate and apply product rows; returns per-row actions and totals."""
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    result = ImportResult()
+    categories = _NameResolver(Category, "name_uz", lambda name: {"name_ru": name})
+    suppliers = _NameResolver(Supplier, "name")
+    product_ids: dict[str, int] = {}
+
+    batch: list[tuple[int, dict[str, Any]]] = []
+    if progress is not None:
+        rows = progress.track(rows)
+    for idx, values in enumerate(rows, start=2):
+        if not any(v not in (None, "") for v in values):
+            continue  # fully blank line (common at the end of edited sheets)
+        data, errors = _validate(values)
+        if errors:
+            result.actions.append((idx, "skipped", "Validation errors", errors))
+            result.skipped += 1
+            continue
+        batch.append((idx, data))
+        if len(batch) >= batch_size:
+            _apply_batch(batch, categories, suppliers, product_ids, result)
+            batch = []
+    if batch:
+        _apply_batch(batch, categories, suppliers, product_ids, result)
+
+    result.actions.sort(key=lambda a: a[0])
+    return result
+
+
+def _apply_batch(batch, categories, suppliers, product_ids, result: ImportResult) -> None:
+    with transaction.atomic():
+        categories.resolve(d["category"] for _, d in batch)
+        suppliers.resolve(d["supplier"] for _, d in batch)
+
+        names = {d["name_uz"] for _, d in batch} - product_ids.keys()
+        if names:
+            product_ids.update(
+                Product.objects.filter(name_uz__in=names).order_by("-id").values_list("name_uz", "id")
+            )
+
+        # Last row wins when a name repeats; earlier rows become updates of it
+        latest: dict[str, dict[str, Any]] = {}
+        first_row: dict[str, int] = {}
+        for idx, data in batch:
+            latest[data["name_uz"]] = data
+            first_row.setdefault(data["name_uz"], idx)
+
+        def build(name: str, data: dict[str, Any], pk: int | None = None) -> Product:
+            return Product(
+                id=pk,
+                name_uz=name,
+                name_ru=data["name_ru"],
+                category_id=categories.ids[data["category"]],
+                supplier_id=suppliers.ids[data["supplier"]],
+                image_url=data["image_url"],
+                description=data["description"],
+                status=data["status"],
+            )
+
+        new_names = [n for n in latest if n not in product_ids]
+        Product.objects.bulk_create([build(n, latest[n]) for n in new_names])
+        if new_names:
+            product_ids.update(
+                Product.objects.filter(name_uz__in=new_names).order_by("-id").values_list("name_uz", "id")
+            )
+        existing = [build(n, d, product_ids[n]) for n, d in latest.items() if n not in new_names]
+        previous_images = dict(
+            Product.objects.filter(pk__in=[p.id for p in existing]).values_list("id", "image_url")
+        )
+        # bulk_update does not apply auto_now
+        now = timezone.now()
+        for product in existing:
+            product.updated_at = now
+        Product.objects.bulk_update(existing, PRODUCT_FIELDS + ["updated_at"])
+        # Resized variants (shop.images) belong to the image they were made from
+        replaced = [p.id for p in existing if previous_images.get(p.id) != p.image_url]
+        if replaced:
+            Product.objects.filter(pk__in=replaced).update(image_variants={})
+        # Bulk writes bypass Product.save(), so refresh the search vectors here
+        update_search_vectors(Product.objects.filter(pk__in=[product_ids[n] for n in latest]))
+
+    created_names = set(new_names)
+    for idx, data in batch:
+        name = data["name_uz"]
+        pk = product_ids[name]
+        if name in created_names and first_row[name] == idx:
+            result.created += 1
+            result.actions.append((idx, "created", f"Product {pk}", []))
+        else:
+            result.updated += 1
+            result.actions.append((idx, "updated", f"Product {pk}", []))
@@ -0,0 +1,88 @@
+"""
+Progress reporting for long-running AsyncJob tasks.
+
+Workers publish job state (status, processed/total rows) to the cache at a
+bounded rate instead of writing the AsyncJob row for every processed item.
+Each publish stamps a new revision, which the job status endpoint uses to
+long-poll: it answers as soon as the revision differs from the one the
+client already has. The row itself is only written on state transitions and
+once with the final counts. Cache errors are logged and ignored, since
+progress is advisory.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Iterable, Iterator, TypeVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _state_key(job_id) -> str:
+    return f"jobs:state:{job_id}"
+
+
+def publish_job_state(job_id, **state: Any) -> None:
+    """Merge ``state`` into the cached job state and bump its revision."""
+    key = _state_key(job_id)
+    try:
+        current = cache.get(key) or {}
+        current.update(state)
+        current["rev"] = time.time_ns() // 1000
+        cache.set(key, current, timeout=settings.JOB_STATE_TTL)
+    except Exception as e:
+        logger.warning("Failed to publish state of job %s: %s", job_id, e)
+
+
+def job_state(job_id) -> dict[str, Any] | None:
+    try:
+        return cache.get(_state_key(job_id))
+    except Exception as e:
+        logger.warning("Failed to read state of job %s: %s", job_id, e)
+        return None
+
+
+class ProgressReporter:
+    """Counts processed rows for a job and publishes them at most every ``interval`` seconds."""
+
+    def __init__(self, job, total: int | None = None, interval: float | None = None):
+        self.job = job
+        self.total = total
+        self.processed = 0
+        self.interval = settings.JOB_PROGRESS_INTERVAL if interval is None else interval
+        self._last_publish = 0.0
+        if total is not None:
+            self.publish()
+
+    def set_total(self, total: int | None) -> None:
+        self.total = total
+        self.publish()
+
+    def advance(self, n: int = 1) -> None:
+        self.processed += n
+        if time.monotonic() - self._last_publish >= self.interval:
+            self.publish()
+
+    def track(self, iterable: Iterable[T]) -> Iterator[T]:
+        """Yield from ``iterable``, counting one processed row per item."""
+        for item in iterable:
+            yield item
+            self.advance()
+
+    def publish(self) -> None:
+        self._last_publish = time.monotonic()
+        publish_job_state(self.job.pk, processed=self.processed, total=self.total)
+
+    def finish(self) -> None:
+        """Store the final counts on the job row."""
+        if self.total is None:
+            self.total = self.processed
+        self.job.processed = self.processed
+        self.job.total = self.total
+        self.job.save(update_fields=["processed", "total"])
+        self.publish()
@@ -0,0 +1,18 @@
+"""
+Shared redis-py client for features that use Redis data structures directly
+(hashes, sorted sets) rather than through Django's cache API.
+"""
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def _client(url: str) -> redis.Redis:
+    # One connection pool per URL and process
+    return redis.Redis.from_url(url, decode_responses=True, socket_timeout=2, socket_connect_timeout=2)
+
+
+def get_redis() -> redis.Redis:
+    return _client(settings.REDIS_DATA_URL)
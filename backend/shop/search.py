@@ -0,0 +1,75 @@
+"""
+Product search backed by PostgreSQL full-text search and trigram similarity.
+
+``Product.search_vector`` stores a weighted tsvector over both languages
+(names weighted A, description C) and is GIN-indexed; ``name_uz``/``name_ru``
+also carry pg_trgm GIN indexes (migration 0011). A search matches products
+whose vector matches every term (as a prefix, so partial words typed into
+the search box match) or whose name is trigram-similar to the input
+(typo tolerance), ranked by text rank plus name similarity.
+
+On other databases (SQLite in tests) ``ProductSearchFilter`` falls back to
+DRF's ``icontains`` search, and the vector is left empty.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from rest_framework.filters import SearchFilter
+
+# Uzbek has no text search configuration; Russian gets stemming
+PRODUCT_SEARCH_VECTOR = (
+    SearchVector("name_uz", weight="A", config="simple")
+    + SearchVector("name_ru", weight="A", config="russian")
+    + SearchVector("description", weight="C", config="simple")
+)
+SEARCH_TEXT_FIELDS = {"name_uz", "name_ru", "description"}
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def search_enabled() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def update_search_vectors(queryset) -> int:
+    """Recompute ``search_vector`` for the given products (no-op off PostgreSQL)."""
+    if not search_enabled():
+        return 0
+    return queryset.update(search_vector=PRODUCT_SEARCH_VECTOR)
+
+
+def build_search_query(text: str) -> SearchQuery | None:
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    # Every word as a prefix ("tov" finds "tovuq"), or the stemmed Russian words
+    prefix = " & ".join(f"{w}:*" for w in words)
+    return SearchQuery(prefix, search_type="raw", config="simple") | SearchQuery(
+        " ".join(words), search_type="plain", config="russian"
+    )
+
+
+def search_products(queryset, text: str):
+    """Filter and rank ``queryset`` by ``text``; best matches first."""
+    query = build_search_query(text)
+    if query is None:
+        return queryset
+    similarity = Greatest(TrigramSimilarity("name_uz", text), TrigramSimilarity("name_ru", text))
+    return (
+        queryset.annotate(search_rank=SearchRank(F("search_vector"), query) + similarity)
+        .filter(Q(search_vector=query) | Q(name_uz__trigram_similar=text) | Q(name_ru__trigram_similar=text))
+        .order_by("-search_rank", "id")
+    )
+
+
+class ProductSearchFilter(SearchFilter):
+    """``?search=`` for products: ranked full-text + trigram search on PostgreSQL."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or not search_enabled():
+            return super().filter_queryset(request, queryset, view)
+        return search_products(queryset, " ".join(terms))
@@ -1,14 +1,31 @@
 from decimal import Decimal
+import logging
 import os
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 
+from .authentication import ClaimsStrippedRefreshToken, add_user_claims
+from .images import discard_staged, srcset, stage_image
 from .models import Category, Supplier, Product, Cart, CartItem, Order, OrderItem
 from .storage import get_storage
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def _enqueue_image_processing(product_id: int, ref: str, image_url: str) -> None:
+    from .tasks import process_product_image_task
+
+    try:
+        process_product_image_task.apply_async(args=[product_id, ref, image_url], retry=False)
+    except Exception as e:
+        # The original image stays in place; only the variants are missing
+        logger.error("Failed to enqueue image processing for product %s: %s", product_id, e)
+        discard_staged(ref)
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -107,6 +124,22 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "role")
 
 
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Login tokens carrying role/user_type claims (see shop.authentication)."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        add_user_claims(token, user)
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refreshed access tokens without the login claims, so a role change cannot outlive them."""
+
+    token_class = ClaimsStrippedRefreshToken
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -129,6 +162,7 @@ class ProductSerializer(serializers.ModelSerializer):
         queryset=Supplier.objects.all(), write_only=True, source="supplier"
     )
     image_file = serializers.FileField(write_only=True, required=False, allow_null=True)
+    image_srcset = serializers.SerializerMethodField()
     name_uz = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
     name_ru = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
 
@@ -143,6 +177,7 @@ class ProductSerializer(serializers.ModelSerializer):
             "supplier",
             "supplier_id",
             "image_url",
+            "image_srcset",
             "image_file",
             "description",
             "status",
@@ -168,21 +203,47 @@ class ProductSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"Image too large. Max {int(max_mb)} MB")
         return f
 
+    def get_image_srcset(self, obj) -> dict[str, str]:
+        return srcset(obj.image_variants or {})
+
     def _maybe_upload(self, validated_data):
         f = validated_data.pop("image_file", None)
+        self._staged_image = None
         if f:
-            storage = get_storage()
-            url = storage.save_bytes(f.read(), f.name, getattr(f, "content_type", None))
+            storage = get_storage("images")
+            data = f.read()
+            url = storage.save_bytes(data, f.name, getattr(f, "content_type", None))
             validated_data["image_url"] = url
+            # Variants are rendered by the worker from this copy (see shop.images)
+            self._staged_image = stage_image(data, f.name)
+        # Variants of a previous image must not outlive it
+        new_url = validated_data.get("image_url")
+        if new_url is not None and (self.instance is None or new_url != self.instance.image_url):
+            validated_data["image_variants"] = {}
         return validated_data
 
+    def _schedule_variants(self, product):
+        ref = self._staged_image
+        if ref:
+            transaction.on_commit(lambda: _enqueue_image_processing(product.id, ref, product.image_url))
+        return product
+
+    def _save_staged(self, save, *args):
+        try:
+            product = save(*args)
+        except BaseException:
+            if self._staged_image:
+                discard_staged(self._staged_image)
+            raise
+        return self._schedule_variants(product)
+
     def create(self, validated_data):
         v = self._maybe_upload(validated_data)
-        return super().create(v)
+        return self._save_staged(super().create, v)
 
     def update(self, instance, validated_data):
         v = self._maybe_upload(validated_data)
-        return super().update(instance, v)
+        return self._save_staged(super().update, instance, v)
 
 
 class CartItemSerializer(serializers.ModelSerializer):
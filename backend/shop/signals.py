@@ -0,0 +1,93 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import summary
+from .authentication import RevocationFailed, forget_user
+from .cache import invalidate_catalog_cache
+from .models import Category, Order, Product, Supplier, User
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def invalidate_catalog_on_change(sender, **kwargs):
+    # Products embed their category and supplier, so any catalog write evicts
+    # every cached catalog response. Deferred to commit so a concurrent reader
+    # cannot re-cache pre-commit data under the new version.
+    transaction.on_commit(invalidate_catalog_cache)
+
+
+def _is_received(status) -> bool:
+    return status == Order.Status.RECEIVED
+
+
+def _is_customer(role) -> bool:
+    return role == User.Role.CUSTOMER
+
+
+@receiver(post_save, sender=Order)
+def count_order_save(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        summary.adjust("today_orders", 1, day=timezone.localdate(instance.created_at))
+    summary.track_membership("new_orders", instance, "status", _is_received, created=created, update_fields=update_fields)
+
+
+@receiver(post_delete, sender=Order)
+def count_order_delete(sender, instance, **kwargs):
+    summary.adjust("today_orders", -1, day=timezone.localdate(instance.created_at))
+    summary.track_membership("new_orders", instance, "status", _is_received, deleted=True)
+
+
+@receiver(post_save, sender=Product)
+def count_product_save(sender, instance, created, update_fields=None, **kwargs):
+    summary.track_membership("total_products", instance, "status", bool, created=created, update_fields=update_fields)
+
+
+@receiver(post_delete, sender=Product)
+def count_product_delete(sender, instance, **kwargs):
+    summary.track_membership("total_products", instance, "status", bool, deleted=True)
+
+
+# Token claims and cached snapshots carry these (shop.authentication)
+SNAPSHOT_FIELDS = ("role", "is_active")
+
+
+@receiver(post_save, sender=User)
+def forget_changed_user(sender, instance, created, update_fields=None, **kwargs):
+    # Connected before count_user_save, which refreshes loaded_values["role"]
+    if created or (update_fields is not None and not set(SNAPSHOT_FIELDS) & set(update_fields)):
+        return
+    loaded = getattr(instance, "loaded_values", {})
+    # A previous value that was not loaded counts as a change
+    if any(loaded.get(name, object()) != getattr(instance, name) for name in SNAPSHOT_FIELDS):
+        user_id = instance.pk
+        # Raises RevocationFailed, rolling back the surrounding transaction, when the
+        # old claims cannot be marked stale
+        forget_user(user_id)
+        # Again after commit: drops a snapshot re-cached from the pre-commit row meanwhile
+        transaction.on_commit(lambda: _forget_after_commit(user_id))
+        loaded["is_active"] = instance.is_active
+        instance.loaded_values = loaded
+
+
+def _forget_after_commit(user_id) -> None:
+    try:
+        forget_user(user_id)
+    except RevocationFailed:
+        # Logged; the stale mark set before commit still applies
+        pass
+
+
+@receiver(post_save, sender=User)
+def count_user_save(sender, instance, created, update_fields=None, **kwargs):
+    summary.track_membership("total_customers", instance, "role", _is_customer, created=created, update_fields=update_fields)
+
+
+@receiver(post_delete, sender=User)
+def count_user_delete(sender, instance, **kwargs):
+    summary.track_membership("total_customers", instance, "role", _is_customer, deleted=True)
@@ -1,107 +1,565 @@
+"""
+Storage backends for uploads and generated files (local media, S3, Cloudinary).
+
+Backends are named and configured in ``settings.STORAGE_BACKENDS`` (for
+example product images on a CDN-backed bucket, exports on a private one).
+``get_storage(name)`` builds each one once per process and wraps it in a
+``TimedStorage`` that records per-name save timings (see ``storage_stats``).
+
+By default every object gets a unique ``uuid4()_filename`` name. In
+content-addressed mode (the ``content_addressed`` option,
+``STORAGE_CONTENT_ADDRESSED=1``) the name is instead
+derived from the SHA-256 of the content, ``cas/ab/abcdef....ext``:
+
+- The digest is computed while the content is streamed to a spool.
+- The upload is skipped when an object with that name already exists, so a
+  re-uploaded photo or template costs neither bandwidth nor space.
+- Such an object never changes, so it is stored with an immutable
+  Cache-Control and addressed by a stable URL that CDNs and browsers can
+  cache forever. For S3 that URL needs ``public_base_url`` (bucket or CDN
+  origin); without it, S3 returns presigned URLs as before.
+
+Every backend also has ``asave_bytes``/``asave_stream`` for async callers
+(ASGI views, ``asyncio.gather`` of several uploads). No backend has a native
+async client, so the blocking calls run in the default thread pool; local
+writes use ``aiofiles`` when it is installed. The views are all synchronous
+and save through the sync methods; the async ones are there for async views
+to await directly.
+"""
+import hashlib
+import io
+import logging
 import os
+import shutil
+import tempfile
+import threading
+import time
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Protocol
+from typing import IO, BinaryIO, Protocol
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
 # Optional imports aliases to simplify patching in tests
 try:  # pragma: no cover - import conveniences for mocking
     import boto3  # type: ignore
+    from boto3.s3.transfer import TransferConfig  # type: ignore
+    from botocore.config import Config as BotoConfig  # type: ignore
 except Exception:  # pragma: no cover
     boto3 = None  # type: ignore
+    TransferConfig = None  # type: ignore
+    BotoConfig = None  # type: ignore
+try:  # pragma: no cover - optional, local async writes fall back to threads
+    import aiofiles  # type: ignore
+except Exception:  # pragma: no cover
+    aiofiles = None  # type: ignore
 try:  # pragma: no cover
     import cloudinary  # type: ignore
+    import cloudinary.api as cloudinary_api  # type: ignore
     import cloudinary.uploader as cloudinary_uploader  # type: ignore
+    from cloudinary.exceptions import NotFound as CloudinaryNotFound  # type: ignore
 except Exception:  # pragma: no cover
     cloudinary = None  # type: ignore
+    cloudinary_api = None  # type: ignore
     cloudinary_uploader = None  # type: ignore
 
+    class CloudinaryNotFound(Exception):  # type: ignore[no-redef]
+        pass
+
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 1024 * 1024
+STATS_KEY_PREFIX = "storage:stats:"
+# Streams hashed before an upload stay in memory up to this size, then spill to disk
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+CAS_PREFIX = "cas"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def content_name(digest: str, filename: str) -> str:
+    """Content-addressed object name; keeps the extension so types and downloads still work."""
+    path = Path(filename)
+    suffix = "".join(path.suffixes[-2:]) if path.suffix.lower() == ".gz" else path.suffix
+    return f"{CAS_PREFIX}/{digest[:2]}/{digest}{suffix.lower()}"
+
+
+def spool_with_digest(fileobj: BinaryIO) -> tuple[str, IO[bytes]]:
+    """Copy a stream into a rewound temporary spool, hashing it on the way."""
+    digest = hashlib.sha256()
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    while chunk := fileobj.read(COPY_CHUNK_SIZE):
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    return digest.hexdigest(), spool
+
+
+async def _offload(func, *args):
+    # Not thread-sensitive: saves from concurrent requests run side by side in the
+    # default executor instead of queueing on the one thread shared by sync views
+    return await sync_to_async(func, thread_sensitive=False)(*args)
+
 
 class StorageBackend(Protocol):
     def save_bytes(self, data: bytes, filename: str, content_type: str | None = None) -> str:
         """Persist bytes and return a URL (public or time-limited signed)."""
         ...
 
+    def save_stream(self, fileobj: BinaryIO, filename: str, content_type: str | None = None) -> str:
+        """Persist a readable binary file object without loading it into memory."""
+        ...
+
+    async def asave_bytes(self, data: bytes, filename: str, content_type: str | None = None) -> str:
+        """``save_bytes`` without blocking the event loop."""
+        ...
+
+    async def asave_stream(
+        self, fileobj: BinaryIO, filename: str, content_type: str | None = None
+    ) -> str:
+        """``save_stream`` without blocking the event loop."""
+        ...
+
+
+class ThreadOffloadedSaves:
+    """Async saves for backends without an async client: the sync save runs in a worker thread."""
+
+    async def asave_bytes(self, data: bytes, filename: str, content_type: str | None = None) -> str:
+        return await _offload(self.save_bytes, data, filename, content_type)
+
+    async def asave_stream(
+        self, fileobj: BinaryIO, filename: str, content_type: str | None = None
+    ) -> str:
+        return await _offload(self.save_stream, fileobj, filename, content_type)
+
 
 @dataclass
-class LocalStorage:
+class LocalStorage(ThreadOffloadedSaves):
     base_dir: Path
     base_url: str
+    content_addressed: bool = False
+    _dir_ready: bool = field(default=False, init=False, repr=False, compare=False)
+
+    def _ensure_dir(self) -> None:
+        # Instances live for the whole process (see get_storage): create the directory once
+        if not self._dir_ready:
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            self._dir_ready = True
+
+    def _url(self, dest: Path) -> str:
+        rel = dest.relative_to(settings.MEDIA_ROOT)
+        return f"{self.base_url}/{rel.as_posix()}"
 
     def save_bytes(self, data: bytes, filename: str, content_type: str | None = None) -> str:
-        self.base_dir.mkdir(parents=True, exist_ok=True)
+        if self.content_addressed:
+            dest = self.base_dir / content_name(hashlib.sha256(data).hexdigest(), filename)
+            if not dest.exists():
+                self._place(io.BytesIO(data), dest)
+            return self._url(dest)
+        self._ensure_dir()
         dest = self.base_dir / f"{uuid.uuid4()}_{filename}"
         dest.write_bytes(data)
-        rel = dest.relative_to(settings.MEDIA_ROOT)
-        return f"{self.base_url}/{rel.as_posix()}"
+        return self._url(dest)
+
+    def save_stream(self, fileobj: BinaryIO, filename: str, content_type: str | None = None) -> str:
+        if self.content_addressed:
+            digest, spool = spool_with_digest(fileobj)
+            with spool:
+                dest = self.base_dir / content_name(digest, filename)
+                if not dest.exists():
+                    self._place(spool, dest)
+            return self._url(dest)
+        self._ensure_dir()
+        dest = self.base_dir / f"{uuid.uuid4()}_{filename}"
+        with dest.open("wb") as out:
+            shutil.copyfileobj(fileobj, out, COPY_CHUNK_SIZE)
+        return self._url(dest)
+
+    async def asave_bytes(self, data: bytes, filename: str, content_type: str | None = None) -> str:
+        if aiofiles is None or self.content_addressed:
+            return await super().asave_bytes(data, filename, content_type)
+        if not self._dir_ready:
+            await _offload(self._ensure_dir)
+        dest = self.base_dir / f"{uuid.uuid4()}_{filename}"
+        async with aiofiles.open(dest, "wb") as out:
+            await out.write(data)
+        return self._url(dest)
+
+    def _place(self, fileobj: IO[bytes], dest: Path) -> None:
+        # Write beside the target and rename, so readers never see a partial object
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = tempfile.NamedTemporaryFile(dir=dest.parent, prefix=".upload-", delete=False)
+        try:
+            with tmp:
+                shutil.copyfileobj(fileobj, tmp, COPY_CHUNK_SIZE)
+            os.replace(tmp.name, dest)
+        except BaseException:
+            # A failed copy must not leave a .upload-* file behind
+            try:
+                os.unlink(tmp.name)
+            except OSError:
+                pass
+            raise
+
+
+@lru_cache(maxsize=None)
+def s3_client(
+    region: str, endpoint_url: str = "", max_pool_connections: int = 32, max_attempts: int = 5
+):
+    """
+    One S3 client per region/endpoint/pool configuration and process.
+
+    Building a client resolves credentials and endpoints and opens a new
+    connection pool, so it is done once; boto3 clients are thread-safe.
+    """
+    if boto3 is None:  # pragma: no cover
+        raise RuntimeError("boto3 is required for S3 storage")
+    config = BotoConfig(
+        max_pool_connections=max_pool_connections,
+        retries={"max_attempts": max_attempts, "mode": "adaptive"},
+        tcp_keepalive=True,
+    )
+    # A private session: the default one is not safe to build clients from concurrently
+    return boto3.session.Session().client(
+        "s3", region_name=region, endpoint_url=endpoint_url or None, config=config
+    )
+
+
+@lru_cache(maxsize=None)
+def s3_transfer_config(threshold_mb: int = 16, chunk_mb: int = 16, max_concurrency: int = 4):
+    """Multipart settings for streamed uploads: part size and parallel part uploads."""
+    if TransferConfig is None:  # pragma: no cover
+        return None
+    mb = 1024 * 1024
+    return TransferConfig(
+        multipart_threshold=threshold_mb * mb,
+        multipart_chunksize=chunk_mb * mb,
+        max_concurrency=max_concurrency,
+    )
 
 
 @dataclass
-class S3Storage:
+class S3Storage(ThreadOffloadedSaves):
     bucket: str
     region: str
-    base_path: str
+    base_path: str = "uploads"
+    content_addressed: bool = False
+    public_base_url: str = ""
+    # S3-compatible endpoint (MinIO, a local stand-in); empty for AWS
+    endpoint_url: str = ""
+    presign_expires: int = 900
+    max_pool_connections: int = 32
+    max_attempts: int = 5
+    multipart_threshold_mb: int = 16
+    multipart_chunk_mb: int = 16
+    max_concurrency: int = 4
 
     def _client(self):
-        if boto3 is None:  # pragma: no cover
-            raise RuntimeError("boto3 is required for S3 storage")
-        return boto3.client("s3", region_name=self.region)
+        return s3_client(
+            self.region, self.endpoint_url, self.max_pool_connections, self.max_attempts
+        )
 
-    def save_bytes(self, data: bytes, filename: str, content_type: str | None = None) -> str:
-        key = f"{self.base_path.rstrip('/')}/{uuid.uuid4()}_{filename}"
-        extra = {"ContentType": content_type} if content_type else {}
-        self._client().put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
-        # presign a GET URL valid for 15 minutes
-        return self._client().generate_presigned_url(
+    def _key(self, filename: str) -> str:
+        return f"{self.base_path.rstrip('/')}/{uuid.uuid4()}_{filename}"
+
+    def _presign(self, client, key: str) -> str:
+        # presign a GET URL valid for presign_expires seconds (15 minutes by default)
+        return client.generate_presigned_url(
             "get_object",
             Params={"Bucket": self.bucket, "Key": key},
-            ExpiresIn=int(os.getenv("S3_PRESIGN_EXPIRES", "900")),
+            ExpiresIn=self.presign_expires,
+        )
+
+    def _content_key(self, digest: str, filename: str) -> str:
+        return f"{self.base_path.rstrip('/')}/{content_name(digest, filename)}"
+
+    def _exists(self, client, key: str) -> bool:
+        try:
+            client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except Exception as e:
+            code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+            if code in {"404", "NoSuchKey", "NotFound"}:
+                return False
+            raise
+
+    def _immutable_url(self, client, key: str) -> str:
+        if self.public_base_url:
+            return f"{self.public_base_url.rstrip('/')}/{key}"
+        return self._presign(client, key)
+
+    def save_bytes(self, data: bytes, filename: str, content_type: str | None = None) -> str:
+        extra = {"ContentType": content_type} if content_type else {}
+        client = self._client()
+        if self.content_addressed:
+            key = self._content_key(hashlib.sha256(data).hexdigest(), filename)
+            if not self._exists(client, key):
+                client.put_object(
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=data,
+                    CacheControl=IMMUTABLE_CACHE_CONTROL,
+                    **extra,
+                )
+            return self._immutable_url(client, key)
+        key = self._key(filename)
+        client.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+        return self._presign(client, key)
+
+    def save_stream(self, fileobj: BinaryIO, filename: str, content_type: str | None = None) -> str:
+        extra = {"ContentType": content_type} if content_type else {}
+        client = self._client()
+        if self.content_addressed:
+            digest, spool = spool_with_digest(fileobj)
+            with spool:
+                key = self._content_key(digest, filename)
+                if not self._exists(client, key):
+                    extra["CacheControl"] = IMMUTABLE_CACHE_CONTROL
+                    self._upload_stream(client, spool, key, extra)
+            return self._immutable_url(client, key)
+        key = self._key(filename)
+        self._upload_stream(client, fileobj, key, extra)
+        return self._presign(client, key)
+
+    def _upload_stream(self, client, fileobj: IO[bytes], key: str, extra: dict) -> None:
+        # Multipart above the threshold: parts are read and sent one chunk at a time,
+        # so memory stays at chunk size x concurrency whatever the file size
+        config = s3_transfer_config(
+            self.multipart_threshold_mb, self.multipart_chunk_mb, self.max_concurrency
         )
+        client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra, Config=config)
 
 
 @dataclass
-class CloudinaryStorage:
+class CloudinaryStorage(ThreadOffloadedSaves):
     folder: str
+    content_addressed: bool = False
 
     def _uploader(self):
         if cloudinary_uploader is None:  # pragma: no cover
             raise RuntimeError("cloudinary is required for CLOUDINARY storage")
         return cloudinary_uploader
 
-    def save_bytes(self, data: bytes, filename: str, content_type: str | None = None) -> str:
+    @staticmethod
+    def _url(res: dict) -> str:
+        url = res.get("secure_url") or res.get("url")
+        if not url:
+            raise RuntimeError("Cloudinary upload did not return a URL")
+        return url
+
+    def _upload(self, payload, filename: str, content_type: str | None) -> str:
         uploader = self._uploader()
-        # Cloudinary expects a file-like; we can pass bytes with public_id
+        resource_type = "image" if (content_type or "").startswith("image/") else "raw"
+        if self.content_addressed:
+            return self._upload_addressed(uploader, payload, filename, resource_type)
+        # Cloudinary accepts bytes or a file-like object with public_id
         public_id = f"{uuid.uuid4()}_{Path(filename).stem}"
         res = uploader.upload(
-            data,
+            payload,
             folder=self.folder,
             public_id=public_id,
-            resource_type="image" if (content_type or "").startswith("image/") else "raw",
+            resource_type=resource_type,
         )
-        url = res.get("secure_url") or res.get("url")
-        if not url:
-            raise RuntimeError("Cloudinary upload did not return a URL")
-        return url
+        return self._url(res)
+
+    def _upload_addressed(self, uploader, payload, filename: str, resource_type: str) -> str:
+        if isinstance(payload, bytes):
+            payload = io.BytesIO(payload)
+        digest, spool = spool_with_digest(payload)
+        with spool:
+            # Raw resources keep their extension in the public id; Cloudinary adds it for images
+            if resource_type == "image":
+                public_id = digest
+            else:
+                public_id = Path(content_name(digest, filename)).name
+            try:
+                # Delivery URLs carry the version, so they never change for this content
+                existing = cloudinary_api.resource(
+                    f"{self.folder}/{public_id}", resource_type=resource_type
+                )
+                return self._url(existing)
+            except CloudinaryNotFound:
+                pass
+            res = uploader.upload(
+                spool,
+                folder=self.folder,
+                public_id=public_id,
+                resource_type=resource_type,
+                overwrite=False,
+                unique_filename=False,
+            )
+        return self._url(res)
+
+    def save_bytes(self, data: bytes, filename: str, content_type: str | None = None) -> str:
+        return self._upload(data, filename, content_type)
+
+    def save_stream(self, fileobj: BinaryIO, filename: str, content_type: str | None = None) -> str:
+        return self._upload(fileobj, filename, content_type)
+
+
+class TimedStorage:
+    """
+    A named storage backend that records how long each save takes.
+
+    Counters (saves, failures, total milliseconds) are kept per name in the
+    cache, so they add up across processes. Metric errors never fail a save.
+    """
 
+    def __init__(self, name: str, backend: StorageBackend):
+        self.name = name
+        self.backend = backend
 
-def get_storage() -> StorageBackend:
-    backend = os.getenv("STORAGE_BACKEND", "LOCAL").upper()
-    if backend == "LOCAL":
-        media_root = Path(getattr(settings, "MEDIA_ROOT", Path.cwd() / "media"))
-        base_url = getattr(settings, "MEDIA_URL", "/media/").rstrip("/")
-        return LocalStorage(base_dir=media_root / "files", base_url=base_url)
-    if backend == "S3":
-        bucket = os.getenv("AWS_S3_BUCKET") or os.getenv("AWS_STORAGE_BUCKET_NAME")
-        region = os.getenv("AWS_S3_REGION") or os.getenv("AWS_DEFAULT_REGION")
-        if not bucket or not region:
-            raise RuntimeError("Missing AWS_S3_BUCKET/AWS_STORAGE_BUCKET_NAME or AWS_S3_REGION/AWS_DEFAULT_REGION")
-        base_path = os.getenv("S3_BASE_PATH", "uploads")
-        return S3Storage(bucket=bucket, region=region, base_path=base_path)
-    if backend == "CLOUDINARY":
+    def save_bytes(self, data: bytes, filename: str, content_type: str | None = None) -> str:
+        return self._timed(self.backend.save_bytes, data, filename, content_type)
+
+    def save_stream(self, fileobj: BinaryIO, filename: str, content_type: str | None = None) -> str:
+        return self._timed(self.backend.save_stream, fileobj, filename, content_type)
+
+    async def asave_bytes(self, data: bytes, filename: str, content_type: str | None = None) -> str:
+        return await self._atimed(self.backend.asave_bytes, data, filename, content_type)
+
+    async def asave_stream(
+        self, fileobj: BinaryIO, filename: str, content_type: str | None = None
+    ) -> str:
+        return await self._atimed(self.backend.asave_stream, fileobj, filename, content_type)
+
+    def _timed(self, save, payload, filename: str, content_type: str | None) -> str:
+        start = time.perf_counter()
+        ok = False
+        try:
+            url = save(payload, filename, content_type)
+            ok = True
+            return url
+        finally:
+            self._record(time.perf_counter() - start, ok, filename)
+
+    async def _atimed(self, save, payload, filename: str, content_type: str | None) -> str:
+        start = time.perf_counter()
+        ok = False
+        try:
+            url = await save(payload, filename, content_type)
+            ok = True
+            return url
+        finally:
+            # The counters live in the cache (Redis in production): keep that off the loop too
+            await _offload(self._record, time.perf_counter() - start, ok, filename)
+
+    def _record(self, seconds: float, ok: bool, filename: str) -> None:
+        logger.info(
+            "storage[%s] %s %s in %.1f ms",
+            self.name,
+            "saved" if ok else "failed to save",
+            filename,
+            seconds * 1000,
+        )
+        prefix = f"{STATS_KEY_PREFIX}{self.name}:"
+        deltas = (
+            (f"{prefix}saves", 1),
+            (f"{prefix}ms", round(seconds * 1000)),
+            (f"{prefix}errors", int(not ok)),
+        )
+        for key, delta in deltas:
+            if not delta:
+                continue
+            try:
+                try:
+                    cache.incr(key, delta)
+                except ValueError:
+                    cache.add(key, delta, timeout=None)
+            except Exception as e:
+                logger.debug("Failed to update storage metric %s: %s", key, e)
+
+
+def storage_stats() -> dict[str, dict[str, float]]:
+    """Save counts, failures and timings for every configured storage name."""
+    names = sorted(set(settings.STORAGE_BACKENDS) | set(_registry))
+    keys = [
+        f"{STATS_KEY_PREFIX}{name}:{field}" for name in names for field in ("saves", "errors", "ms")
+    ]
+    try:
+        values = cache.get_many(keys)
+    except Exception:
+        values = {}
+    stats = {}
+    for name in names:
+        prefix = f"{STATS_KEY_PREFIX}{name}:"
+        saves = int(values.get(f"{prefix}saves") or 0)
+        total_ms = int(values.get(f"{prefix}ms") or 0)
+        stats[name] = {
+            "saves": saves,
+            "errors": int(values.get(f"{prefix}errors") or 0),
+            "total_ms": total_ms,
+            "avg_ms": round(total_ms / saves, 1) if saves else 0.0,
+        }
+    return stats
+
+
+def build_backend(config: dict) -> StorageBackend:
+    """Instantiate a backend from a ``STORAGE_BACKENDS`` entry."""
+    kind = config.get("BACKEND", "LOCAL").upper()
+    options = config.get("OPTIONS", {})
+    content_addressed = bool(options.get("content_addressed", False))
+    if kind == "S3":
+        if not options.get("bucket") or not options.get("region"):
+            raise RuntimeError(
+                "Missing AWS_S3_BUCKET/AWS_STORAGE_BUCKET_NAME or AWS_S3_REGION/AWS_DEFAULT_REGION"
+            )
+        fields = {f for f in S3Storage.__dataclass_fields__ if f != "content_addressed"}
+        return S3Storage(
+            content_addressed=content_addressed,
+            **{k: v for k, v in options.items() if k in fields and v not in (None, "")},
+        )
+    if kind == "CLOUDINARY":
         # Expect CLOUDINARY_URL or individual keys configured externally
-        folder = os.getenv("CLOUDINARY_FOLDER", "halalchicken")
-        return CloudinaryStorage(folder=folder)
-    # Fallback to local
-    return LocalStorage(base_dir=Path(settings.MEDIA_ROOT) / "files", base_url=settings.MEDIA_URL.rstrip("/"))
+        return CloudinaryStorage(
+            folder=options.get("folder") or "halalchicken", content_addressed=content_addressed
+        )
+    # LOCAL, and the fallback for unknown kinds
+    return LocalStorage(
+        base_dir=Path(settings.MEDIA_ROOT) / options.get("subdir", "files"),
+        base_url=settings.MEDIA_URL.rstrip("/"),
+        content_addressed=content_addressed,
+    )
+
+
+_registry: dict[str, TimedStorage] = {}
+_backends: dict[str, StorageBackend] = {}
+_registry_lock = threading.Lock()
+
+
+def get_storage(name: str = "default") -> StorageBackend:
+    """
+    The storage backend for ``name`` ("images", "exports", ...), built once per process.
+
+    Names without their own ``STORAGE_BACKENDS`` entry share the "default" backend.
+    """
+    storage = _registry.get(name)
+    if storage is not None:
+        return storage
+    with _registry_lock:
+        if name not in _registry:
+            config_name = name if name in settings.STORAGE_BACKENDS else "default"
+            if config_name not in _backends:
+                config = settings.STORAGE_BACKENDS.get(config_name, {})
+                _backends[config_name] = build_backend(config)
+            _registry[name] = TimedStorage(name, _backends[config_name])
+        return _registry[name]
+
+
+def reset_storage() -> None:
+    """Forget built backends; the next ``get_storage`` call re-reads the settings."""
+    with _registry_lock:
+        _registry.clear()
+        _backends.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting in {"STORAGE_BACKENDS", "MEDIA_ROOT", "MEDIA_URL"}:
+        reset_storage()
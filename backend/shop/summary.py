@@ -0,0 +1,164 @@
+"""
+Admin dashboard counters, maintained incrementally in the database.
+
+Each counter (today's orders, orders still RECEIVED, active products,
+customers) is a ``SummaryCounter`` row holding its last recounted value plus
+the ``SummaryDelta`` rows written since. Model signals (``shop.signals``)
+insert a +1/-1 delta when a row enters or leaves a counter's set. The delta
+is inserted in the same transaction as the change, so it commits or rolls
+back with it. Deltas are insert-only, so concurrent checkouts never wait on a
+shared counter row. A read is one query: the stored value plus the sum of its
+pending deltas.
+
+A recount (first use, a bulk write that bypassed signals, the periodic
+``reconcile_summary``) counts the rows and deletes the deltas it has folded
+in. On PostgreSQL it runs at REPEATABLE READ, so the count and the deleted
+deltas come from the same snapshot: a change committed during the recount
+keeps its delta and is not counted twice. A recount nested in an outer
+transaction runs at that transaction's isolation level.
+
+The set change is computed from the values a row was loaded with
+(``TracksLoadedValues``). Writers that could race on the same row lock it
+first (``OrderViewSet.status``). Any drift left by other stale saves is
+corrected by ``reconcile_summary``.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Iterable
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Order, Product, SummaryCounter, SummaryDelta, User
+
+logger = logging.getLogger(__name__)
+
+DAY_KEY_PREFIX = "orders_on:"
+
+
+def _day_bounds(day: date):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _count_orders_on(day: date) -> int:
+    # A range on created_at uses its index; created_at__date casts every row
+    start, end = _day_bounds(day)
+    return Order.objects.filter(created_at__gte=start, created_at__lt=end).count()
+
+
+# Each counter takes the day it is read for; only today_orders depends on it
+COUNTERS: dict[str, Callable[[date], int]] = {
+    "today_orders": _count_orders_on,
+    "new_orders": lambda day: Order.objects.filter(status=Order.Status.RECEIVED).count(),
+    "total_products": lambda day: Product.objects.filter(status=True).count(),
+    "total_customers": lambda day: User.objects.filter(role=User.Role.CUSTOMER).count(),
+}
+
+
+def _key(name: str, day: date | None = None) -> str:
+    if name == "today_orders":
+        return f"{DAY_KEY_PREFIX}{(day or timezone.localdate()).isoformat()}"
+    return name
+
+
+def _stored(keys: Iterable[str]) -> dict[str, int]:
+    """Stored value plus pending deltas for each counter that has been counted."""
+    pending = (
+        SummaryDelta.objects.filter(name=OuterRef("name"))
+        .order_by()
+        .values("name")
+        .annotate(total=Sum("delta"))
+        .values("total")
+    )
+    rows = (
+        SummaryCounter.objects.filter(name__in=list(keys))
+        .annotate(pending=Coalesce(Subquery(pending), 0))
+        .values_list("name", "value", "pending")
+    )
+    return {name: value + pending for name, value, pending in rows}
+
+
+def _recount(name: str, day: date | None = None) -> tuple[int | None, int]:
+    """Recount ``name`` and fold its deltas; returns (previous value, actual)."""
+    day = day or timezone.localdate()
+    key = _key(name, day)
+    isolate = connection.vendor == "postgresql" and not connection.in_atomic_block
+    try:
+        with transaction.atomic():
+            if isolate:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            previous = _stored([key]).get(key)
+            actual = COUNTERS[name](day)
+            SummaryDelta.objects.filter(name=key).delete()
+            SummaryCounter.objects.update_or_create(name=key, defaults={"value": actual})
+    except (IntegrityError, OperationalError) as e:
+        # A concurrent recount of the same counter won; its result stands
+        logger.info("Summary counter %s recounted concurrently: %s", key, e)
+        return None, COUNTERS[name](day)
+    return previous, actual
+
+
+def admin_summary() -> dict[str, int]:
+    """Current dashboard counters; recounts only those never counted (or reset)."""
+    keys = {name: _key(name) for name in COUNTERS}
+    stored = _stored(keys.values())
+    return {name: stored[key] if key in stored else _recount(name)[1] for name, key in keys.items()}
+
+
+def reconcile_summary() -> dict[str, dict[str, int | None]]:
+    """Recount every counter, drop past days and return the counters that drifted."""
+    drift = {}
+    for name in COUNTERS:
+        previous, actual = _recount(name)
+        if previous is not None and previous != actual:
+            drift[name] = {"stored": previous, "actual": actual}
+    # Yesterday's counter may still receive late deltas; older days are done
+    keep_from = _key("today_orders", timezone.localdate() - timedelta(days=1))
+    SummaryDelta.objects.filter(name__startswith=DAY_KEY_PREFIX, name__lt=keep_from).delete()
+    SummaryCounter.objects.filter(name__startswith=DAY_KEY_PREFIX, name__lt=keep_from).delete()
+    if drift:
+        logger.warning("Admin summary counters drifted: %s", drift)
+    return drift
+
+
+def reset_counters(*names: str) -> None:
+    """Drop counters after writes that bypass signals (bulk imports, queryset updates)."""
+    SummaryCounter.objects.filter(name__in=[_key(name) for name in names]).delete()
+
+
+def adjust(name: str, delta: int, day: date | None = None) -> None:
+    """Add ``delta`` to a counter, as part of the current transaction."""
+    if delta:
+        SummaryDelta.objects.create(name=_key(name, day), delta=delta)
+
+
+def track_membership(name: str, instance, field: str, member: Callable, created=False, deleted=False, update_fields=None):
+    """
+    Adjust counter ``name`` when ``instance`` enters or leaves its set.
+
+    ``member`` says whether a value of ``field`` belongs to the set. When the
+    previous value is unknown, the counter is dropped and recounted on read.
+    """
+    if update_fields is not None and field not in update_fields:
+        return
+    loaded = getattr(instance, "loaded_values", {})
+    current = getattr(instance, field)
+    if created:
+        delta = int(member(current))
+    elif deleted:
+        delta = -int(member(loaded.get(field, current)))
+    elif field in loaded:
+        delta = int(member(current)) - int(member(loaded[field]))
+    else:
+        transaction.on_commit(lambda: reset_counters(name))
+        return
+    adjust(name, delta)
+    if not deleted:
+        loaded[field] = current
+        instance.loaded_values = loaded
@@ -1,39 +1,263 @@
 from __future__ import annotations
 
+import csv
+import gzip
 import io
-from typing import Any
+import logging
+import tempfile
+from typing import IO, Any, Iterable, Iterator
 
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from openpyxl import Workbook, load_workbook
+from openpyxl import Workbook
 
-from .models import AsyncJob, Order, Product, Category, Supplier
+from .cache import invalidate_catalog_cache
+from .models import AsyncJob, Order, OrderItem, OrderNumberSequence, SessionCart
+from .product_import import discard_staged, import_products, iter_workbook_rows, open_staged
+from .progress import ProgressReporter
 from .storage import get_storage
+from .summary import reconcile_summary, reset_counters
+from .telegram_service import telegram_service
 
+logger = logging.getLogger(__name__)
 
-def _parse_boolean_from_cell(value: Any) -> bool:
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+EXPORT_HEADERS = [
+    "order_number",
+    "status",
+    "created_at",
+    "user_id",
+    "username",
+    "item_product_id",
+    "item_product_name",
+    "item_quantity",
+]
+
+# format -> (file suffix, content type)
+EXPORT_FORMATS = {
+    "xlsx": ("xlsx", XLSX_CONTENT_TYPE),
+    "csv": ("csv", "text/csv"),
+    "csv.gz": ("csv.gz", "application/gzip"),
+}
+
+
+@shared_task(bind=True, max_retries=5)
+def send_order_notification_task(self, order_id: int, chat_ids: list[str] | None = None) -> None:
+    """
+    Notify admin Telegram chats about a new order.
+
+    All chats are messaged concurrently; chats that failed with a retryable
+    error are retried with exponential backoff, the others are not resent.
+    """
+    if not telegram_service.is_configured():
+        logger.warning("Telegram bot not configured; skipping notification for order %s", order_id)
+        return
+    try:
+        order = Order.objects.select_related("user").prefetch_related("items__product").get(pk=order_id)
+    except Order.DoesNotExist:
+        logger.warning("Order %s no longer exists; skipping Telegram notification", order_id)
+        return
+
+    outcomes = telegram_service.deliver_to_chats(
+        chat_ids or telegram_service.admin_chat_ids, telegram_service.build_order_message(order)
+    )
+    retry_chat_ids = [cid for cid, outcome in outcomes.items() if outcome == "retry"]
+    if retry_chat_ids:
+        raise self.retry(
+            args=[order_id, retry_chat_ids],
+            countdown=min(600, 10 * 2 ** self.request.retries),
+        )
+
+
+@shared_task
+def process_product_image_task(product_id: int, ref: str, image_url: str) -> bool:
+    """Generate resized WebP/AVIF/JPEG variants of a product's uploaded image."""
+    from .images import UnidentifiedImageError, process_product_image
+
+    try:
+        return process_product_image(product_id, ref, image_url)
+    except FileNotFoundError:
+        logger.warning("Staged image %s for product %s is gone; skipping", ref, product_id)
+        return False
+    except UnidentifiedImageError:
+        # Retrying cannot help; the staged copy is already discarded
+        logger.warning(
+            "Staged image %s for product %s is not a readable image; skipping", ref, product_id
+        )
+        return False
+
+
+@shared_task
+def sweep_staged_imports_task() -> int:
+    """Remove staged import uploads that no task picked up."""
+    from .product_import import sweep_staged
+
+    return sweep_staged(settings.IMPORT_SPOOL_MAX_AGE)
+
+
+@shared_task
+def sweep_staged_images_task() -> int:
+    """Remove staged product images that no task picked up (e.g. after a rollback)."""
+    from .images import sweep_staged
+
+    return sweep_staged(settings.IMAGE_SPOOL_MAX_AGE)
+
+
+@shared_task
+def prepare_order_number_sequences(keep_days: int = 2) -> None:
     """
-    Normalize Excel cell value into a strict boolean.
+    Pre-create tomorrow's order number sequence and drop stale ones.
 
-    Accepted inputs:
-    - Python bools
-    - Numeric 1/0 (int, float, Decimal)
-    - Strings: "true"/"false", "1"/"0" (case-insensitive, trimmed)
+    Creating the sequence ahead of midnight keeps the DDL out of the first
+    checkout of the day. No-op on databases other than PostgreSQL.
     """
-    if isinstance(value, bool):
-        return value
-    if isinstance(value, (int, float)):
-        if value == 1:
-            return True
-        if value == 0:
-            return False
-    if isinstance(value, str):
-        normalized = value.strip().lower()
-        if normalized in {"true", "1"}:
-            return True
-        if normalized in {"false", "0"}:
-            return False
-    raise ValueError("Invalid status; must be true/false or 1/0")
+    from datetime import timedelta
+    from django.db import connection
+
+    if connection.vendor != "postgresql":
+        return
+    today = timezone.localdate()
+    OrderNumberSequence.ensure_sequence(today)
+    OrderNumberSequence.ensure_sequence(today + timedelta(days=1))
+    OrderNumberSequence.drop_sequences_before(today - timedelta(days=keep_days))
+
+
+def purge_expired_session_carts(
+    batch_size: int | None = None,
+    pause: float | None = None,
+    max_seconds: float | None = None,
+) -> dict[str, float]:
+    """
+    Delete expired guest carts in keyset batches, sleeping ``pause`` seconds between them.
+
+    Stops after ``max_seconds`` so a scheduled run never overlaps the next one;
+    whatever is left is picked up by that next run.
+    """
+    import time
+
+    batch_size = batch_size or settings.CART_PURGE_BATCH_SIZE
+    pause = settings.CART_PURGE_PAUSE if pause is None else pause
+    max_seconds = settings.CART_PURGE_MAX_SECONDS if max_seconds is None else max_seconds
+    cutoff = timezone.now()
+    start = time.monotonic()
+    last_id, carts, items, batches = 0, 0, 0, 0
+    while True:
+        last_id, batch_carts, batch_items = SessionCart.purge_expired_batch(cutoff, last_id, batch_size)
+        if not last_id:
+            break
+        carts += batch_carts
+        items += batch_items
+        batches += 1
+        if time.monotonic() - start >= max_seconds:
+            logger.info("Cart purge stopped after %.0fs; the rest is left for the next run", max_seconds)
+            break
+        if pause:
+            time.sleep(pause)
+    elapsed = time.monotonic() - start
+    rate = (carts + items) / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        "Purged %d expired carts and %d items in %d batches, %.1fs (%.0f rows/s)",
+        carts, items, batches, elapsed, rate,
+    )
+    return {
+        "carts": carts,
+        "items": items,
+        "batches": batches,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rate, 1),
+    }
+
+
+@shared_task
+def purge_expired_session_carts_task() -> dict[str, float] | None:
+    # Skip if the previous run is still going (e.g. a slow catch-up after downtime)
+    lock_key = "locks:purge_expired_session_carts"
+    if not cache.add(lock_key, 1, timeout=int(settings.CART_PURGE_MAX_SECONDS) + 60):
+        logger.info("Cart purge already running; skipping")
+        return None
+    try:
+        return purge_expired_session_carts()
+    finally:
+        cache.delete(lock_key)
+
+
+@shared_task
+def reconcile_summary_task() -> dict[str, dict[str, int | None]]:
+    return reconcile_summary()
+
+
+def order_export_queryset(filters: dict[str, Any] | None = None):
+    """Order items matching the export filters (status, user_id, date_from, date_to)."""
+    filters = filters or {}
+    qs = OrderItem.objects.all()
+    if v := filters.get("status"):
+        qs = qs.filter(order__status=v)
+    if v := filters.get("user_id"):
+        qs = qs.filter(order__user_id=v)
+    if date_from := filters.get("date_from"):
+        qs = qs.filter(order__created_at__date__gte=date_from)
+    if date_to := filters.get("date_to"):
+        qs = qs.filter(order__created_at__date__lte=date_to)
+    return qs
+
+
+def iter_order_export_rows(filters: dict[str, Any] | None = None) -> Iterator[list[Any]]:
+    """
+    Yield one export row per order item, newest orders first.
+
+    Rows are fetched as flat tuples in chunks (a server-side cursor on
+    PostgreSQL), so memory does not grow with the number of orders.
+    """
+    rows = order_export_queryset(filters).order_by("-order__created_at", "order_id", "id").values_list(
+        "order__order_number",
+        "order__status",
+        "order__created_at",
+        "order__user_id",
+        "order__user__username",
+        "product_id",
+        "product__name_uz",
+        "quantity",
+    )
+    for number, status, created_at, user_id, username, product_id, product_name, quantity in rows.iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    ):
+        yield [
+            number,
+            status,
+            timezone.localtime(created_at).isoformat(),
+            user_id,
+            username,
+            product_id,
+            product_name,
+            quantity,
+        ]
+
+
+def write_orders_export(out: IO[bytes], rows: Iterable[list[Any]], fmt: str = "xlsx") -> None:
+    """Stream export rows into a binary file object in the requested format."""
+    if fmt == "xlsx":
+        # Write-only mode flushes rows to disk as they are appended
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Orders")
+        ws.append(EXPORT_HEADERS)
+        for row in rows:
+            ws.append(row)
+        wb.save(out)
+        return
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    raw = gzip.GzipFile(fileobj=out, mode="wb") if fmt == "csv.gz" else out
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_HEADERS)
+    writer.writerows(rows)
+    text.flush()
+    text.detach()
+    if raw is not out:
+        raw.close()
 
 
 @shared_task
@@ -41,141 +265,54 @@ def export_orders_task(job_id: str, filters: dict[str, Any] | None = None) -> No
     job = AsyncJob.objects.get(pk=job_id)
     job.mark_running()
     try:
-        qs = Order.objects.select_related("user").prefetch_related("items__product").all().order_by("-created_at")
         filters = filters or {}
-        if v := filters.get("status"):
-            qs = qs.filter(status=v)
-        if v := filters.get("user_id"):
-            qs = qs.filter(user_id=v)
-        if date_from := filters.get("date_from"):
-            qs = qs.filter(created_at__date__gte=date_from)
-        if date_to := filters.get("date_to"):
-            qs = qs.filter(created_at__date__lte=date_to)
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Orders"
-        headers = [
-            "order_number",
-            "status",
-            "created_at",
-            "user_id",
-            "username",
-            "item_product_id",
-            "item_product_name",
-            "item_quantity",
-        ]
-        ws.append(headers)
-        for order in qs:
-            for it in order.items.all():
-                ws.append(
-                    [
-                        order.order_number,
-                        order.status,
-                        timezone.localtime(order.created_at).isoformat(),
-                        order.user_id,
-                        order.user.username,
-                        it.product_id,
-                        it.product.name_uz,
-                        it.quantity,
-                    ]
-                )
-        buf = io.BytesIO()
-        wb.save(buf)
-        data = buf.getvalue()
-        storage = get_storage()
-        url = storage.save_bytes(
-            data,
-            f"orders_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        fmt = filters.get("format") or "xlsx"
+        suffix, content_type = EXPORT_FORMATS[fmt]
+        progress = ProgressReporter(job, total=order_export_queryset(filters).count())
+        # Spool to a temp file, then stream it to storage
+        with tempfile.TemporaryFile() as spool:
+            write_orders_export(spool, progress.track(iter_order_export_rows(filters)), fmt)
+            progress.finish()
+            spool.seek(0)
+            url = get_storage("exports").save_stream(
+                spool,
+                f"orders_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{suffix}",
+                content_type,
+            )
         job.mark_success(url)
     except Exception as e:  # pragma: no cover - simplify
         job.mark_failed(str(e))
 
 
 @shared_task
-def import_products_task(job_id: str, file_bytes: bytes) -> None:
+def import_products_task(job_id: str, upload_ref: str) -> None:
     job = AsyncJob.objects.get(pk=job_id)
     job.mark_running()
     try:
-        from django.db import transaction
-
-        with transaction.atomic():
-            wb = load_workbook(io.BytesIO(file_bytes))
-            ws = wb.active
-            # Strict header
-            expected = ["name_uz", "name_ru", "category", "supplier", "image_url", "description", "status"]
-            header_cells = next(ws.iter_rows(min_row=1, max_row=1))
-            header = [c.value for c in header_cells]
-            if header != expected:
-                raise ValueError(f"Invalid header. Expected {expected}, got {header}")
-
-            actions: list[tuple[int, str, str, list[str]]] = []  # row, action, message, errors
-            created, updated, skipped = 0, 0, 0
-
-            for idx, row in enumerate(ws.iter_rows(min_row=2), start=2):
-                errors: list[str] = []
-                name_uz = (row[0].value or "").strip()
-                name_ru = (row[1].value or "").strip()
-                cat_name = (row[2].value or "").strip()
-                sup_name = (row[3].value or "").strip()
-                image_url = (row[4].value or "").strip()
-                description = (row[5].value or "").strip()
-                raw_status = row[6].value
-                try:
-                    status_val = _parse_boolean_from_cell(raw_status)
-                except ValueError as exc:
-                    errors.append(str(exc))
-
-                if not name_uz:
-                    errors.append("name_uz required")
-                if not name_ru:
-                    errors.append("name_ru required")
-                if not cat_name:
-                    errors.append("category required")
-                if not sup_name:
-                    errors.append("supplier required")
-
-                if errors:
-                    actions.append((idx, "skipped", "Validation errors", errors))
-                    skipped += 1
-                    continue
-
-                category, _c = Category.objects.get_or_create(name_uz=cat_name, defaults={"name_ru": cat_name})
-                supplier, _s = Supplier.objects.get_or_create(name=sup_name)
-
-                obj, was_created = Product.objects.update_or_create(
-                    name_uz=name_uz,
-                    defaults={
-                        "name_ru": name_ru,
-                        "category": category,
-                        "supplier": supplier,
-                        "image_url": image_url,
-                        "description": description,
-                        "status": status_val,
-                    },
-                )
-                if was_created:
-                    created += 1
-                    actions.append((idx, "created", f"Product {obj.id}", []))
-                else:
-                    updated += 1
-                    actions.append((idx, "updated", f"Product {obj.id}", []))
-
-        # Write detailed summary (outside transaction to avoid locking during file generation)
-        summary_wb = Workbook()
-        s = summary_wb.active
-        s.title = "Summary"
+        # Each batch commits on its own; see shop.product_import
+        try:
+            progress = ProgressReporter(job)
+            with open_staged(upload_ref) as fh:
+                result = import_products(iter_workbook_rows(fh, progress), progress=progress)
+            progress.finish()
+        finally:
+            discard_staged(upload_ref)
+        invalidate_catalog_cache()
+        # bulk_create/bulk_update send no signals
+        reset_counters("total_products")
+
+        summary_wb = Workbook(write_only=True)
+        s = summary_wb.create_sheet("Summary")
         s.append(["row", "action", "message", "errors"])
-        for row_num, action, message, errs in actions:
+        for row_num, action, message, errs in result.actions:
             s.append([row_num, action, message, "; ".join(errs)])
         totals = summary_wb.create_sheet("Totals")
         totals.append(["created", "updated", "skipped"])
-        totals.append([created, updated, skipped])
-        buf = io.BytesIO()
-        summary_wb.save(buf)
-        url = get_storage().save_bytes(buf.getvalue(), "import_products_summary.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        totals.append([result.created, result.updated, result.skipped])
+        with tempfile.TemporaryFile() as spool:
+            summary_wb.save(spool)
+            spool.seek(0)
+            url = get_storage("exports").save_stream(spool, "import_products_summary.xlsx", XLSX_CONTENT_TYPE)
         job.mark_success(url)
     except Exception as e:  # pragma: no cover - simplify
         job.mark_failed(str(e))
@@ -2,14 +2,21 @@
 Telegram Bot Service for sending notifications to admins.
 
 This service handles sending order notifications to admin Telegram chats.
+Messages to several chats are sent concurrently over one pooled HTTP session.
 """
 import logging
 import os
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+# Status codes worth retrying later; other 4xx (bad chat id, blocked bot) are permanent
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
 
 class TelegramService:
     """Service for sending messages via Telegram Bot API."""
@@ -17,7 +24,12 @@ class TelegramService:
     def __init__(self):
         self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN", "")
         self.admin_chat_ids = self._parse_admin_chat_ids()
-        self.api_url = f"https://api.telegram.org/bot{self.bot_token}" if self.bot_token else None
+        # Overridable so tests (or a proxy) can point at a local Bot API server
+        api_base = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
+        self.api_url = f"{api_base}/bot{self.bot_token}" if self.bot_token else None
+        self.timeout = float(os.getenv("TELEGRAM_TIMEOUT", "10"))
+        self.max_workers = int(os.getenv("TELEGRAM_MAX_WORKERS", "8"))
+        self._session: Optional[requests.Session] = None
 
     def _parse_admin_chat_ids(self) -> List[str]:
         """Parse admin chat IDs from environment variable."""
@@ -27,10 +39,29 @@ class TelegramService:
         # Support comma-separated or space-separated chat IDs
         return [cid.strip() for cid in chat_ids_str.replace(",", " ").split() if cid.strip()]
 
+    @property
+    def session(self) -> requests.Session:
+        """Process-wide HTTP session, so connections to the Bot API are reused."""
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+
     def is_configured(self) -> bool:
         """Check if Telegram bot is properly configured."""
         return bool(self.bot_token and self.admin_chat_ids and self.api_url)
 
+    def _post_message(self, chat_id: str, text: str, parse_mode: str = "HTML") -> None:
+        response = self.session.post(
+            f"{self.api_url}/sendMessage",
+            json={"chat_id": chat_id, "text": text, "parse_mode": parse_mode},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
     def send_message(self, chat_id: str, text: str, parse_mode: str = "HTML") -> bool:
         """
         Send a message to a specific Telegram chat.
@@ -48,37 +79,42 @@ class TelegramService:
             return False
 
         try:
-            url = f"{self.api_url}/sendMessage"
-            payload = {
-                "chat_id": chat_id,
-                "text": text,
-                "parse_mode": parse_mode,
-            }
-            response = requests.post(url, json=payload, timeout=10)
-            response.raise_for_status()
+            self._post_message(chat_id, text, parse_mode)
             logger.info(f"Telegram message sent successfully to chat_id: {chat_id}")
             return True
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to send Telegram message to {chat_id}: {e}")
             return False
 
-    def send_order_notification(self, order) -> bool:
+    def deliver_to_chats(self, chat_ids: List[str], text: str) -> Dict[str, str]:
         """
-        Send order notification to all admin chat IDs.
-
-        Args:
-            order: Order instance with user and items
+        Send one message to several chats concurrently.
 
         Returns:
-            True if at least one message was sent successfully
+            Mapping of chat ID to outcome: "sent", "retry" (network error, 429
+            or 5xx) or "failed" (permanent rejection, e.g. unknown chat).
         """
-        if not self.is_configured():
-            logger.warning(
-                "Telegram bot not configured. Set TELEGRAM_BOT_TOKEN and TELEGRAM_ADMIN_CHAT_IDS."
-            )
-            return False
-
-        # Build notification message
+        if not self.api_url or not chat_ids:
+            return {}
+
+        def deliver(chat_id: str) -> str:
+            try:
+                self._post_message(chat_id, text)
+                return "sent"
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                logger.error(f"Telegram rejected message to {chat_id} (HTTP {status}): {e}")
+                return "retry" if status in RETRYABLE_STATUS_CODES else "failed"
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Failed to send Telegram message to {chat_id}: {e}")
+                return "retry"
+
+        workers = max(1, min(self.max_workers, len(chat_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(chat_ids, pool.map(deliver, chat_ids)))
+
+    def build_order_message(self, order) -> str:
+        """Render the admin notification text for an order (names and quantities only)."""
         customer = order.user
         customer_name = customer.fio or customer.username
         if customer.user_type == customer.UserType.LEGAL and customer.company_name:
@@ -90,7 +126,7 @@ class TelegramService:
             for item in order.items.all()
         ])
 
-        message = f"""
+        return f"""
 🆕 <b>Yangi buyurtma</b>
 
 📋 <b>Buyurtma raqami:</b> {order.order_number}
@@ -104,13 +140,24 @@ class TelegramService:
 🔗 <b>Admin panel:</b> http://localhost:5173/admin
         """.strip()
 
-        # Send to all admin chat IDs
-        success_count = 0
-        for chat_id in self.admin_chat_ids:
-            if self.send_message(chat_id, message):
-                success_count += 1
+    def send_order_notification(self, order) -> bool:
+        """
+        Send order notification to all admin chat IDs.
+
+        Args:
+            order: Order instance with user and items
+
+        Returns:
+            True if at least one message was sent successfully
+        """
+        if not self.is_configured():
+            logger.warning(
+                "Telegram bot not configured. Set TELEGRAM_BOT_TOKEN and TELEGRAM_ADMIN_CHAT_IDS."
+            )
+            return False
 
-        return success_count > 0
+        outcomes = self.deliver_to_chats(self.admin_chat_ids, self.build_order_message(order))
+        return "sent" in outcomes.values()
 
     def send_to_admins(self, text: str) -> bool:
         """
@@ -125,14 +172,9 @@ class TelegramService:
         if not self.is_configured():
             return False
 
-        success_count = 0
-        for chat_id in self.admin_chat_ids:
-            if self.send_message(chat_id, text):
-                success_count += 1
-
-        return success_count > 0
+        outcomes = self.deliver_to_chats(self.admin_chat_ids, text)
+        return "sent" in outcomes.values()
 
 
 # Global instance
 telegram_service = TelegramService()
-
@@ -0,0 +1,104 @@
+"""
+Cluster-wide scoped rate limiting.
+
+DRF's ``ScopedRateThrottle`` keeps request histories in the default cache,
+which is per-process LocMem unless Redis is configured, so every worker
+counts on its own. ``RedisScopedRateThrottle`` keeps DRF's scope and rate
+configuration (``throttle_scope``, ``DEFAULT_THROTTLE_RATES``) but counts in
+one Redis sorted set per scope and client, shared by all processes:
+
+- A Lua script drops entries older than the window, counts the rest and
+  records the request only when under the limit, in one atomic step.
+- Timestamps come from the Redis server clock, so hosts with skewed clocks
+  agree on the window.
+
+``THROTTLE_STORE`` selects ``redis`` or ``cache`` (DRF's own behaviour).
+If Redis is unavailable the throttle fails open: the request is allowed, the
+error is logged, and Redis is not tried again for ``THROTTLE_REDIS_RETRY``
+seconds so an outage does not add a connect timeout to every request.
+"""
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from rest_framework.throttling import ScopedRateThrottle
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "throttle:"
+
+# KEYS[1]: window key; ARGV: window (ms), limit, unique member.
+# Returns {allowed, ms until the oldest entry leaves the window}.
+SLIDING_WINDOW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) < limit then
+  redis.call('ZADD', KEYS[1], now, ARGV[3])
+  redis.call('PEXPIRE', KEYS[1], window)
+  return {1, 0}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, tonumber(oldest[2]) + window - now}
+"""
+
+_script = None
+_redis_down_until = 0.0
+
+
+def _sliding_window():
+    global _script
+    if _script is None:
+        from .redis_client import get_redis
+
+        _script = get_redis().register_script(SLIDING_WINDOW_SCRIPT)
+    return _script
+
+
+class RedisScopedRateThrottle(ScopedRateThrottle):
+    """``ScopedRateThrottle`` with a sliding window shared through Redis."""
+
+    _wait: float | None = None
+
+    def allow_request(self, request, view):
+        if settings.THROTTLE_STORE != "redis":
+            return super().allow_request(request, view)
+
+        # Same scope/rate resolution as ScopedRateThrottle
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        return self._allow_redis()
+
+    def _allow_redis(self) -> bool:
+        global _redis_down_until
+        if time.monotonic() < _redis_down_until:
+            return True
+        try:
+            allowed, wait_ms = _sliding_window()(
+                keys=[f"{KEY_PREFIX}{self.key}"],
+                args=[self.duration * 1000, self.num_requests, uuid.uuid4().hex],
+            )
+        except Exception as e:
+            _redis_down_until = time.monotonic() + settings.THROTTLE_REDIS_RETRY
+            logger.warning("Rate limiting disabled, Redis unavailable: %s", e)
+            return True
+        if allowed:
+            return True
+        self._wait = max(int(wait_ms), 0) / 1000
+        return False
+
+    def wait(self):
+        if self._wait is not None:
+            return self._wait
+        return super().wait()
@@ -4,7 +4,9 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     AuthTokenObtainPairView,
     AuthTokenRefreshView,
+    AdminCacheStatsView,
     AdminOrdersViewSet,
+    AdminStorageStatsView,
     AdminSummaryView,
     AdminUsersViewSet,
     AdminChangeUserRoleView,
@@ -50,5 +52,7 @@ urlpatterns = [
     path("admin/import/products/template/", AdminImportTemplateView.as_view(), name="admin_import_products_template"),
     path("admin/jobs/<uuid:job_id>/", AdminJobStatusView.as_view(), name="admin_job_status"),
     path("admin/summary/", AdminSummaryView.as_view(), name="admin_summary"),
+    path("admin/cache/stats/", AdminCacheStatsView.as_view(), name="admin_cache_stats"),
+    path("admin/storage/stats/", AdminStorageStatsView.as_view(), name="admin_storage_stats"),
     path("admin/users/<int:user_id>/role/", AdminChangeUserRoleView.as_view(), name="admin_change_role"),
 ]
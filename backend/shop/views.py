@@ -1,30 +1,48 @@
-from decimal import Decimal
-
+import logging
 import os
+import threading
+import time
 from decimal import Decimal
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Count, Max, Prefetch, prefetch_related_objects
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet
 
-from .models import AsyncJob, Cart, CartItem, Category, Order, OrderItem, OrderNumberSequence, Product, SessionCart, SessionCartItem
+from .authentication import forget_user
+from .cache import CatalogCacheMixin, catalog_cache_stats, catalog_version, version_datetime
+from .conditional import make_etag, not_modified, set_validators
+from .guest_carts import get_guest_cart_store
+from .models import AsyncJob, Cart, CartItem, Category, Order, OrderItem, OrderNumberSequence, Product
+from .pagination import CreatedAtPagination
 from .permissions import IsAdmin, IsAdminOrReadOnly, IsAuthenticated, IsSuperAdmin
+from .progress import job_state
+from .search import ProductSearchFilter
+from .storage import storage_stats
+from .summary import admin_summary
+from .throttling import RedisScopedRateThrottle
 from rest_framework import permissions as drf_permissions
 from .serializers import (
     AdminOrderSerializer,
     CartItemSerializer,
     CartSerializer,
     CategorySerializer,
+    ClaimsTokenObtainPairSerializer,
+    ClaimsTokenRefreshSerializer,
     OrderSerializer,
     ProductSerializer,
     RegisterSerializer,
@@ -33,6 +51,36 @@ from .serializers import (
 )
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+# Item querysets covering the whole serializer graph (product + category + supplier),
+# so order and cart payloads cost a constant number of queries however many lines they have
+def _order_items_prefetch() -> Prefetch:
+    return Prefetch("items", queryset=OrderItem.objects.select_related("product__category", "product__supplier"))
+
+
+def _cart_items_prefetch() -> Prefetch:
+    return Prefetch("items", queryset=CartItem.objects.select_related("product__category", "product__supplier"))
+
+
+def _guest_session_key(request) -> str | None:
+    """Guest cart key sent by the client (X-Session-ID or an existing session); never creates a session."""
+    return request.headers.get("X-Session-ID") or request.session.session_key
+
+
+def _merge_guest_cart_into(user, session_key: str) -> None:
+    # The guest cart stays where it is and is merged on a later request; a store
+    # outage must not block logins or cart reads
+    try:
+        get_guest_cart_store().merge_into(user, session_key)
+    except Exception as e:
+        logger.warning("Failed to merge guest cart into user %s: %s", user.id, e)
+
+
+def _cart_data(cart: Cart) -> dict:
+    prefetch_related_objects([cart], _cart_items_prefetch())
+    return CartSerializer(cart).data
 
 
 class RegisterViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
@@ -40,7 +88,7 @@ class RegisterViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [RedisScopedRateThrottle]
     throttle_scope = "auth"
 
 
@@ -132,8 +180,12 @@ class DeleteAccountView(APIView):
                 status=403
             )
         
-        # Delete the user account
-        user.delete()
+        # Delete the user account; tokens already issued stop resolving to it.
+        # Refused (and rolled back) if that cannot be recorded.
+        user_id = user.id
+        with transaction.atomic():
+            user.delete()
+            forget_user(user_id)
         
         return Response(
             {"message": "Account deleted successfully."},
@@ -141,7 +193,7 @@ class DeleteAccountView(APIView):
         )
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     """Category CRUD (Admin write, public read)."""
     queryset = Category.objects.all().order_by("order", "id")
     serializer_class = CategorySerializer
@@ -150,7 +202,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
     search_fields = ["name_uz", "name_ru"]
 
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     """Supplier CRUD (Admin write, public read)."""
     queryset = None  # type: ignore
     serializer_class = SupplierSerializer
@@ -164,12 +216,14 @@ class SupplierViewSet(viewsets.ModelViewSet):
         return Supplier.objects.all().order_by("name")
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     """Product CRUD & list with filters/search (no prices exposed)."""
-    queryset = Product.objects.select_related("category", "supplier").all().order_by("id")
+    queryset = Product.objects.select_related("category", "supplier").defer("search_vector").order_by("id")
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrReadOnly]
     filterset_fields = ["status", "category", "supplier"]
+    # Ranked full-text/trigram search on PostgreSQL; icontains over search_fields elsewhere
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
     search_fields = ["name_uz", "name_ru", "description"]
 
 
@@ -184,7 +238,8 @@ class CartViewSet(viewsets.ViewSet):
             raise PermissionDenied("Cart functionality is not available for admin users.")
 
     def _session_key(self, request):
-        # Try custom header first (for frontend), then fall back to Django session
+        # Try custom header first (for frontend), then fall back to Django session.
+        # Only used when writing, so plain reads never create a session.
         custom_session_id = request.headers.get('X-Session-ID')
         if custom_session_id:
             return custom_session_id
@@ -193,40 +248,47 @@ class CartViewSet(viewsets.ViewSet):
         return request.session.session_key
 
     def _get_or_create_user_cart(self, user):
-        return Cart.objects.get_or_create(user=user)[0]
-
-    def _get_or_create_session_cart(self, request):
-        skey = self._session_key(request)
-        cart, _ = SessionCart.objects.get_or_create(session_key=skey)
-        return cart
-
-    def _merge_session_into_user(self, request, user):
-        sc = self._get_or_create_session_cart(request)
-        uc = self._get_or_create_user_cart(user)
-        for it in sc.items.all():
-            item, created = CartItem.objects.get_or_create(cart=uc, product=it.product, defaults={"quantity": it.quantity})
-            if not created:
-                item.quantity += it.quantity
-                item.save(update_fields=["quantity"])
-        sc.items.all().delete()
-        return uc
+        # By id, so a snapshot request.user (shop.authentication) is not loaded
+        return Cart.objects.get_or_create(user_id=user.id)[0]
 
-    def list(self, request):
-        self._check_not_admin(request.user)
-        if request.user.is_authenticated:
-            cart = self._merge_session_into_user(request, request.user)
-            return Response(CartSerializer(cart).data)
-        scart = self._get_or_create_session_cart(request)
+    def _user_cart(self, request):
+        """
+        The user's cart, absorbing a guest cart first if the client still sends one.
+
+        Normally the guest cart is merged at login; this covers clients that
+        logged in elsewhere. Without a guest cart this is a single read, so
+        reads stay read-only (apart from creating the cart on first use).
+        """
+        session_key = _guest_session_key(request)
+        if session_key:
+            _merge_guest_cart_into(request.user, session_key)
+        return self._get_or_create_user_cart(request.user)
+
+    def _guest_cart_data(self, request) -> dict:
+        session_key = _guest_session_key(request)
+        cart = get_guest_cart_store().load(session_key) if session_key else None
+        if cart is None:
+            return {"id": None, "items": [], "created_at": None}
+        products = Product.objects.select_related("category", "supplier").in_bulk(
+            [line.product_id for line in cart.lines]
+        )
         items = [
             {
-                "id": it.id,
-                "product": ProductSerializer(it.product).data,
-                "quantity": float(it.quantity),
-                "created_at": it.created_at,
+                "id": line.id,
+                "product": ProductSerializer(products[line.product_id]).data,
+                "quantity": float(line.quantity),
+                "created_at": line.created_at,
             }
-            for it in scart.items.select_related("product").all()
+            for line in cart.lines
+            if line.product_id in products  # product deleted since it was added
         ]
-        return Response({"id": scart.id, "items": items, "created_at": scart.created_at})
+        return {"id": cart.id, "items": items, "created_at": cart.created_at}
+
+    def list(self, request):
+        self._check_not_admin(request.user)
+        if request.user.is_authenticated:
+            return Response(_cart_data(self._user_cart(request)))
+        return Response(self._guest_cart_data(request))
 
     @action(detail=False, methods=["post"])
     def items(self, request):
@@ -236,20 +298,14 @@ class CartViewSet(viewsets.ViewSet):
         product = serializer.validated_data["product"]
         quantity = serializer.validated_data.get("quantity") or Decimal("1.00")
         if request.user.is_authenticated:
-            cart = self._merge_session_into_user(request, request.user)
+            cart = self._user_cart(request)
             item, created = CartItem.objects.get_or_create(cart=cart, product=product, defaults={"quantity": quantity})
             if not created:
                 item.quantity = quantity
                 item.save(update_fields=["quantity"])
-            return Response(CartSerializer(cart).data, status=status.HTTP_201_CREATED)
-        scart = self._get_or_create_session_cart(request)
-        sit, created = SessionCartItem.objects.get_or_create(
-            cart=scart, product=product, defaults={"quantity": quantity}
-        )
-        if not created:
-            sit.quantity = quantity
-            sit.save(update_fields=["quantity"])
-        return self.list(request)
+            return Response(_cart_data(cart), status=status.HTTP_201_CREATED)
+        get_guest_cart_store().set_quantity(self._session_key(request), product.id, quantity)
+        return Response(self._guest_cart_data(request))
 
     @action(detail=False, methods=["delete"], url_path="items/(?P<product_id>[^/.]+)")
     def remove(self, request, product_id: str | int):
@@ -257,10 +313,22 @@ class CartViewSet(viewsets.ViewSet):
         if request.user.is_authenticated:
             cart = self._get_or_create_user_cart(request.user)
             CartItem.objects.filter(cart=cart, product_id=product_id).delete()
-            return Response(CartSerializer(cart).data)
-        scart = self._get_or_create_session_cart(request)
-        SessionCartItem.objects.filter(cart=scart, product_id=product_id).delete()
-        return self.list(request)
+            return Response(_cart_data(cart))
+        session_key = _guest_session_key(request)
+        if session_key:
+            get_guest_cart_store().remove(session_key, product_id)
+        return Response(self._guest_cart_data(request))
+
+
+def _enqueue_order_notification(order_id: int) -> None:
+    from .tasks import send_order_notification_task
+
+    try:
+        # retry=False: an unreachable broker must fail fast instead of stalling checkout
+        send_order_notification_task.apply_async(args=[order_id], retry=False)
+    except Exception as e:
+        # Log error but don't fail the order creation
+        logger.error(f"Failed to enqueue Telegram notification for order {order_id}: {e}")
 
 
 class OrderViewSet(GenericViewSet):
@@ -276,58 +344,77 @@ class OrderViewSet(GenericViewSet):
     def get_throttles(self):  # apply throttle only to create action
         if getattr(self, "action", None) == "create":
             self.throttle_scope = "order_create"  # type: ignore[attr-defined]
-            self.throttle_classes = [ScopedRateThrottle]  # type: ignore[attr-defined]
+            self.throttle_classes = [RedisScopedRateThrottle]  # type: ignore[attr-defined]
             return [t() for t in self.throttle_classes]
         return []
 
+    def _validators(self, request, last_modified, *parts):
+        # Orders embed product details, so a catalog change also changes them
+        version = catalog_version()
+        etag = make_etag(request.user.id, request.get_full_path(), version, last_modified, *parts)
+        if version:
+            last_modified = max(filter(None, [last_modified, version_datetime(version)]))
+        return etag, last_modified
+
+    def _private(self, response, etag, last_modified):
+        set_validators(response, etag, last_modified, vary=["Authorization"])
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
     def list(self, request):
         self._check_customer_only()
-        qs = Order.objects.filter(user=request.user).order_by("-created_at").prefetch_related("items__product")
+        orders = Order.objects.filter(user_id=request.user.id)
+        # One aggregate validates the whole list before it is fetched and serialized
+        state = orders.aggregate(last_modified=Max("updated_at"), count=Count("id"))
+        etag, last_modified = self._validators(request, state["last_modified"], state["count"])
+        not_modified_response = not_modified(request, etag, last_modified)
+        if not_modified_response is not None:
+            return self._private(not_modified_response, etag, last_modified)
+
+        qs = orders.order_by("-created_at").prefetch_related(_order_items_prefetch())
         page = self.paginate_queryset(qs)  # type: ignore[attr-defined]
         if page is not None:
             serializer = OrderSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)  # type: ignore[attr-defined]
-        serializer = OrderSerializer(qs, many=True)
-        return Response(serializer.data)
+            response = self.get_paginated_response(serializer.data)  # type: ignore[attr-defined]
+        else:
+            response = Response(OrderSerializer(qs, many=True).data)
+        return self._private(response, etag, last_modified)
 
     def retrieve(self, request, pk=None):
         self._check_customer_only()
-        order = get_object_or_404(Order.objects.prefetch_related("items__product"), pk=pk)
+        if request.headers.get("If-None-Match") or request.headers.get("If-Modified-Since"):
+            updated_at = Order.objects.filter(pk=pk, user_id=request.user.id).values_list("updated_at", flat=True).first()
+            if updated_at is not None:
+                etag, last_modified = self._validators(request, updated_at)
+                not_modified_response = not_modified(request, etag, last_modified)
+                if not_modified_response is not None:
+                    return self._private(not_modified_response, etag, last_modified)
+        order = get_object_or_404(Order.objects.prefetch_related(_order_items_prefetch()), pk=pk)
         if order.user_id != request.user.id and getattr(request.user, "role", "") not in {"ADMIN", "SUPERADMIN"}:
             return Response({"detail": "Forbidden"}, status=403)
-        return Response(OrderSerializer(order).data)
+        etag, last_modified = self._validators(request, order.updated_at)
+        return self._private(Response(OrderSerializer(order).data), etag, last_modified)
 
     def create(self, request):
         self._check_customer_only()
-        cart = Cart.objects.filter(user=request.user).prefetch_related("items__product").first()
-        if not cart or cart.items.count() == 0:
-            return Response({"detail": "Cart is empty"}, status=400)
         with transaction.atomic():
+            # One SELECT both checks for an empty cart and fetches the lines to copy;
+            # read before allocating the order number so its lock is held briefly.
+            lines = list(
+                CartItem.objects.filter(cart__user_id=request.user.id).values_list("id", "product_id", "quantity")
+            )
+            if not lines:
+                return Response({"detail": "Cart is empty"}, status=400)
             order_number = OrderNumberSequence.next_for_today()
-            order = Order.objects.create(user=request.user, order_number=order_number)
-            for item in cart.items.all():
-                OrderItem.objects.create(order=order, product=item.product, quantity=item.quantity)
-            cart.items.all().delete()
-        
-        # Send Telegram notification to admins (async, don't block response)
-        try:
-            from .telegram_service import telegram_service
-            # Use Celery task if available, otherwise send synchronously
-            try:
-                from .tasks import send_order_notification_task
-                send_order_notification_task.delay(order.id)
-            except Exception:
-                # Fallback to synchronous send if Celery not available
-                # Reload order with relationships for notification
-                order.refresh_from_db()
-                order = Order.objects.select_related("user").prefetch_related("items__product").get(pk=order.id)
-                telegram_service.send_order_notification(order)
-        except Exception as e:
-            # Log error but don't fail the order creation
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Failed to send Telegram notification for order {order.id}: {e}")
-        
+            order = Order.objects.create(user_id=request.user.id, order_number=order_number)
+            OrderItem.objects.bulk_create(
+                [OrderItem(order=order, product_id=product_id, quantity=quantity) for _, product_id, quantity in lines]
+            )
+            CartItem.objects.filter(pk__in=[item_id for item_id, _, _ in lines]).delete()
+            # Telegram delivery (and its retries) happens in the worker, never in this request
+            transaction.on_commit(lambda: _enqueue_order_notification(order.id))
+
+        order = Order.objects.prefetch_related(_order_items_prefetch()).get(pk=order.pk)
         return Response(OrderSerializer(order).data, status=201)
 
     @action(detail=True, methods=["post"])
@@ -339,24 +426,32 @@ class OrderViewSet(GenericViewSet):
         - Quantities accumulate on repeated calls (idempotence is additive)
         """
         self._check_customer_only()
-        order = get_object_or_404(Order.objects.prefetch_related("items__product"), pk=pk)
+        order = get_object_or_404(Order, pk=pk)
 
         # Check ownership (only the customer who placed the order can reorder)
         if order.user_id != request.user.id:
             return Response({"detail": "Forbidden"}, status=403)
 
-        # Customer cart only
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        for it in order.items.all():
-            ci, created = CartItem.objects.get_or_create(cart=cart, product=it.product, defaults={"quantity": it.quantity})
-            if not created:
-                ci.quantity += it.quantity
-                ci.save(update_fields=["quantity"])
-        return Response(CartSerializer(cart).data)
+        # Customer cart only; merge all lines with one read and two bulk writes
+        cart, _ = Cart.objects.get_or_create(user_id=request.user.id)
+        wanted: dict[int, Decimal] = {}
+        for product_id, quantity in order.items.values_list("product_id", "quantity"):
+            wanted[product_id] = wanted.get(product_id, Decimal("0")) + quantity
+        with transaction.atomic():
+            existing = {
+                ci.product_id: ci
+                for ci in CartItem.objects.select_for_update().filter(cart=cart, product_id__in=wanted)
+            }
+            for product_id, ci in existing.items():
+                ci.quantity += wanted[product_id]
+            CartItem.objects.bulk_update(existing.values(), ["quantity"])
+            CartItem.objects.bulk_create(
+                [CartItem(cart=cart, product_id=pid, quantity=qty) for pid, qty in wanted.items() if pid not in existing]
+            )
+        return Response(_cart_data(cart))
 
     @action(detail=True, methods=["post"], permission_classes=[IsAdmin])
     def status(self, request, pk=None):
-        order = get_object_or_404(Order, pk=pk)
         new_status = request.data.get("status")
         legal = {
             Order.Status.RECEIVED: {Order.Status.CONFIRMED},
@@ -365,51 +460,60 @@ class OrderViewSet(GenericViewSet):
         }
         if new_status not in dict(Order.Status.choices):
             return Response({"detail": "Invalid status"}, status=400)
-        allowed = legal.get(order.status, set())
-        if new_status not in allowed:
-            return Response({"detail": f"Illegal transition from {order.status} to {new_status}"}, status=400)
-        order.status = new_status
-        order.save(update_fields=["status", "updated_at"])
+        with transaction.atomic():
+            # Locked: a concurrent identical transition sees the committed status
+            # and is refused, so the summary counters are adjusted once
+            order = get_object_or_404(Order.objects.select_for_update(), pk=pk)
+            allowed = legal.get(order.status, set())
+            if new_status not in allowed:
+                return Response({"detail": f"Illegal transition from {order.status} to {new_status}"}, status=400)
+            order.status = new_status
+            order.save(update_fields=["status", "updated_at"])
+        prefetch_related_objects([order], _order_items_prefetch())
         return Response(OrderSerializer(order).data)
 
 
 class AdminOrdersViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAdmin]
     serializer_class = AdminOrderSerializer
-    queryset = Order.objects.select_related("user").prefetch_related("items__product").all().order_by("-created_at")
+    pagination_class = CreatedAtPagination
+    queryset = Order.objects.select_related("user").prefetch_related(_order_items_prefetch()).all().order_by("-created_at", "-id")
     filterset_fields = {"status": ["exact"], "user": ["exact"], "created_at": ["date__gte", "date__lte"]}
-    ordering = ["-created_at"]
+    ordering = ["-created_at", "-id"]
 
 
 class AdminSummaryView(APIView):
+    """Dashboard counters, kept incrementally in the database (see shop.summary)."""
     permission_classes = [IsAdmin]
 
     def get(self, request):
-        from django.utils import timezone
-        today = timezone.localdate()
-        from .models import User as U, Product as P
-
-        total_products = P.objects.filter(status=True).count()
-        total_customers = U.objects.filter(role__in=["CUSTOMER"]).count()
-        qs = Order.objects.all()
-        todays_orders = qs.filter(created_at__date=today).count()
-        new_orders = qs.filter(status=Order.Status.RECEIVED).count()
-        return Response(
-            {
-                "today_orders": todays_orders,
-                "new_orders": new_orders,
-                "total_products": total_products,
-                "total_customers": total_customers,
-            }
-        )
+        return Response(admin_summary())
+
+
+class AdminCacheStatsView(APIView):
+    """Hit/miss counters of the public catalog response cache."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(catalog_cache_stats())
+
+
+class AdminStorageStatsView(APIView):
+    """Save counts and timings per storage backend name."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(storage_stats())
 
 
 class AdminUsersViewSet(viewsets.ReadOnlyModelViewSet):
     """View all users (admin only)."""
     permission_classes = [IsSuperAdmin]
     serializer_class = UserSerializer
-    queryset = User.objects.all().order_by("-created_at")
+    pagination_class = CreatedAtPagination
+    queryset = User.objects.all().order_by("-created_at", "-id")
     filterset_fields = ["role", "user_type"]
+    ordering = ["-created_at", "-id"]
     search_fields = ["username", "email", "fio"]
 
 
@@ -439,7 +543,9 @@ class AdminChangeUserRoleView(APIView):
         
         old_role = user.role
         user.role = new_role
-        user.save(update_fields=["role"])
+        # shop.signals revokes the old role claims; refused (and rolled back) if it cannot
+        with transaction.atomic():
+            user.save(update_fields=["role"])
         
         return Response({
             "id": user.id,
@@ -451,18 +557,45 @@ class AdminChangeUserRoleView(APIView):
 
 
 # JWT views with throttling
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 
+def _merge_guest_cart(request, access_token: str) -> None:
+    """Merge the client's guest cart into the token owner's cart."""
+    session_key = _guest_session_key(request)
+    if not session_key:
+        return
+    user_id = AccessToken(access_token)[jwt_settings.USER_ID_CLAIM]
+    user = User.objects.filter(pk=user_id).only("id", "role").first()
+    if user is not None and user.role == User.Role.CUSTOMER:
+        _merge_guest_cart_into(user, session_key)
+
+
 class AuthTokenObtainPairView(TokenObtainPairView):
-    throttle_classes = [ScopedRateThrottle]
+    serializer_class = ClaimsTokenObtainPairSerializer
+    throttle_classes = [RedisScopedRateThrottle]
     throttle_scope = "auth"
 
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        if response.status_code == 200:
+            _merge_guest_cart(request, response.data["access"])
+        return response
+
 
 class AuthTokenRefreshView(TokenRefreshView):
-    throttle_classes = [ScopedRateThrottle]
+    serializer_class = ClaimsTokenRefreshSerializer
+    throttle_classes = [RedisScopedRateThrottle]
     throttle_scope = "auth"
 
+    def post(self, request, *args, **kwargs):
+        response = super().post(request, *args, **kwargs)
+        if response.status_code == 200:
+            _merge_guest_cart(request, response.data["access"])
+        return response
+
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
@@ -552,17 +685,22 @@ class AdminExportOrdersView(APIView):
         """
         Enqueue an async XLSX export job.
 
-        Body params (all optional): status, user_id, date_from, date_to.
+        Body params (all optional): status, user_id, date_from, date_to,
+        format (xlsx, csv or csv.gz; default xlsx).
         Returns: job_id and initial status to be polled via GET /api/admin/jobs/:id
         """
         # Accept optional filters: status, user_id, date_from, date_to
         import uuid
-        from .tasks import export_orders_task
+        from .tasks import EXPORT_FORMATS, export_orders_task
+
+        fmt = request.data.get("format")
+        if fmt is not None and fmt not in EXPORT_FORMATS:
+            return Response({"detail": f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
 
         job = AsyncJob.objects.create(
             id=uuid.uuid4(),
             type=AsyncJob.Type.EXPORT_ORDERS,
-            input_params={k: request.data.get(k) for k in ["status", "user_id", "date_from", "date_to"] if request.data.get(k) is not None},
+            input_params={k: request.data.get(k) for k in ["status", "user_id", "date_from", "date_to", "format"] if request.data.get(k) is not None},
         )
         export_orders_task.delay(str(job.id), job.input_params)
         return Response({"job_id": str(job.id), "status": job.status}, status=202)
@@ -570,7 +708,7 @@ class AdminExportOrdersView(APIView):
 
 class AdminImportProductsView(APIView):
     permission_classes = [IsAdmin]
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [RedisScopedRateThrottle]
     throttle_scope = "upload_import"
 
     def post(self, request):
@@ -581,6 +719,7 @@ class AdminImportProductsView(APIView):
         Poll job status using GET /api/admin/jobs/:id.
         """
         import uuid
+        from .product_import import discard_staged, stage_upload
         from .tasks import import_products_task
 
         file = request.FILES.get("file")
@@ -603,15 +742,21 @@ class AdminImportProductsView(APIView):
         if getattr(file, "size", None) and file.size > max_mb * 1024 * 1024:
             return Response({"detail": f"File too large. Max {int(max_mb)} MB"}, status=400)
 
-        file_bytes = file.read()
-        if not file_bytes:
+        if not file.size:
             return Response({"detail": "Uploaded file is empty"}, status=400)
 
-        job = AsyncJob.objects.create(
-            id=uuid.uuid4(),
-            type=AsyncJob.Type.IMPORT_PRODUCTS,
-        )
-        import_products_task.delay(str(job.id), file_bytes)
+        # Only a reference to the staged file goes through the broker
+        upload_ref = stage_upload(file)
+        try:
+            job = AsyncJob.objects.create(
+                id=uuid.uuid4(),
+                type=AsyncJob.Type.IMPORT_PRODUCTS,
+            )
+            import_products_task.delay(str(job.id), upload_ref)
+        except Exception:
+            # No task will ever read it
+            discard_staged(upload_ref)
+            raise
         return Response({"job_id": str(job.id), "status": job.status}, status=202)
 
 
@@ -647,14 +792,69 @@ class AdminImportTemplateView(APIView):
 class AdminJobStatusView(APIView):
     permission_classes = [IsAdmin]
 
+    POLL_INTERVAL = 0.25
+    # Requests currently long-polling in this process
+    _waiters = 0
+    _waiters_lock = threading.Lock()
+
+    @classmethod
+    def _claim_wait_slot(cls) -> bool:
+        with cls._waiters_lock:
+            if cls._waiters >= settings.JOB_STATUS_MAX_WAITERS:
+                return False
+            cls._waiters += 1
+            return True
+
+    @classmethod
+    def _release_wait_slot(cls) -> None:
+        with cls._waiters_lock:
+            cls._waiters -= 1
+
     def get(self, request, job_id: str):
         """
-        Return the status of an async job enqueued earlier.
+        Return the status and progress of an async job enqueued earlier.
+
+        Long-poll: pass `since` (the `rev` from a previous response) and
+        `wait` (seconds, capped by JOB_STATUS_MAX_WAIT). The request returns
+        as soon as the job state changes, or after `wait` seconds. Waiting
+        only reads the cache, never the database. A waiting request holds a
+        server thread, so at most JOB_STATUS_MAX_WAITERS wait at once per
+        process; beyond that the current state is returned right away.
         """
         try:
             job = AsyncJob.objects.get(pk=job_id)
         except AsyncJob.DoesNotExist:
             return Response({"detail": "Not found"}, status=404)
+
+        state = job_state(job.id) or {}
+        since = request.query_params.get("since")
+        try:
+            wait = min(float(request.query_params.get("wait", 0)), settings.JOB_STATUS_MAX_WAIT)
+        except ValueError:
+            return Response({"detail": "wait must be a number"}, status=400)
+        finished = job.status in (AsyncJob.Status.SUCCESS, AsyncJob.Status.FAILED)
+        unchanged = since and str(state.get("rev")) == since
+        if unchanged and wait > 0 and not finished and self._claim_wait_slot():
+            try:
+                deadline = time.monotonic() + wait
+                while time.monotonic() < deadline:
+                    time.sleep(self.POLL_INTERVAL)
+                    latest = job_state(job.id) or {}
+                    if str(latest.get("rev")) != since:
+                        state = latest
+                        job.refresh_from_db()
+                        break
+            finally:
+                self._release_wait_slot()
+
+        running = job.status == AsyncJob.Status.RUNNING
+        processed = state.get("processed", job.processed) if running else job.processed
+        total = state.get("total", job.total) if running else job.total
+        rows_per_second = None
+        if job.started_at and processed:
+            elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+            if elapsed > 0:
+                rows_per_second = round(processed / elapsed, 1)
         return Response(
             {
                 "id": str(job.id),
@@ -662,7 +862,12 @@ class AdminJobStatusView(APIView):
                 "status": job.status,
                 "result_url": job.result_url,
                 "error": job.error,
+                "processed": processed,
+                "total": total,
+                "rows_per_second": rows_per_second,
+                "rev": str(state["rev"]) if "rev" in state else None,
                 "created_at": job.created_at,
+                "started_at": job.started_at,
                 "finished_at": job.finished_at,
             }
         )
@@ -0,0 +1,25 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    # Throttle counters and cached catalog responses must not leak between tests
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def _import_spool(settings, tmp_path):
+    # Staged import uploads go to a per-test directory
+    settings.IMPORT_SPOOL_DIR = tmp_path / "spool"
+    return settings.IMPORT_SPOOL_DIR
+
+
+@pytest.fixture(autouse=True)
+def _image_spool(settings, tmp_path):
+    # Staged product images go to a per-test directory
+    settings.IMAGE_SPOOL_DIR = tmp_path / "images"
+    return settings.IMAGE_SPOOL_DIR
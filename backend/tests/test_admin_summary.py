@@ -0,0 +1,119 @@
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def admin(db):
+    return get_user_model().objects.create_user(username="sum_admin", password="Pass123!", role="ADMIN")
+
+
+def _actual():
+    from django.utils import timezone
+    from shop.summary import COUNTERS
+
+    return {name: count(timezone.localdate()) for name, count in COUNTERS.items()}
+
+
+@pytest.mark.django_db
+def test_admin_summary_counters_follow_writes(admin, django_capture_on_commit_callbacks, django_assert_num_queries):
+    from shop.models import Category, Order, Product, Supplier
+
+    client = APIClient()
+    client.force_authenticate(admin)
+    U = get_user_model()
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+
+    assert client.get("/api/admin/summary/").json() == {
+        "today_orders": 0,
+        "new_orders": 0,
+        "total_products": 0,
+        "total_customers": 0,
+    }
+
+    with django_capture_on_commit_callbacks(execute=True):
+        buyer = U.objects.create_user(username="sum_buyer", password="Pass123!")
+        U.objects.create_user(username="sum_staff", password="Pass123!", role="ADMIN")
+        product = Product.objects.create(name_uz="P", name_ru="P", category=cat, supplier=sup)
+        Product.objects.create(name_uz="Q", name_ru="Q", category=cat, supplier=sup, status=False)
+        first = Order.objects.create(user=buyer, order_number="#20250101-001")
+        Order.objects.create(user=buyer, order_number="#20250101-002")
+
+    # Stored values plus pending deltas: one query, no COUNTs
+    with django_assert_num_queries(1):
+        body = client.get("/api/admin/summary/").json()
+    assert body == {"today_orders": 2, "new_orders": 2, "total_products": 1, "total_customers": 1}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order = Order.objects.get(pk=first.pk)  # loaded: status transition is tracked
+        order.status = Order.Status.CONFIRMED
+        order.save(update_fields=["status", "updated_at"])
+        product = Product.objects.get(pk=product.pk)
+        product.status = False
+        product.save()
+        staff = U.objects.get(username="sum_staff")
+        staff.role = U.Role.CUSTOMER
+        staff.save(update_fields=["role"])
+        Order.objects.filter(order_number="#20250101-002").delete()
+
+    body = client.get("/api/admin/summary/").json()
+    assert body == {"today_orders": 1, "new_orders": 0, "total_products": 0, "total_customers": 2}
+    assert body == _actual()
+
+
+@pytest.mark.django_db
+def test_reconcile_summary_corrects_drift(admin, django_capture_on_commit_callbacks):
+    from shop.models import Category, Product, Supplier
+    from shop.summary import admin_summary, reconcile_summary
+
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    assert admin_summary()["total_products"] == 0
+
+    # bulk_create sends no signals, so the stored counter goes stale
+    Product.objects.bulk_create([Product(name_uz=f"P{i}", name_ru="P", category=cat, supplier=sup) for i in range(3)])
+    assert admin_summary()["total_products"] == 0
+
+    assert reconcile_summary() == {"total_products": {"stored": 0, "actual": 3}}
+    assert admin_summary() == _actual()
+    assert reconcile_summary() == {}
+
+
+@pytest.mark.django_db
+def test_summary_deltas_commit_with_the_change(admin):
+    from django.db import transaction
+    from shop.models import Order, SummaryDelta
+    from shop.summary import admin_summary
+
+    buyer = get_user_model().objects.create_user(username="sum_rollback", password="Pass123!")
+    assert admin_summary()["new_orders"] == 0
+
+    with pytest.raises(RuntimeError), transaction.atomic():
+        Order.objects.create(user=buyer, order_number="#20250101-009")
+        raise RuntimeError
+    assert not SummaryDelta.objects.exists()
+    assert admin_summary()["new_orders"] == 0
+
+    Order.objects.create(user=buyer, order_number="#20250101-010")
+    assert admin_summary()["new_orders"] == 1
+    assert SummaryDelta.objects.filter(name="new_orders").exists()
+
+
+@pytest.mark.django_db
+def test_recount_folds_pending_deltas_once(admin):
+    from shop.models import Order, SummaryCounter, SummaryDelta
+    from shop.summary import admin_summary, reconcile_summary
+
+    buyer = get_user_model().objects.create_user(username="sum_fold", password="Pass123!")
+    admin_summary()
+    Order.objects.create(user=buyer, order_number="#20250101-011")
+    Order.objects.create(user=buyer, order_number="#20250101-012")
+
+    assert reconcile_summary() == {}
+    assert not SummaryDelta.objects.filter(name="new_orders").exists()
+    assert SummaryCounter.objects.get(name="new_orders").value == 2
+
+    Order.objects.create(user=buyer, order_number="#20250101-013")
+    assert admin_summary() == _actual()
+    assert admin_summary()["new_orders"] == 3
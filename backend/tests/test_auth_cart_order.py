@@ -234,3 +234,33 @@ def test_reorder_accumulates_quantities(client):
     assert resp2.status_code == 200
     q2 = resp2.json()["items"][0]["quantity"]
     assert q2 == 4
+
+
+@pytest.mark.django_db
+def test_checkout_copies_all_cart_lines_in_bulk():
+    from decimal import Decimal
+
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from shop.models import Cart, CartItem, Category, Supplier, Product, OrderItem
+
+    U = get_user_model()
+    user = U.objects.create_user(username="bulk", password="Pass123!")
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    products = Product.objects.bulk_create(
+        [Product(name_uz=f"P{i}", name_ru=f"P{i}", category=cat, supplier=sup) for i in range(60)]
+    )
+    cart = Cart.objects.create(user=user)
+    CartItem.objects.bulk_create([CartItem(cart=cart, product=p, quantity=Decimal("1.50")) for p in products])
+
+    client = APIClient()
+    client.force_authenticate(user)
+    resp = client.post("/api/orders/")
+    assert resp.status_code == 201
+    assert len(resp.json()["items"]) == 60
+    assert OrderItem.objects.filter(order_id=resp.json()["id"], quantity=Decimal("1.50")).count() == 60
+    assert not CartItem.objects.filter(cart=cart).exists()
+
+    # Second checkout sees an empty cart
+    assert client.post("/api/orders/").status_code == 400
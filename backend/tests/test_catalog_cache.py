@@ -0,0 +1,58 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_product_list_served_from_cache_without_sql(client, django_assert_num_queries):
+    from shop.models import Category, Supplier, Product
+
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    Product.objects.create(name_uz="P", name_ru="P", category=cat, supplier=sup)
+
+    first = client.get("/api/products/?status=true")
+    assert first.status_code == 200
+    assert first["X-Cache"] == "MISS"
+
+    with django_assert_num_queries(0):
+        second = client.get("/api/products/?status=true")
+    assert second["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+
+    # Different query string or language is a separate entry
+    assert client.get("/api/products/?status=false")["X-Cache"] == "MISS"
+    assert client.get("/api/products/?status=true", HTTP_ACCEPT_LANGUAGE="ru")["X-Cache"] == "MISS"
+
+
+@pytest.mark.django_db
+def test_catalog_cache_evicted_on_save_and_delete(client, django_capture_on_commit_callbacks):
+    from shop.cache import catalog_cache_stats
+    from shop.models import Category, Supplier, Product
+
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    with django_capture_on_commit_callbacks(execute=True):
+        prod = Product.objects.create(name_uz="Old", name_ru="Old", category=cat, supplier=sup)
+
+    assert client.get(f"/api/products/{prod.id}/").json()["name_uz"] == "Old"
+    assert client.get(f"/api/products/{prod.id}/")["X-Cache"] == "HIT"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        prod.name_uz = "New"
+        prod.save()
+    resp = client.get(f"/api/products/{prod.id}/")
+    assert resp["X-Cache"] == "MISS"
+    assert resp.json()["name_uz"] == "New"
+
+    # Category changes evict product responses too (products embed their category)
+    with django_capture_on_commit_callbacks(execute=True):
+        cat.name_uz = "Renamed"
+        cat.save()
+    assert client.get(f"/api/products/{prod.id}/").json()["category"]["name_uz"] == "Renamed"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        prod.delete()
+    assert client.get(f"/api/products/{prod.id}/").status_code == 404
+
+    stats = catalog_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
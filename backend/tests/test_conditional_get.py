@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def product(db):
+    from shop.models import Category, Product, Supplier
+
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    return Product.objects.create(name_uz="P", name_ru="P", category=cat, supplier=sup)
+
+
+@pytest.mark.django_db
+def test_catalog_revalidation_returns_304_until_catalog_changes(
+    client, product, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    first = client.get("/api/products/")
+    assert first.status_code == 200
+    etag = first["ETag"]
+    assert etag.startswith('"') and first["Last-Modified"]
+
+    # Neither SQL nor serializers: answered from the catalog version alone
+    with django_assert_num_queries(0):
+        cached = client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+    assert cached.status_code == 304
+    assert cached["ETag"] == etag
+    assert not cached.content
+    assert client.get("/api/products/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code == 304
+
+    # Validators are per query string
+    assert client.get("/api/products/?status=true", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.name_ru = "Курица"
+        product.save()
+    changed = client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200
+    assert changed["ETag"] != etag
+    assert changed.json()["results"][0]["name_ru"] == "Курица"
+
+
+@pytest.mark.django_db
+def test_order_revalidation_returns_304_until_order_changes(product, django_assert_num_queries):
+    from shop.models import Order, OrderItem
+
+    user = get_user_model().objects.create_user(username="etag_customer", password="Pass123!")
+    order = Order.objects.create(user=user, order_number="#20250101-001")
+    OrderItem.objects.create(order=order, product=product, quantity=Decimal("1"))
+    client = APIClient()
+    client.force_authenticate(user)
+
+    listing = client.get("/api/orders/")
+    assert listing.status_code == 200
+    assert "private" in listing["Cache-Control"]
+    with django_assert_num_queries(1):  # the validating aggregate only
+        assert client.get("/api/orders/", HTTP_IF_NONE_MATCH=listing["ETag"]).status_code == 304
+
+    detail = client.get(f"/api/orders/{order.id}/")
+    with django_assert_num_queries(1):
+        assert client.get(f"/api/orders/{order.id}/", HTTP_IF_NONE_MATCH=detail["ETag"]).status_code == 304
+
+    order.status = Order.Status.CONFIRMED
+    order.save(update_fields=["status", "updated_at"])
+    assert client.get("/api/orders/", HTTP_IF_NONE_MATCH=listing["ETag"]).status_code == 200
+    assert client.get(f"/api/orders/{order.id}/", HTTP_IF_NONE_MATCH=detail["ETag"]).status_code == 200
+
+    # Another customer's order is never answered from validators
+    other = get_user_model().objects.create_user(username="etag_other", password="Pass123!")
+    client.force_authenticate(other)
+    assert client.get(f"/api/orders/{order.id}/", HTTP_IF_NONE_MATCH=detail["ETag"]).status_code == 403
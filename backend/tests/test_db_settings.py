@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SCRIPT = """
+import json
+from django.conf import settings
+db = settings.DATABASES["default"]
+print(json.dumps({k: db.get(k) for k in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "OPTIONS")}))
+"""
+
+
+def _postgres_settings(**env):
+    # Settings are evaluated once per process, so load them in a fresh interpreter
+    full_env = {
+        k: v for k, v in os.environ.items() if k != "USE_SQLITE_FOR_TESTS" and not k.startswith("DB_")
+    }
+    full_env.update(
+        DJANGO_SETTINGS_MODULE="core.settings.dev",
+        POSTGRES_DB="hc",
+        POSTGRES_USER="hc",
+        POSTGRES_PASSWORD="hc",
+        **env,
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", SCRIPT], cwd=BACKEND_DIR, env=full_env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "env, expected",
+    [
+        ({}, {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": True, "OPTIONS": {}}),
+        ({"DB_CONN_MAX_AGE": "none"}, {"CONN_MAX_AGE": None, "CONN_HEALTH_CHECKS": True, "OPTIONS": {}}),
+        (
+            {"DB_POOL": "1", "DB_POOL_MAX_SIZE": "20"},
+            {
+                "CONN_MAX_AGE": 0,
+                "CONN_HEALTH_CHECKS": True,
+                "OPTIONS": {"pool": {"min_size": 2, "max_size": 20, "timeout": 10.0}},
+            },
+        ),
+    ],
+)
+def test_postgres_connection_reuse_from_env(env, expected):
+    assert _postgres_settings(**env) == expected
@@ -71,3 +71,139 @@ def test_admin_import_template_download():
         "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
     assert resp.content
+
+
+def _seed_orders(count: int, items_per_order: int):
+    from shop.models import Category, Supplier, Product, Order, OrderItem
+
+    user = get_user_model().objects.create_user(username="exporter", password="Pass123!")
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    products = Product.objects.bulk_create(
+        [Product(name_uz=f"P{i}", name_ru=f"P{i}", category=cat, supplier=sup) for i in range(items_per_order)]
+    )
+    for n in range(count):
+        order = Order.objects.create(user=user, order_number=f"#20250101-{n:03d}")
+        OrderItem.objects.bulk_create([OrderItem(order=order, product=p, quantity=2) for p in products])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("fmt", ["xlsx", "csv", "csv.gz"])
+def test_export_orders_task_streams_every_item(settings, tmp_path, monkeypatch, fmt):
+    import csv
+    import gzip
+    import uuid
+
+    from openpyxl import load_workbook
+    from shop.models import AsyncJob
+    from shop.tasks import EXPORT_HEADERS, export_orders_task
+
+    monkeypatch.setenv("STORAGE_BACKEND", "LOCAL")
+    settings.MEDIA_ROOT = tmp_path
+    settings.EXPORT_CHUNK_SIZE = 7  # force several fetch chunks
+    _seed_orders(count=5, items_per_order=4)
+
+    job = AsyncJob.objects.create(id=uuid.uuid4(), type=AsyncJob.Type.EXPORT_ORDERS)
+    export_orders_task(str(job.id), {"format": fmt})
+    job.refresh_from_db()
+    assert job.status == AsyncJob.Status.SUCCESS, job.error
+    assert job.result_url.endswith(f".{fmt}")
+    assert (job.processed, job.total) == (20, 20)
+    assert job.started_at is not None
+
+    (path,) = (tmp_path / "files").iterdir()
+    if fmt == "xlsx":
+        rows = [list(r) for r in load_workbook(path, read_only=True).active.iter_rows(values_only=True)]
+    else:
+        opener = gzip.open if fmt == "csv.gz" else open
+        with opener(path, "rt", encoding="utf-8", newline="") as fh:
+            rows = list(csv.reader(fh))
+    assert rows[0] == EXPORT_HEADERS
+    assert len(rows) == 1 + 5 * 4
+    assert {r[0] for r in rows[1:]} == {f"#20250101-{n:03d}" for n in range(5)}
+
+
+@pytest.mark.django_db
+def test_admin_export_rejects_unknown_format():
+    client = APIClient()
+    admin_user = get_user_model().objects.create_user(username="adminf", password="Pass123!", role="ADMIN")
+    client.force_authenticate(admin_user)
+    resp = client.post(reverse("admin_export_orders"), {"format": "pdf"}, format="json")
+    assert resp.status_code == 400
+
+
+@pytest.mark.django_db
+def test_progress_reporter_publishes_at_bounded_rate():
+    import uuid
+
+    from shop.models import AsyncJob
+    from shop.progress import ProgressReporter, job_state
+
+    job = AsyncJob.objects.create(id=uuid.uuid4(), type=AsyncJob.Type.EXPORT_ORDERS)
+    progress = ProgressReporter(job, total=1000, interval=3600)
+    first_rev = job_state(job.id)["rev"]
+    with mock.patch("shop.progress.publish_job_state") as publish:
+        for _ in progress.track(range(1000)):
+            pass
+    publish.assert_not_called()
+
+    progress.finish()
+    job.refresh_from_db()
+    assert (job.processed, job.total) == (1000, 1000)
+    state = job_state(job.id)
+    assert state["processed"] == 1000 and state["rev"] != first_rev
+
+
+@pytest.mark.django_db
+def test_job_status_long_poll_returns_on_change():
+    import threading
+    import time
+    import uuid
+
+    from shop.models import AsyncJob
+    from shop.progress import publish_job_state
+
+    client = APIClient()
+    client.force_authenticate(get_user_model().objects.create_user(username="poller", password="x", role="ADMIN"))
+    job = AsyncJob.objects.create(id=uuid.uuid4(), type=AsyncJob.Type.IMPORT_PRODUCTS)
+    job.mark_running()
+    url = reverse("admin_job_status", kwargs={"job_id": job.id})
+
+    first = client.get(url).json()
+    assert first["status"] == "RUNNING" and first["rev"]
+
+    # Nothing changes: the request waits and returns the same revision
+    start = time.monotonic()
+    idle = client.get(url, {"since": first["rev"], "wait": "0.5"}).json()
+    assert time.monotonic() - start >= 0.5
+    assert idle["rev"] == first["rev"]
+
+    timer = threading.Timer(0.3, publish_job_state, args=[job.id], kwargs={"processed": 42, "total": 100})
+    timer.start()
+    start = time.monotonic()
+    changed = client.get(url, {"since": first["rev"], "wait": "10"}).json()
+    timer.join()
+    assert time.monotonic() - start < 5
+    assert changed["rev"] != first["rev"]
+    assert (changed["processed"], changed["total"]) == (42, 100)
+
+
+@pytest.mark.django_db
+def test_job_status_long_poll_is_limited_per_process(settings):
+    import uuid
+
+    from shop.models import AsyncJob
+
+    settings.JOB_STATUS_MAX_WAITERS = 0
+    client = APIClient()
+    client.force_authenticate(get_user_model().objects.create_user(username="tabs", password="x", role="ADMIN"))
+    job = AsyncJob.objects.create(id=uuid.uuid4(), type=AsyncJob.Type.IMPORT_PRODUCTS)
+    job.mark_running()
+    url = reverse("admin_job_status", kwargs={"job_id": job.id})
+    first = client.get(url).json()
+
+    # No free wait slot: answered right away instead of holding a thread
+    with mock.patch("shop.views.time.sleep") as sleep:
+        idle = client.get(url, {"since": first["rev"], "wait": "5"}).json()
+    sleep.assert_not_called()
+    assert idle["rev"] == first["rev"]
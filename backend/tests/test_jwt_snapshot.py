@@ -0,0 +1,108 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+def _login(username: str) -> APIClient:
+    client = APIClient()
+    tok = client.post("/api/auth/login/", {"username": username, "password": "Pass123!"}, format="json")
+    assert tok.status_code == 200
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {tok.json()['access']}")
+    return client
+
+
+def _user_queries(ctx) -> list[str]:
+    return [q["sql"] for q in ctx.captured_queries if '"shop_user"' in q["sql"]]
+
+
+@pytest.mark.django_db
+def test_token_claims_resolve_user_without_lookup():
+    get_user_model().objects.create_user(username="jwt_customer", password="Pass123!")
+    client = _login("jwt_customer")
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get("/api/orders/").status_code == 200
+        assert client.get("/api/cart/").status_code == 200
+    assert _user_queries(ctx) == []
+
+    # Profile endpoints still see the full user
+    assert client.get("/api/auth/me/").json()["username"] == "jwt_customer"
+
+
+@pytest.mark.django_db
+def test_role_change_overrides_token_claims():
+    U = get_user_model()
+    customer = U.objects.create_user(username="jwt_promoted", password="Pass123!")
+    superadmin = U.objects.create_user(username="jwt_super", password="Pass123!", role="SUPERADMIN")
+    client = _login("jwt_promoted")
+    assert client.get("/api/orders/").status_code == 200
+
+    admin_client = APIClient()
+    admin_client.force_authenticate(superadmin)
+    resp = admin_client.post(f"/api/admin/users/{customer.id}/role/", {"role": "ADMIN"}, format="json")
+    assert resp.status_code == 200
+
+    # The token still says CUSTOMER; the change wins and admins cannot order
+    assert client.get("/api/orders/").status_code == 403
+    # Resolved once from the database, then from the cached snapshot
+    with CaptureQueriesContext(connection) as ctx:
+        assert client.get("/api/admin/cache/stats/").status_code == 200
+    assert _user_queries(ctx) == []
+
+
+@pytest.mark.django_db
+def test_deleted_account_token_is_rejected():
+    get_user_model().objects.create_user(username="jwt_leaving", password="Pass123!")
+    client = _login("jwt_leaving")
+    resp = client.post("/api/auth/delete-account/", {"password": "Pass123!"}, format="json")
+    assert resp.status_code == 200
+    assert client.get("/api/orders/").status_code == 401
+
+
+@pytest.mark.django_db
+def test_deactivated_user_token_is_rejected(django_capture_on_commit_callbacks):
+    U = get_user_model()
+    U.objects.create_user(username="jwt_deactivated", password="Pass123!")
+    client = _login("jwt_deactivated")
+    assert client.get("/api/orders/").status_code == 200
+
+    user = U.objects.get(username="jwt_deactivated")
+    user.is_active = False
+    with django_capture_on_commit_callbacks(execute=True):
+        user.save()
+    assert client.get("/api/orders/").status_code == 401
+
+
+@pytest.mark.django_db
+def test_refreshed_tokens_do_not_inherit_role_claims():
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    get_user_model().objects.create_user(username="jwt_refresher", password="Pass123!")
+    client = APIClient()
+    tokens = client.post(
+        "/api/auth/login/", {"username": "jwt_refresher", "password": "Pass123!"}, format="json"
+    ).json()
+    assert AccessToken(tokens["access"])["role"] == "CUSTOMER"
+
+    refreshed = client.post("/api/auth/refresh/", {"refresh": tokens["refresh"]}, format="json")
+    assert refreshed.status_code == 200
+    # Resolved from the snapshot or the database, never from a claim older than one access token
+    assert "role" not in AccessToken(refreshed.json()["access"])
+
+
+@pytest.mark.django_db
+def test_role_change_is_refused_when_revocation_cannot_be_recorded():
+    from unittest import mock
+
+    U = get_user_model()
+    customer = U.objects.create_user(username="jwt_kept", password="Pass123!")
+    admin_client = APIClient()
+    admin_client.force_authenticate(U.objects.create_user(username="jwt_super2", password="x", role="SUPERADMIN"))
+
+    with mock.patch("shop.authentication.cache.set", side_effect=ConnectionError("cache down")):
+        resp = admin_client.post(f"/api/admin/users/{customer.id}/role/", {"role": "ADMIN"}, format="json")
+    assert resp.status_code == 503
+    customer.refresh_from_db()
+    assert customer.role == "CUSTOMER"
@@ -0,0 +1,84 @@
+import re
+import threading
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+def test_order_numbers_are_sequential_per_day():
+    from django.utils import timezone
+    from shop.models import OrderNumberSequence
+
+    today = timezone.localdate().strftime("%Y%m%d")
+    numbers = [OrderNumberSequence.next_for_today() for _ in range(3)]
+    assert numbers == [f"#{today}-001", f"#{today}-002", f"#{today}-003"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_checkouts_do_not_serialise_on_order_numbers():
+    """
+    Concurrent checkouts through /api/orders/ must not queue behind each other.
+
+    Each checkout waits on a barrier right after taking its order number, with
+    its transaction still open. If allocation held a lock until commit, the
+    other checkouts could never reach the barrier and the wait would break.
+    """
+    if connection.vendor != "postgresql":
+        pytest.skip("Lock-free allocation relies on PostgreSQL sequences")
+    from shop.models import Cart, CartItem, Category, OrderNumberSequence, Product, Supplier
+
+    workers = 20
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    product = Product.objects.create(name_uz="P", name_ru="P", category=cat, supplier=sup)
+    User = get_user_model()
+    customers = User.objects.bulk_create([User(username=f"parallel_{i}") for i in range(workers)])
+    carts = Cart.objects.bulk_create([Cart(user=user) for user in customers])
+    CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=Decimal("1")) for cart in carts])
+
+    barrier = threading.Barrier(workers)
+    allocate = OrderNumberSequence.next_for_today
+
+    def allocate_then_wait():
+        number = allocate()
+        # Every checkout must get here while all of them are still open;
+        # the timeout only keeps a regression from hanging the suite
+        barrier.wait(timeout=30)
+        return number
+
+    results: list[str] = []
+    errors: list[BaseException] = []
+    lock = threading.Lock()
+
+    def checkout(user):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            resp = client.post("/api/orders/")
+            assert resp.status_code == 201, resp.content
+            with lock:
+                results.append(resp.json()["order_number"])
+        except BaseException as e:  # pragma: no cover - surfaced below
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    with (
+        mock.patch("shop.views.OrderNumberSequence.next_for_today", side_effect=allocate_then_wait),
+        mock.patch("shop.views._enqueue_order_notification"),
+    ):
+        threads = [threading.Thread(target=checkout, args=(user,)) for user in customers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert not errors
+    assert not barrier.broken
+    assert len(set(results)) == workers
+    assert all(re.match(r"^#\d{8}-\d{3}$", n) for n in results)
@@ -62,6 +62,37 @@ def test_session_cart_merge(client):
     assert merged["items"][0]["quantity"] == 2
 
 
+@pytest.mark.django_db
+def test_guest_cart_merged_once_at_login():
+    from decimal import Decimal
+
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from shop.models import Cart, CartItem, Category, Product, SessionCart, Supplier
+
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    p1, p2 = (Product.objects.create(name_uz=n, name_ru=n, category=cat, supplier=sup) for n in ("P1", "P2"))
+    user = get_user_model().objects.create_user(username="merger", password="Pass123!")
+    CartItem.objects.create(cart=Cart.objects.create(user=user), product=p1, quantity=Decimal("1.5"))
+
+    guest = APIClient()
+    guest.credentials(HTTP_X_SESSION_ID="guest_abc")
+    assert guest.get("/api/cart/").json()["items"] == []
+    assert not SessionCart.objects.exists()  # reading does not create a guest cart
+    guest.post("/api/cart/items/", {"product_id": p1.id, "quantity": 2}, format="json")
+    guest.post("/api/cart/items/", {"product_id": p2.id, "quantity": 3}, format="json")
+
+    tok = guest.post("/api/auth/login/", {"username": "merger", "password": "Pass123!"}, format="json")
+    assert tok.status_code == 200
+    assert not SessionCart.objects.filter(session_key="guest_abc").exists()
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {tok.json()['access']}")
+    items = {it["product"]["id"]: it["quantity"] for it in client.get("/api/cart/").json()["items"]}
+    assert items == {p1.id: 3.5, p2.id: 3}
+
+
 @pytest.mark.django_db
 def test_role_change_superadmin_only(client):
     """Only SUPERADMIN can change user roles."""
@@ -175,3 +206,126 @@ def test_role_change_last_superadmin_prevention(client):
     # since self-change check happens first. The important thing is the system
     # maintains at least 1 SUPERADMIN after all operations.)
     assert U.objects.filter(role="SUPERADMIN").count() >= 1
+
+
+@pytest.fixture
+def redis_guest_carts(settings):
+    from shop.redis_client import get_redis
+
+    try:
+        get_redis().ping()
+    except Exception:
+        pytest.skip("Redis not reachable at REDIS_DATA_URL")
+    settings.GUEST_CART_STORE = "redis"
+    settings.GUEST_CART_TTL = 60
+    yield get_redis()
+    for key in get_redis().scan_iter("guestcart:test_*"):
+        get_redis().delete(key)
+
+
+@pytest.mark.django_db
+def test_redis_guest_cart_roundtrip_and_merge(redis_guest_carts, django_assert_num_queries):
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from shop.models import Category, Product, SessionCart, Supplier
+
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    p1, p2 = (Product.objects.create(name_uz=n, name_ru=n, category=cat, supplier=sup) for n in ("P1", "P2"))
+    get_user_model().objects.create_user(username="redisbuyer", password="Pass123!")
+
+    guest = APIClient()
+    guest.credentials(HTTP_X_SESSION_ID="test_redis_guest")
+    # Product validation and rendering only; the cart itself lives in Redis
+    with django_assert_num_queries(2) as ctx:
+        guest.post("/api/cart/items/", {"product_id": p1.id, "quantity": 2}, format="json")
+    assert all(q["sql"].lstrip().upper().startswith("SELECT") for q in ctx.captured_queries)
+    guest.post("/api/cart/items/", {"product_id": p2.id, "quantity": 1}, format="json")
+    guest.delete(f"/api/cart/items/{p2.id}/")
+    cart = guest.get("/api/cart/").json()
+    assert [(it["product"]["id"], it["quantity"]) for it in cart["items"]] == [(p1.id, 2)]
+    assert not SessionCart.objects.exists()
+    assert 0 < redis_guest_carts.ttl("guestcart:test_redis_guest") <= 60
+
+    tok = guest.post("/api/auth/login/", {"username": "redisbuyer", "password": "Pass123!"}, format="json")
+    assert tok.status_code == 200
+    assert not redis_guest_carts.exists("guestcart:test_redis_guest")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {tok.json()['access']}")
+    assert [(it["product"]["id"], it["quantity"]) for it in client.get("/api/cart/").json()["items"]] == [(p1.id, 2)]
+
+
+
+@pytest.mark.django_db
+def test_redis_guest_cart_survives_a_failed_merge(redis_guest_carts):
+    from decimal import Decimal
+    from unittest import mock
+
+    from django.contrib.auth import get_user_model
+    from shop.guest_carts import get_guest_cart_store
+    from shop.models import Cart, Category, Product, Supplier
+
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    prod = Product.objects.create(name_uz="P", name_ru="P", category=cat, supplier=sup)
+    user = get_user_model().objects.create_user(username="redisretry", password="Pass123!")
+    store = get_guest_cart_store()
+    store.set_quantity("test_redis_retry", prod.id, Decimal("3"))
+
+    with mock.patch.object(Cart, "add_quantities", side_effect=RuntimeError("db down")):
+        with pytest.raises(RuntimeError):
+            store.merge_into(user, "test_redis_retry")
+    # Still there for the next attempt
+    assert [line.quantity for line in store.load("test_redis_retry").lines] == [Decimal("3")]
+    assert store.merge_into(user, "test_redis_retry") == 1
+    assert store.load("test_redis_retry") is None
+
+
+@pytest.mark.django_db
+def test_login_works_while_guest_cart_store_is_down(settings):
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+
+    settings.GUEST_CART_STORE = "redis"
+    # Nothing listens there: connection refused
+    settings.REDIS_DATA_URL = "redis://127.0.0.1:1/0"
+    get_user_model().objects.create_user(username="outage", password="Pass123!")
+    client = APIClient()
+    client.credentials(HTTP_X_SESSION_ID="test_outage")
+    tok = client.post("/api/auth/login/", {"username": "outage", "password": "Pass123!"}, format="json")
+    assert tok.status_code == 200
+    client.credentials(HTTP_X_SESSION_ID="test_outage", HTTP_AUTHORIZATION=f"Bearer {tok.json()['access']}")
+    assert client.get("/api/cart/").status_code == 200
+
+
+@pytest.mark.django_db
+def test_purge_expired_session_carts_in_batches():
+    from datetime import timedelta
+
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.utils import timezone
+    from shop.models import Category, Product, SessionCart, SessionCartItem, Supplier
+    from shop.tasks import purge_expired_session_carts, purge_expired_session_carts_task
+
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    prod = Product.objects.create(name_uz="P", name_ru="P", category=cat, supplier=sup)
+    past, future = timezone.now() - timedelta(days=1), timezone.now() + timedelta(days=1)
+    carts = SessionCart.objects.bulk_create(
+        [SessionCart(session_key=f"old{i}", expires_at=past) for i in range(25)]
+        + [SessionCart(session_key=f"new{i}", expires_at=future) for i in range(3)]
+    )
+    SessionCartItem.objects.bulk_create([SessionCartItem(cart=c, product=prod) for c in carts])
+
+    stats = purge_expired_session_carts(batch_size=10, pause=0, max_seconds=60)
+    assert (stats["carts"], stats["items"], stats["batches"]) == (25, 25, 3)
+    assert sorted(SessionCart.objects.values_list("session_key", flat=True)) == ["new0", "new1", "new2"]
+    assert SessionCartItem.objects.count() == 3
+
+    # A run that is still in progress elsewhere makes the scheduled task skip
+    cache.add("locks:purge_expired_session_carts", 1)
+    assert purge_expired_session_carts_task() is None
+    cache.delete("locks:purge_expired_session_carts")
+    assert purge_expired_session_carts_task()["carts"] == 0
+    call_command("clean_expired_carts", "--pause", "0")
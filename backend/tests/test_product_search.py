@@ -0,0 +1,44 @@
+import pytest
+from django.db import connection
+
+
+@pytest.fixture
+def catalog(db):
+    from shop.models import Category, Product, Supplier
+
+    cat = Category.objects.create(name_uz="Parranda", name_ru="Птица")
+    sup = Supplier.objects.create(name="Farm")
+    names = [("Tovuq son", "Куриное бедро"), ("Tovuq filesi", "Куриное филе"), ("Kurka", "Индейка")]
+    return [
+        Product.objects.create(name_uz=uz, name_ru=ru, description="Yangi", category=cat, supplier=sup)
+        for uz, ru in names
+    ]
+
+
+def _search(client, q):
+    resp = client.get("/api/products/", {"search": q})
+    assert resp.status_code == 200
+    return [p["name_uz"] for p in resp.json()["results"]]
+
+
+@pytest.mark.django_db
+def test_product_search_matches_partial_names(client, catalog):
+    assert set(_search(client, "tovuq")) == {"Tovuq son", "Tovuq filesi"}
+    assert _search(client, "Индейка") == ["Kurka"]
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="full-text/trigram search needs PostgreSQL")
+@pytest.mark.django_db
+def test_product_search_ranks_and_tolerates_typos(client, catalog):
+    from shop.models import Product
+
+    assert Product.objects.filter(search_vector__isnull=False).count() == 3
+    assert _search(client, "tov son")[0] == "Tovuq son"  # prefixes of every word
+    assert "Kurka" in _search(client, "kurak")  # typo, via trigram similarity
+    assert set(_search(client, "курином")) == {"Tovuq son", "Tovuq filesi"}  # Russian stemming
+
+    # Vectors follow edits made through save()
+    product = catalog[2]
+    product.name_ru = "Утка"
+    product.save(update_fields=["name_ru"])
+    assert _search(client, "утка") == ["Kurka"]
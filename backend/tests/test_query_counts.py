@@ -0,0 +1,195 @@
+"""
+Query-count regression suite for order and cart endpoints.
+
+Every line item renders its product with nested category and supplier, so
+each endpoint must cost the same number of queries at 1, 10 and 100 lines.
+"""
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+SIZES = [1, 10, 100]
+
+
+@pytest.fixture
+def products(db):
+    from shop.models import Category, Product, Supplier
+
+    def make(n):
+        # Distinct category and supplier per product, so missing joins show up as N+1
+        cats = Category.objects.bulk_create([Category(name_uz=f"C{i}", name_ru=f"C{i}") for i in range(n)])
+        sups = Supplier.objects.bulk_create([Supplier(name=f"S{i}") for i in range(n)])
+        return Product.objects.bulk_create(
+            [
+                Product(name_uz=f"P{i}", name_ru=f"P{i}", category=cats[i], supplier=sups[i])
+                for i in range(n)
+            ]
+        )
+
+    return make
+
+
+@pytest.fixture
+def customer(db):
+    return get_user_model().objects.create_user(username="qc_customer", password="Pass123!")
+
+
+@pytest.fixture
+def admin(db):
+    return get_user_model().objects.create_user(username="qc_admin", password="Pass123!", role="ADMIN")
+
+
+def _client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    # Fixed session id: no Django session row is created per request
+    client.credentials(HTTP_X_SESSION_ID="query-count-session")
+    return client
+
+
+def _order_with_items(user, products):
+    from shop.models import Order, OrderItem
+
+    order = Order.objects.create(user=user, order_number="#20250101-001")
+    OrderItem.objects.bulk_create([OrderItem(order=order, product=p, quantity=Decimal("1.5")) for p in products])
+    return order
+
+
+def _cart_with_items(user, products):
+    from shop.models import Cart, CartItem
+
+    cart = Cart.objects.create(user=user)
+    CartItem.objects.bulk_create([CartItem(cart=cart, product=p, quantity=Decimal("2")) for p in products])
+    return cart
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("n", SIZES)
+def test_order_list_queries(n, products, customer, django_assert_num_queries):
+    _order_with_items(customer, products(n))
+    client = _client(customer)
+    # ETag aggregate + count + orders + items (with product, category, supplier)
+    with django_assert_num_queries(4):
+        resp = client.get("/api/orders/")
+    assert resp.status_code == 200
+    assert len(resp.json()["results"][0]["items"]) == n
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("n", SIZES)
+def test_order_retrieve_queries(n, products, customer, django_assert_num_queries):
+    order = _order_with_items(customer, products(n))
+    client = _client(customer)
+    with django_assert_num_queries(2):
+        resp = client.get(f"/api/orders/{order.id}/")
+    assert resp.status_code == 200
+    assert resp.json()["items"][0]["product"]["supplier"]["name"].startswith("S")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("n", SIZES)
+def test_order_create_queries(n, products, customer, django_assert_num_queries):
+    _cart_with_items(customer, products(n))
+    client = _client(customer)
+    # Order number allocation is vendor specific (see test_order_numbers); keep it out of the count
+    with mock.patch("shop.views.OrderNumberSequence.next_for_today", return_value="#20250101-001"):
+        # Includes the two admin summary deltas (today_orders, new_orders)
+        with django_assert_num_queries(10):
+            resp = client.post("/api/orders/")
+    assert resp.status_code == 201
+    assert len(resp.json()["items"]) == n
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("n", SIZES)
+def test_order_reorder_queries(n, products, customer, django_assert_num_queries):
+    items = products(n + 1)
+    order = _order_with_items(customer, items)
+    # One product is already in the cart: exercises both update and insert
+    _cart_with_items(customer, items[:1])
+    client = _client(customer)
+    with django_assert_num_queries(9):
+        resp = client.post(f"/api/orders/{order.id}/reorder/")
+    assert resp.status_code == 200
+    assert len(resp.json()["items"]) == n + 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("n", SIZES)
+def test_order_status_queries(n, products, customer, admin, django_assert_num_queries):
+    order = _order_with_items(customer, products(n))
+    client = _client(admin)
+    # Locked read, update, summary delta and prefetch, inside a savepoint here
+    with django_assert_num_queries(6):
+        resp = client.post(f"/api/orders/{order.id}/status/", {"status": "Confirmed"}, format="json")
+    assert resp.status_code == 200
+    assert len(resp.json()["items"]) == n
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("n", SIZES)
+def test_admin_order_list_queries(n, products, customer, admin, django_assert_num_queries):
+    _order_with_items(customer, products(n))
+    client = _client(admin)
+    with django_assert_num_queries(3):
+        resp = client.get("/api/admin/orders/")
+    assert resp.status_code == 200
+    assert len(resp.json()["results"][0]["items"]) == n
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("n", SIZES)
+def test_user_cart_queries(n, products, customer, django_assert_num_queries):
+    _cart_with_items(customer, products(n))
+    client = _client(customer)
+    # Guest cart lookup + cart + items; reading the cart never writes
+    with django_assert_num_queries(3) as ctx:
+        resp = client.get("/api/cart/")
+    assert resp.status_code == 200
+    assert len(resp.json()["items"]) == n
+    assert all(q["sql"].lstrip().upper().startswith("SELECT") for q in ctx.captured_queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("n", SIZES)
+def test_session_cart_queries(n, products, django_assert_num_queries):
+    from shop.models import SessionCart, SessionCartItem
+
+    cart = SessionCart.objects.create(session_key="query-count-session")
+    SessionCartItem.objects.bulk_create(
+        [SessionCartItem(cart=cart, product=p, quantity=Decimal("1")) for p in products(n)]
+    )
+    client = _client()
+    # guest cart + its lines + products (with category, supplier)
+    with django_assert_num_queries(3):
+        resp = client.get("/api/cart/")
+    assert resp.status_code == 200
+    assert len(resp.json()["items"]) == n
+
+
+@pytest.mark.django_db
+def test_admin_order_cursor_pagination(products, customer, admin, django_assert_num_queries):
+    from shop.models import Order
+
+    Order.objects.bulk_create([Order(user=customer, order_number=f"#20250101-{i:03d}") for i in range(45)])
+    client = _client(admin)
+    seen, url = [], "/api/admin/orders/?pagination=cursor"
+    while url:
+        # orders + items; no COUNT(*) and no OFFSET
+        with django_assert_num_queries(2) as ctx:
+            resp = client.get(url)
+        assert resp.status_code == 200
+        assert not any("COUNT(" in q["sql"].upper() for q in ctx.captured_queries)
+        body = resp.json()
+        assert "count" not in body
+        seen += [o["id"] for o in body["results"]]
+        url = body["next"]
+    assert seen == list(Order.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    # Page numbers remain the default
+    body = client.get("/api/admin/orders/").json()
+    assert body["count"] == 45
@@ -8,10 +8,8 @@ from django.urls import reverse
 
 
 @pytest.mark.django_db
-def test_storage_s3_presigned_url(monkeypatch):
-    os.environ["STORAGE_BACKEND"] = "S3"
-    os.environ["AWS_S3_BUCKET"] = "bucket"
-    os.environ["AWS_S3_REGION"] = "us-east-1"
+def test_storage_s3_presigned_url(settings):
+    settings.STORAGE_BACKENDS = {"default": {"BACKEND": "S3", "OPTIONS": {"bucket": "bucket", "region": "us-east-1"}}}
 
     class MockS3:
         def put_object(self, **kwargs):
@@ -29,8 +27,8 @@ def test_storage_s3_presigned_url(monkeypatch):
 
 
 @pytest.mark.django_db
-def test_storage_cloudinary_secure_url(monkeypatch):
-    os.environ["STORAGE_BACKEND"] = "CLOUDINARY"
+def test_storage_cloudinary_secure_url(settings):
+    settings.STORAGE_BACKENDS = {"default": {"BACKEND": "CLOUDINARY", "OPTIONS": {"folder": "test"}}}
 
     class MockUploader:
         @staticmethod
@@ -101,14 +99,374 @@ def test_import_products_strict(monkeypatch, admin_client):
         tok = admin_client.post("/api/auth/login/", {"username": "admz", "password": "Pass123!"}, content_type="application/json")
         assert tok.status_code == 200
         admin_client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {tok.json()['access']}"
-    with mock.patch("shop.tasks.import_products_task.delay", lambda *a, **k: None):
+    with mock.patch("shop.tasks.import_products_task.delay") as delay:
         resp = admin_client.post(reverse("admin_import_products"), {"file": upload})
     assert resp.status_code == 202
     job_id = resp.data["job_id"]
 
-    # Directly run task to simulate worker
+    # Directly run task to simulate worker, with exactly what went to the broker
     from shop.tasks import import_products_task
-    import_products_task(job_id, buf.getvalue())
+    import_products_task(*delay.call_args.args)
 
     status = admin_client.get(reverse("admin_job_status", kwargs={"job_id": job_id})).json()
     assert status["status"] in ("FAILED", "SUCCESS")
+
+
+@pytest.mark.django_db
+def test_import_products_bulk_summary(settings, tmp_path):
+    import uuid
+
+    from openpyxl import Workbook, load_workbook
+    from shop.models import AsyncJob, Category, Product, Supplier
+    from shop.product_import import stage_upload
+    from shop.tasks import import_products_task
+
+    settings.STORAGE_BACKENDS = {"default": {"BACKEND": "LOCAL"}}
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMPORT_BATCH_SIZE = 2  # force several batches
+
+    cat = Category.objects.create(name_uz="Go'sht", name_ru="Мясо")
+    sup = Supplier.objects.create(name="Old")
+    existing = Product.objects.create(name_uz="Tovuq", name_ru="Old", category=cat, supplier=sup)
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["name_uz", "name_ru", "category", "supplier", "image_url", "description", "status"])
+    ws.append(["Tovuq", "Курица", "Go'sht", "Farm A", "", "", 1])
+    ws.append(["Kurka", "Индейка", "Parranda", "Farm A", "", "", "false"])
+    ws.append(["", "Без имени", "Parranda", "Farm A", "", "", 1])
+    ws.append(["Kurka", "Индейка 2", "Parranda", "Farm B", "", "", "true"])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    job = AsyncJob.objects.create(id=uuid.uuid4(), type=AsyncJob.Type.IMPORT_PRODUCTS)
+    import_products_task(str(job.id), stage_upload(SimpleUploadedFile("products.xlsx", buf.getvalue())))
+    job.refresh_from_db()
+    assert job.status == AsyncJob.Status.SUCCESS, job.error
+
+    existing.refresh_from_db()
+    assert existing.name_ru == "Курица"
+    assert existing.supplier.name == "Farm A"
+    kurka = Product.objects.get(name_uz="Kurka")
+    assert (kurka.name_ru, kurka.supplier.name, kurka.status) == ("Индейка 2", "Farm B", True)
+    assert Category.objects.filter(name_uz="Parranda").count() == 1
+
+    (path,) = (tmp_path / "files").iterdir()
+    summary = load_workbook(path)
+    rows = list(summary["Summary"].iter_rows(min_row=2, values_only=True))
+    assert [(r[0], r[1]) for r in rows] == [(2, "updated"), (3, "created"), (4, "skipped"), (5, "updated")]
+    assert list(summary["Totals"].iter_rows(min_row=2, values_only=True)) == [(1, 2, 1)]
+
+
+@pytest.mark.django_db
+def test_import_upload_is_staged_not_sent_through_broker(settings, tmp_path):
+    from django.contrib.auth import get_user_model
+    from openpyxl import Workbook
+    from rest_framework.test import APIClient
+
+    # The import summary is stored through the exports backend
+    settings.MEDIA_ROOT = tmp_path
+    wb = Workbook()
+    wb.active.append(["name_uz", "name_ru", "category", "supplier", "image_url", "description", "status"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    upload = SimpleUploadedFile("p.xlsx", buf.getvalue(), content_type="application/octet-stream")
+
+    api = APIClient()
+    api.force_authenticate(get_user_model().objects.create_user(username="stager", password="x", role="ADMIN"))
+    with mock.patch("shop.tasks.import_products_task.delay") as delay:
+        resp = api.post(reverse("admin_import_products"), {"file": upload})
+    assert resp.status_code == 202
+
+    job_id, ref = delay.call_args.args
+    assert job_id == resp.data["job_id"]
+    assert isinstance(ref, str) and len(ref) < 64
+    assert (settings.IMPORT_SPOOL_DIR / ref).read_bytes() == buf.getvalue()
+
+    from shop.tasks import import_products_task
+
+    import_products_task(job_id, ref)
+    assert not (settings.IMPORT_SPOOL_DIR / ref).exists()
+
+    # Nothing reads an upload whose job could not be enqueued
+    upload.seek(0)
+    with mock.patch("shop.tasks.import_products_task.delay", side_effect=OSError("broker down")):
+        with pytest.raises(OSError):
+            api.post(reverse("admin_import_products"), {"file": upload})
+    assert not list(settings.IMPORT_SPOOL_DIR.iterdir())
+
+    # Left behind by a worker that died: swept once old enough
+    from shop.product_import import sweep_staged, stage_upload
+
+    upload.seek(0)
+    old = stage_upload(upload)
+    os.utime(settings.IMPORT_SPOOL_DIR / old, (0, 0))
+    assert sweep_staged(3600) == 1
+    assert not list(settings.IMPORT_SPOOL_DIR.iterdir())
+
+
+@pytest.mark.django_db
+def test_product_image_variants(settings, tmp_path, monkeypatch, django_capture_on_commit_callbacks):
+    Image = pytest.importorskip("PIL.Image")
+    from PIL import features
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from shop.models import Category, Product, Supplier
+    from shop.tasks import process_product_image_task
+
+    settings.STORAGE_BACKENDS = {"default": {"BACKEND": "LOCAL"}}
+    monkeypatch.setenv("MAX_IMAGE_MB", "5")
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_VARIANT_WIDTHS = [320, 640, 4000]
+    settings.IMAGE_VARIANT_FORMATS = ["webp", "jpeg"]
+
+    photo = Image.new("RGB", (1200, 800), "red")
+    exif = photo.getexif()
+    exif[0x010F] = "PhoneCam"  # Make
+    buf = io.BytesIO()
+    photo.save(buf, "JPEG", exif=exif)
+
+    api = APIClient()
+    api.force_authenticate(get_user_model().objects.create_user(username="imager", password="x", role="ADMIN"))
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    upload = SimpleUploadedFile("photo.jpg", buf.getvalue(), content_type="image/jpeg")
+    with mock.patch("shop.tasks.process_product_image_task.apply_async") as enqueue:
+        with django_capture_on_commit_callbacks(execute=True):
+            resp = api.post(
+                "/api/products/",
+                {"name_uz": "P", "category_id": cat.id, "supplier_id": sup.id, "image_file": upload},
+                format="multipart",
+            )
+    assert resp.status_code == 201, resp.data
+    assert resp.data["image_srcset"] == {}
+    product_id, ref, original_url = enqueue.call_args.kwargs["args"]
+    assert product_id == resp.data["id"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert process_product_image_task(product_id, ref, original_url)
+    assert not (settings.IMAGE_SPOOL_DIR / ref).exists()
+
+    product = Product.objects.get(pk=product_id)
+    assert product.image_url != original_url
+    expected = {"jpeg"} | ({"webp"} if features.check("webp") else set())
+    assert set(product.image_variants) == expected
+    for fmt in expected:
+        # Never upscaled past the 1200px original
+        assert sorted(product.image_variants[fmt], key=int) == ["320", "640"]
+    for url in [product.image_url, *product.image_variants["jpeg"].values()]:
+        with Image.open(tmp_path / url.split("/media/", 1)[1]) as stored:
+            assert not stored.getexif()
+
+    body = api.get(f"/api/products/{product_id}/").json()
+    assert body["image_srcset"]["jpeg"] == (
+        f"{product.image_variants['jpeg']['320']} 320w, {product.image_variants['jpeg']['640']} 640w"
+    )
+
+    # A late task for an image that was since replaced changes nothing
+    from shop.images import stage_image
+
+    assert not process_product_image_task(product_id, stage_image(buf.getvalue(), "photo.jpg"), original_url)
+    assert Product.objects.get(pk=product_id).image_url == product.image_url
+
+
+@pytest.mark.django_db
+def test_staged_images_do_not_outlive_failures(settings):
+    pytest.importorskip("PIL.Image")
+    from shop.images import stage_image, sweep_staged
+    from shop.serializers import _enqueue_image_processing
+    from shop.tasks import process_product_image_task
+
+    ref = stage_image(b"image bytes", "photo.jpg")
+    with mock.patch("shop.tasks.process_product_image_task.apply_async", side_effect=OSError("broker down")):
+        _enqueue_image_processing(1, ref, "/media/photo.jpg")
+    assert not (settings.IMAGE_SPOOL_DIR / ref).exists()
+
+    # Not an image: logged and skipped, not retried
+    ref = stage_image(b"not an image", "photo.jpg")
+    assert process_product_image_task(1, ref, "/media/photo.jpg") is False
+    assert not (settings.IMAGE_SPOOL_DIR / ref).exists()
+
+    # Left behind by a rolled-back save
+    old, fresh = stage_image(b"a", "a.jpg"), stage_image(b"b", "b.jpg")
+    os.utime(settings.IMAGE_SPOOL_DIR / old, (0, 0))
+    assert sweep_staged(3600) == 1
+    assert [p.name for p in settings.IMAGE_SPOOL_DIR.iterdir()] == [fresh]
+
+
+def test_content_addressed_local_storage_dedupes(settings, tmp_path):
+    from shop.storage import LocalStorage
+
+    settings.MEDIA_ROOT = tmp_path
+    storage = LocalStorage(base_dir=tmp_path / "files", base_url="/media", content_addressed=True)
+    first = storage.save_bytes(b"same photo", "a.JPG", "image/jpeg")
+    again = storage.save_stream(io.BytesIO(b"same photo"), "b.jpg", "image/jpeg")
+    other = storage.save_bytes(b"other photo", "a.jpg", "image/jpeg")
+
+    assert first == again != other
+    assert first.startswith("/media/files/cas/") and first.endswith(".jpg")
+    assert storage.save_stream(io.BytesIO(b"rows"), "orders.csv.gz").endswith(".csv.gz")
+    stored = [p for p in (tmp_path / "files").rglob("*") if p.is_file()]
+    assert len(stored) == 3
+    assert not any(p.name.startswith(".upload-") for p in stored)
+
+    class Broken(io.BytesIO):
+        def read(self, *args):
+            raise OSError("connection reset")
+
+    with pytest.raises(OSError):
+        storage._place(Broken(), tmp_path / "files" / "cas" / "zz" / "broken.jpg")
+    assert not list((tmp_path / "files" / "cas" / "zz").iterdir())
+
+
+def test_content_addressed_s3_skips_existing_objects():
+    from shop.storage import S3Storage
+
+    class NotFound(Exception):
+        response = {"Error": {"Code": "404"}}
+
+    class MockS3:
+        def __init__(self):
+            self.objects = {}
+
+        def head_object(self, Bucket, Key):
+            if Key not in self.objects:
+                raise NotFound()
+            return {}
+
+        def put_object(self, Bucket, Key, Body, **extra):
+            self.objects[Key] = (Body, extra)
+
+        def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+            self.objects[key] = (fileobj.read(), ExtraArgs)
+
+    client = MockS3()
+    storage = S3Storage(
+        bucket="b", region="r", base_path="uploads", content_addressed=True,
+        public_base_url="https://cdn.example.com",
+    )
+    with mock.patch.object(S3Storage, "_client", return_value=client):
+        url = storage.save_bytes(b"template", "template.xlsx", "application/octet-stream")
+        with mock.patch.object(client, "upload_fileobj") as upload:
+            assert storage.save_stream(io.BytesIO(b"template"), "copy.xlsx") == url
+        upload.assert_not_called()
+
+    assert url.startswith("https://cdn.example.com/uploads/cas/") and url.endswith(".xlsx")
+    (body, extra), = client.objects.values()
+    assert body == b"template"
+    assert extra["CacheControl"] == "public, max-age=31536000, immutable"
+
+
+@pytest.fixture
+def moto_s3(monkeypatch):
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    from shop import storage
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    mock_aws = getattr(moto, "mock_aws", None) or moto.mock_s3  # moto 5 / moto 4
+    storage.s3_client.cache_clear()
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="exports")
+        yield client
+    storage.s3_client.cache_clear()
+
+
+def test_s3_stream_upload_is_multipart_on_a_shared_client(moto_s3):
+    from shop.storage import S3Storage
+
+    storage = S3Storage(
+        bucket="exports", region="us-east-1", base_path="exports", multipart_threshold_mb=5, multipart_chunk_mb=5
+    )
+    payload = os.urandom(12 * 1024 * 1024)
+    url = storage.save_stream(io.BytesIO(payload), "orders.csv", "text/csv")
+    assert "orders.csv" in url
+
+    (obj,) = moto_s3.list_objects_v2(Bucket="exports")["Contents"]
+    head = moto_s3.head_object(Bucket="exports", Key=obj["Key"])
+    # Three 5 MB parts (multipart ETags end in -<parts>)
+    assert head["ETag"].strip('"').endswith("-3")
+    assert head["ContentType"] == "text/csv"
+    assert moto_s3.get_object(Bucket="exports", Key=obj["Key"])["Body"].read() == payload
+
+    # Every backend instance reuses the process-wide client
+    assert storage._client() is S3Storage(bucket="other", region="us-east-1", base_path="x")._client()
+
+
+@pytest.mark.django_db
+def test_storage_registry_builds_named_backends_once(settings, tmp_path):
+    from shop import storage
+
+    settings.MEDIA_ROOT = tmp_path
+    settings.STORAGE_BACKENDS = {
+        "default": {"BACKEND": "LOCAL"},
+        "exports": {"BACKEND": "LOCAL", "OPTIONS": {"subdir": "exports"}},
+    }
+    images = storage.get_storage("images")
+    assert storage.get_storage("images") is images
+    # No "images" entry: shares the default backend, but is timed under its own name
+    assert images.backend is storage.get_storage().backend
+    exports = storage.get_storage("exports")
+    assert exports.backend is not images.backend
+
+    # autospec ignores wraps=, so the real mkdir is called through side_effect
+    real_mkdir = storage.Path.mkdir
+    with mock.patch.object(storage.Path, "mkdir", autospec=True, side_effect=real_mkdir) as mkdir:
+        for n in range(3):
+            exports.save_bytes(b"x", f"e{n}.csv")
+    assert mkdir.call_count == 1
+    assert len(list((tmp_path / "exports").iterdir())) == 3
+
+    with mock.patch.object(storage.LocalStorage, "save_bytes", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            images.save_bytes(b"x", "a.png")
+    stats = storage.storage_stats()
+    assert stats["exports"]["saves"] == 3 and stats["exports"]["errors"] == 0
+    assert stats["images"]["saves"] == 1 and stats["images"]["errors"] == 1
+
+    # Changing the settings rebuilds the registry
+    settings.STORAGE_BACKENDS = {"default": {"BACKEND": "LOCAL"}}
+    assert storage.get_storage("exports") is not exports
+
+
+@pytest.mark.django_db
+def test_async_saves_run_concurrently_off_the_event_loop(settings, tmp_path, monkeypatch):
+    import asyncio
+    import threading
+
+    from asgiref.sync import async_to_sync
+
+    from shop import storage
+
+    settings.MEDIA_ROOT = tmp_path
+    settings.STORAGE_BACKENDS = {"default": {"BACKEND": "LOCAL", "OPTIONS": {"subdir": "uploads"}}}
+    # Without aiofiles, local writes take the thread-offloaded path like S3 and Cloudinary
+    monkeypatch.setattr(storage, "aiofiles", None)
+    blocking_save = storage.LocalStorage.save_bytes
+    # Passes only once all four saves are in flight at the same time
+    all_saving = threading.Barrier(4, timeout=10)
+    loop_ran = threading.Event()
+
+    def concurrent_save(self, data, filename, content_type=None):
+        all_saving.wait()
+        # Each save blocks until the event loop has run another task meanwhile
+        assert loop_ran.wait(timeout=10)
+        return blocking_save(self, data, filename, content_type)
+
+    monkeypatch.setattr(storage.LocalStorage, "save_bytes", concurrent_save)
+    images = storage.get_storage("images")
+
+    async def upload_all():
+        async def other_request():
+            await asyncio.sleep(0)
+            loop_ran.set()
+
+        saves = [images.asave_bytes(b"img", f"p{n}.png", "image/png") for n in range(4)]
+        urls, _ = await asyncio.gather(asyncio.gather(*saves), other_request())
+        return urls
+
+    urls = async_to_sync(upload_all)()
+    assert len(set(urls)) == 4 and len(list((tmp_path / "uploads").iterdir())) == 4
+    assert storage.storage_stats()["images"]["saves"] == 4
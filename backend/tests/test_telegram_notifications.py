@@ -0,0 +1,138 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pytest
+
+
+class FakeBotAPI:
+    """Minimal local stand-in for the Telegram Bot API sendMessage method."""
+
+    def __init__(self, fail_once: set[str] | None = None, reject: set[str] | None = None):
+        self.received: list[dict] = []
+        self.fail_once = set(fail_once or ())
+        self.reject = set(reject or ())
+        self.lock = threading.Lock()
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # noqa: N802
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                chat_id = str(body["chat_id"])
+                with api.lock:
+                    api.received.append({"path": self.path, **body})
+                    if chat_id in api.fail_once:
+                        api.fail_once.discard(chat_id)
+                        status = 502
+                    elif chat_id in api.reject:
+                        status = 400
+                    else:
+                        status = 200
+                payload = json.dumps({"ok": status == 200}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def chats(self) -> list[str]:
+        return sorted(str(m["chat_id"]) for m in self.received)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def order(db):
+    from django.contrib.auth import get_user_model
+    from shop.models import Category, Supplier, Product, Order, OrderItem
+
+    user = get_user_model().objects.create_user(username="tg", password="Pass123!", fio="Buyer")
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    prod = Product.objects.create(name_uz="Tovuq", name_ru="Kuritsa", category=cat, supplier=sup)
+    order = Order.objects.create(user=user, order_number="#20250101-001")
+    OrderItem.objects.create(order=order, product=prod, quantity=2)
+    return order
+
+
+def _point_service_at(monkeypatch, api: FakeBotAPI, chat_ids: list[str]):
+    from shop.telegram_service import telegram_service
+
+    monkeypatch.setattr(telegram_service, "bot_token", "TEST")
+    monkeypatch.setattr(telegram_service, "api_url", f"{api.url}/botTEST")
+    monkeypatch.setattr(telegram_service, "admin_chat_ids", chat_ids)
+
+
+@pytest.mark.django_db
+def test_notification_task_sends_to_all_admin_chats(monkeypatch, order):
+    from shop.tasks import send_order_notification_task
+
+    api = FakeBotAPI()
+    try:
+        _point_service_at(monkeypatch, api, ["100", "200", "300"])
+        send_order_notification_task.apply(args=[order.id]).get()
+    finally:
+        api.close()
+
+    assert api.chats() == ["100", "200", "300"]
+    assert all(m["path"] == "/botTEST/sendMessage" for m in api.received)
+    assert "#20250101-001" in api.received[0]["text"]
+    assert "Tovuq" in api.received[0]["text"]
+
+
+@pytest.mark.django_db
+def test_notification_task_retries_only_failed_chats(monkeypatch, order):
+    from shop.tasks import send_order_notification_task
+
+    # 200 fails once with a 5xx (retried), 300 is permanently rejected (not retried)
+    api = FakeBotAPI(fail_once={"200"}, reject={"300"})
+    try:
+        _point_service_at(monkeypatch, api, ["100", "200", "300"])
+        send_order_notification_task.apply(args=[order.id]).get()
+    finally:
+        api.close()
+
+    assert api.chats() == ["100", "200", "200", "300"]
+
+
+@pytest.mark.django_db
+def test_checkout_defers_notification_until_commit(monkeypatch, django_capture_on_commit_callbacks):
+    from decimal import Decimal
+
+    from django.contrib.auth import get_user_model
+    from rest_framework.test import APIClient
+    from shop.models import Cart, CartItem, Category, Supplier, Product
+    from shop.telegram_service import telegram_service
+
+    def boom(*args, **kwargs):  # pragma: no cover - must not be reached
+        raise AssertionError("Telegram must not be called during checkout")
+
+    monkeypatch.setattr(telegram_service, "deliver_to_chats", boom)
+    user = get_user_model().objects.create_user(username="fast", password="Pass123!")
+    cat = Category.objects.create(name_uz="C", name_ru="C")
+    sup = Supplier.objects.create(name="S")
+    prod = Product.objects.create(name_uz="P", name_ru="P", category=cat, supplier=sup)
+    CartItem.objects.create(cart=Cart.objects.create(user=user), product=prod, quantity=Decimal("1"))
+
+    api_client = APIClient()
+    api_client.force_authenticate(user)
+    with mock.patch("shop.tasks.send_order_notification_task.apply_async") as enqueue:
+        with django_capture_on_commit_callbacks() as callbacks:
+            resp = api_client.post("/api/orders/")
+            assert resp.status_code == 201
+        # Nothing is enqueued before the transaction commits
+        enqueue.assert_not_called()
+        for callback in callbacks:
+            callback()
+    # Enqueued once after commit; Telegram is only called by the worker
+    enqueue.assert_called_once_with(args=[resp.json()["id"]], retry=False)
@@ -0,0 +1,76 @@
+import multiprocessing
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+
+from shop import throttling
+from shop.throttling import RedisScopedRateThrottle
+
+
+class _TestThrottle(RedisScopedRateThrottle):
+    THROTTLE_RATES = {"throttle_test": "12/min"}
+
+
+class _View:
+    throttle_scope = "throttle_test"
+
+
+def _hit(n: int, queue) -> None:
+    request = RequestFactory().get("/", REMOTE_ADDR="10.9.8.7")
+    request.user = AnonymousUser()
+    queue.put(sum(_TestThrottle().allow_request(request, _View()) for _ in range(n)))
+
+
+@pytest.fixture
+def redis_throttle(settings):
+    from shop.redis_client import get_redis
+
+    try:
+        get_redis().ping()
+    except Exception:
+        pytest.skip("Redis not reachable at REDIS_DATA_URL")
+    settings.THROTTLE_STORE = "redis"
+    throttling._redis_down_until = 0.0
+    yield get_redis()
+    for key in get_redis().scan_iter(f"{throttling.KEY_PREFIX}throttle_throttle_test_*"):
+        get_redis().delete(key)
+
+
+def test_limit_is_shared_across_processes(redis_throttle):
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    workers = [ctx.Process(target=_hit, args=(10, queue)) for _ in range(4)]
+    for w in workers:
+        w.start()
+    allowed = sum(queue.get(timeout=30) for _ in workers)
+    for w in workers:
+        w.join()
+    # 40 requests from 4 processes, one 12/min budget between them
+    assert allowed == 12
+
+
+def test_blocked_request_waits_for_oldest_entry(redis_throttle):
+    request = RequestFactory().get("/", REMOTE_ADDR="10.9.8.6")
+    request.user = AnonymousUser()
+    for _ in range(12):
+        assert _TestThrottle().allow_request(request, _View())
+    throttle = _TestThrottle()
+    assert not throttle.allow_request(request, _View())
+    assert 0 < throttle.wait() <= 60
+
+
+def test_fails_open_when_redis_is_down(settings, monkeypatch):
+    settings.THROTTLE_STORE = "redis"
+    settings.THROTTLE_REDIS_RETRY = 30
+    monkeypatch.setattr(throttling, "_redis_down_until", 0.0)
+
+    def unavailable():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(throttling, "_sliding_window", unavailable)
+    request = RequestFactory().get("/", REMOTE_ADDR="10.9.8.5")
+    request.user = AnonymousUser()
+    assert all(_TestThrottle().allow_request(request, _View()) for _ in range(20))
+    # Redis is not retried until the back-off expires
+    assert throttling._redis_down_until > 0
@@ -13,6 +13,10 @@ export interface AsyncJob {
   status: 'PENDING' | 'RUNNING' | 'SUCCESS' | 'FAILED'
   result_url?: string
   error?: string
+  processed?: number
+  total?: number | null
+  rows_per_second?: number | null
+  rev?: string | null
 }
 
 export interface AdminOrder extends Omit<Order, 'user'> {
@@ -9,6 +9,9 @@ import { Badge } from "@/components/ui/badge"
 import { Input } from "@/components/ui/input"
 import { useState } from "react"
 
+// Matches ProductGrid: 1/2/3/4 columns at the sm/lg/xl breakpoints
+const CARD_IMAGE_SIZES = "(min-width: 1280px) 25vw, (min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw"
+
 interface ProductCardProps {
   product: Product
 }
@@ -41,15 +44,27 @@ export function ProductCard({ product }: ProductCardProps) {
   return (
     <Card className="group overflow-hidden transition-all hover:shadow-lg">
       <div className="relative aspect-square overflow-hidden bg-muted">
-        <img
-          src={product.image_url || "https://images.unsplash.com/photo-1587593810167-a84920ea0781?w=400&h=400&fit=crop"}
-          alt={productName}
-          className="h-full w-full object-cover transition-transform group-hover:scale-105"
-          onError={(e) => {
-            const target = e.target as HTMLImageElement
-            target.src = "https://images.unsplash.com/photo-1587593810167-a84920ea0781?w=400&h=400&fit=crop"
-          }}
-        />
+        <picture className="contents">
+          {product.image_srcset?.avif && (
+            <source type="image/avif" srcSet={product.image_srcset.avif} sizes={CARD_IMAGE_SIZES} />
+          )}
+          {product.image_srcset?.webp && (
+            <source type="image/webp" srcSet={product.image_srcset.webp} sizes={CARD_IMAGE_SIZES} />
+          )}
+          <img
+            src={product.image_url || "https://images.unsplash.com/photo-1587593810167-a84920ea0781?w=400&h=400&fit=crop"}
+            srcSet={product.image_srcset?.jpeg}
+            sizes={CARD_IMAGE_SIZES}
+            loading="lazy"
+            alt={productName}
+            className="h-full w-full object-cover transition-transform group-hover:scale-105"
+            onError={(e) => {
+              const target = e.target as HTMLImageElement
+              target.srcset = ""
+              target.src = "https://images.unsplash.com/photo-1587593810167-a84920ea0781?w=400&h=400&fit=crop"
+            }}
+          />
+        </picture>
         {!product.status && (
           <Badge variant="secondary" className="absolute top-2 right-2">
             {t("outOfStock", language)}
@@ -161,6 +161,10 @@ export async function listOrders(params?: {
   user?: number
   date_from?: string
   date_to?: string
+  // Keyset pages: pass `cursor` from the previous response's `next` link
+  pagination?: 'cursor'
+  cursor?: string
+  page_size?: number
 }) {
   const { data } = await api.get('/admin/orders/', { params })
   return data
@@ -190,13 +194,19 @@ export async function importProducts(file: File) {
   return data as { job_id: string; status: string }
 }
 
-export async function getJob(jobId: string) {
-  const { data } = await api.get(`/admin/jobs/${jobId}/`)
+// With `since` (a previous `rev`) the server holds the request until the job changes or `wait` seconds pass
+export async function getJob(jobId: string, since?: string | null, wait = 20) {
+  const params = since ? { since, wait } : undefined
+  const { data } = await api.get(`/admin/jobs/${jobId}/`, { params })
   return data as {
     id: string
     status: string
     result_url?: string
     error?: string
+    processed?: number
+    total?: number | null
+    rows_per_second?: number | null
+    rev?: string | null
   }
 }
 
@@ -85,9 +85,15 @@ export function AuthProvider({ children }: { children: ReactNode }) {
 
   const login = async (username: string, password: string) => {
     try {
+      // The guest cart (keyed by X-Session-ID) is merged into the user's cart by the login call
+      const headers: HeadersInit = { "Content-Type": "application/json" }
+      const guestSessionId = localStorage.getItem("session_id")
+      if (guestSessionId) {
+        headers["X-Session-ID"] = guestSessionId
+      }
       const response = await fetch(`${import.meta.env.VITE_API_ORIGIN || ""}/api/auth/login/`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers,
         body: JSON.stringify({ username, password }),
       })
 
@@ -27,6 +27,8 @@ export interface Product {
   category: number | Category
   supplier: number | Supplier
   image_url: string
+  // format -> "url 320w, url 640w", filled in once the image has been processed
+  image_srcset?: Record<string, string>
   description: string
   status: boolean
   created_at: string
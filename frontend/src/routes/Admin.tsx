@@ -65,6 +65,10 @@ interface AsyncJob {
   status: 'PENDING' | 'RUNNING' | 'SUCCESS' | 'FAILED'
   result_url?: string
   error?: string
+  processed?: number
+  total?: number | null
+  rows_per_second?: number | null
+  rev?: string | null
 }
 
 interface AdminOrder extends Omit<Order, 'user'> {
@@ -346,17 +350,24 @@ export function Admin() {
   }
 
   const pollJobStatus = async (jobId: string, setJob: (job: AsyncJob) => void) => {
-    const interval = setInterval(async () => {
-      try {
-        const job = await getJob(jobId)
+    // Long-poll: each request returns as soon as the job's revision changes
+    let rev: string | null | undefined = null
+    try {
+      for (;;) {
+        const job = await getJob(jobId, rev)
         setJob(job as AsyncJob)
         if (job.status === 'SUCCESS' || job.status === 'FAILED') {
-          clearInterval(interval)
+          return
+        }
+        if (!job.rev) {
+          // No progress channel (e.g. cache down): fall back to plain polling
+          await new Promise(resolve => setTimeout(resolve, 2000))
         }
-      } catch (error) {
-        clearInterval(interval)
+        rev = job.rev
       }
-    }, 2000)
+    } catch (error) {
+      // Stop polling on errors, as before
+    }
   }
 
   const statusColors: Record<OrderStatus, string> = {
@@ -1659,6 +1670,12 @@ export function Admin() {
                         {t(`job${exportJob.status.charAt(0) + exportJob.status.slice(1).toLowerCase()}`, language)}
                       </Badge>
                     </div>
+                    {exportJob.status === 'RUNNING' && !!exportJob.processed && (
+                      <div className="text-sm text-muted-foreground">
+                        {exportJob.processed}{exportJob.total ? ` / ${exportJob.total}` : ''}
+                        {exportJob.rows_per_second ? ` (${exportJob.rows_per_second}/s)` : ''}
+                      </div>
+                    )}
                     {exportJob.status === 'SUCCESS' && exportJob.result_url && (
                       <a
                         href={exportJob.result_url}
@@ -1732,6 +1749,12 @@ export function Admin() {
                         {t(`job${importJob.status.charAt(0) + importJob.status.slice(1).toLowerCase()}`, language)}
                       </Badge>
                     </div>
+                    {importJob.status === 'RUNNING' && !!importJob.processed && (
+                      <div className="text-sm text-muted-foreground">
+                        {importJob.processed}{importJob.total ? ` / ${importJob.total}` : ''}
+                        {importJob.rows_per_second ? ` (${importJob.rows_per_second}/s)` : ''}
+                      </div>
+                    )}
                     {importJob.status === 'FAILED' && (
                       <div className="text-sm text-destructive">{importJob.error}</div>
                     )}